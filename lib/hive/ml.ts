@@ -349,6 +349,62 @@ export function extractHiveActionFeatures(
   ];
 }
 
+/**
+ * Compact board for the inference server's infer_board command, which rebuilds
+ * the token state and action features above on its side (scripts/hive/board_features.py).
+ * Colors are 0 = white, 1 = black; piece types index PIECE_TYPE_ORDER.
+ */
+export interface HiveCompactBoard {
+  /** [type, color, q, r, stackOrder, id rank] in board order. */
+  pieces: number[][];
+  hands: [number, number];
+  turn: number;
+  turnNumber: number;
+  perspective: number;
+  /** [flags, type (-1 if unknown), toQ, toR, fromQ, fromR]; flags 1 = move, 2 = pillbug ability, 4 = from set. */
+  moves: number[][];
+}
+
+export function encodeHiveCompactBoard(
+  state: GameState,
+  legalMoves: readonly Move[],
+  perspective: PlayerColor,
+): HiveCompactBoard {
+  const colorIndex = (color: PlayerColor): number => (color === 'white' ? 0 : 1);
+  const idRank = new Map(
+    [...state.board]
+      .sort((left, right) => left.id.localeCompare(right.id))
+      .map((piece, rank) => [piece, rank] as const),
+  );
+  return {
+    pieces: state.board.map((piece) => [
+      PIECE_TYPE_ORDER.indexOf(piece.type),
+      colorIndex(piece.color),
+      piece.position.q,
+      piece.position.r,
+      piece.stackOrder,
+      idRank.get(piece) ?? 0,
+    ]),
+    hands: [state.whiteHand.length, state.blackHand.length],
+    turn: colorIndex(state.currentTurn),
+    turnNumber: state.turnNumber,
+    perspective: colorIndex(perspective),
+    moves: legalMoves.map((move) => {
+      const pieceType = resolveMovePieceType(state, move);
+      const fromCoord = move.type === 'move' && move.from ? move.from : null;
+      const flags = (move.type === 'move' ? 1 : 0) | (move.isPillbugAbility ? 2 : 0) | (fromCoord ? 4 : 0);
+      return [
+        flags,
+        pieceType ? PIECE_TYPE_ORDER.indexOf(pieceType) : -1,
+        move.to.q,
+        move.to.r,
+        fromCoord?.q ?? 0,
+        fromCoord?.r ?? 0,
+      ];
+    }),
+  };
+}
+
 export function evaluatePolicyValue(
   state: GameState,
   legalMoves: readonly Move[],
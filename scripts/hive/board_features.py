@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Hive state and action features from compact board encodings, computed per batch.
+
+Mirrors extractHiveTokenStateFeatures and extractHiveActionFeatures in
+lib/hive/ml.ts (the TS encoder is encodeHiveCompactBoard) so clients can send
+boards instead of feature vectors. A compact position is:
+
+    {
+        "pieces": [[type, color, q, r, stack, order], ...],  # board order
+        "hands": [white_in_hand, black_in_hand],
+        "turn": color to move,
+        "turnNumber": int,
+        "perspective": color,
+        "moves": [[flags, type, toQ, toR, fromQ, fromR], ...]
+    }
+
+type is the index into PIECE_TYPES (-1 for an unknown type), color
+is 0 for white and 1 for black, and order is the piece's rank when the board is
+sorted by piece id (the TS token order). Move flags: 1 = move (else place),
+2 = pillbug ability, 4 = from is set.
+
+Every feature is computed with array ops over the whole batch, padded to the
+largest board; there is no per-position Python loop after parsing. numpy is
+imported lazily so the torch server pays for it only when infer_board is used.
+
+stack_top picks which piece owns a stacked cell for the neighbor features:
+'board_order' follows the TS extractors, 'highest' follows the Python ones in
+mcts_gpu.py (the last piece with the highest stack order). tanh goes through
+math.tanh over the distinct inputs, so values match the scalar extractors bit
+for bit. Callers may pass preallocated float32 state_out / action_out arrays.
+
+Run as a script, it reads {"positions": [...], "tokenSlots": 32} on stdin and
+prints {"stateFeatures", "actionFeatures", "counts"}; test-board-features.ts
+uses this to check parity with the TS extractors.
+"""
+
+import json
+import math
+import sys
+from typing import Any, Dict, Sequence, Tuple
+
+PIECE_TYPES = ('queen', 'beetle', 'grasshopper', 'spider', 'ant', 'ladybug', 'mosquito', 'pillbug')
+HEX_DIRECTIONS = ((1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1))
+DEFAULT_TOKEN_SLOTS = 32
+TOKEN_FEATURES = 8
+GLOBAL_FEATURES = 6
+ACTION_FEATURES = 31
+PIECE_COLUMNS = 6
+MOVE_COLUMNS = 6
+MOVE_FLAG_MOVE = 1
+MOVE_FLAG_PILLBUG = 2
+MOVE_FLAG_FROM = 4
+# Queen distance the TS extractors assume when that queen is not on the board.
+MISSING_QUEEN_DISTANCE = 6
+STACK_TOP_RULES = ('board_order', 'highest')
+
+
+def token_slots_for_state_size(state_size: int) -> int:
+    """Token slots of a model's state layout (8 features per token plus 6 globals)."""
+    slots, remainder = divmod(state_size - GLOBAL_FEATURES, TOKEN_FEATURES)
+    if slots <= 0 or remainder:
+        raise ValueError(f"State size {state_size} is not a token feature layout")
+    return slots
+
+
+def _rows(positions: Sequence[Dict[str, Any]], field: str, columns: int) -> Tuple[Any, Any]:
+    """Concatenate one list field of every position into (rows[N, columns], counts[P])."""
+    import numpy as np
+
+    counts = np.asarray([len(pos.get(field) or ()) for pos in positions], dtype=np.int64)
+    flat = [row for pos in positions for row in (pos.get(field) or ())]
+    rows = np.asarray(flat, dtype=np.int64).reshape(len(flat), columns) if flat else np.zeros((0, columns), dtype=np.int64)
+    return rows, counts
+
+
+def _hex_distance(q1: Any, r1: Any, q2: Any, r2: Any) -> Any:
+    import numpy as np
+
+    dq = q1 - q2
+    dr = r1 - r2
+    return (np.abs(dq) + np.abs(dq + dr) + np.abs(dr)) / 2.0
+
+
+def _tanh_over(values: Any, scale: float) -> Any:
+    """math.tanh(value / scale) elementwise, evaluated once per distinct value."""
+    import numpy as np
+
+    unique, inverse = np.unique(values, return_inverse=True)
+    table = np.asarray([math.tanh(value / scale) for value in unique.tolist()], dtype=np.float64)
+    return table[inverse].reshape(np.shape(values))
+
+
+def _queen_distance_feature(distance: Any, present: Any) -> Any:
+    import numpy as np
+
+    return np.clip(1.0 - np.where(present, distance, MISSING_QUEEN_DISTANCE) / 8.0, -1.0, 1.0)
+
+
+def _output(out: Any, shape: Tuple[int, int]) -> Any:
+    """out checked against shape, or a fresh float32 array."""
+    import numpy as np
+
+    if out is None:
+        return np.zeros(shape, dtype=np.float32)
+    if tuple(out.shape) != shape or out.dtype != np.float32:
+        raise ValueError(f"Output array must be float32 {shape}, got {out.dtype} {tuple(out.shape)}")
+    return out
+
+
+def board_batch_features(
+    positions: Sequence[Dict[str, Any]],
+    token_slots: int = DEFAULT_TOKEN_SLOTS,
+    stack_top: str = 'board_order',
+    state_out: Any = None,
+    action_out: Any = None,
+) -> Tuple[Any, Any, Any]:
+    """
+    Features for a batch of compact positions.
+
+    Returns float32 state[positions, token_slots * 8 + 6], float32
+    actions[total moves, 31] packed in position order, and int64
+    counts[positions]. state and actions are state_out and action_out
+    when those are given.
+    """
+    import numpy as np
+
+    if stack_top not in STACK_TOP_RULES:
+        raise ValueError(f"Unknown stack_top rule {stack_top!r}")
+    position_count = len(positions)
+    piece_rows, piece_counts = _rows(positions, 'pieces', PIECE_COLUMNS)
+    move_rows, move_counts = _rows(positions, 'moves', MOVE_COLUMNS)
+    perspective = np.asarray([int(pos.get('perspective', 0)) for pos in positions], dtype=np.int64)
+    turn = np.asarray([int(pos.get('turn', 0)) for pos in positions], dtype=np.int64)
+    turn_number = np.asarray([float(pos.get('turnNumber', 1)) for pos in positions], dtype=np.float64)
+    hands = np.asarray([list(pos.get('hands') or (0, 0)) for pos in positions], dtype=np.float64).reshape(position_count, 2)
+
+    # Pad every board to the largest one: [positions, width] per piece field.
+    width = max(1, int(piece_counts.max()) if position_count else 1)
+    owner = np.repeat(np.arange(position_count), piece_counts)
+    slot = np.arange(len(piece_rows)) - np.repeat(np.cumsum(piece_counts) - piece_counts, piece_counts)
+    board = np.zeros((position_count, width, PIECE_COLUMNS), dtype=np.int64)
+    present = np.zeros((position_count, width), dtype=bool)
+    board[owner, slot] = piece_rows
+    present[owner, slot] = True
+    piece_type, color, q, r, stack, order = (board[:, :, column] for column in range(PIECE_COLUMNS))
+    mine = present & (color == perspective[:, None])
+    rows_index = np.arange(position_count)
+
+    # First queen of each side in board order, as Array.find does.
+    queens = present & (piece_type == 0)
+    my_queen_mask = queens & mine
+    opp_queen_mask = queens & ~mine
+    has_my_queen = my_queen_mask.any(axis=1)
+    has_opp_queen = opp_queen_mask.any(axis=1)
+    my_queen_index = my_queen_mask.argmax(axis=1)
+    opp_queen_index = opp_queen_mask.argmax(axis=1)
+    my_queen_q, my_queen_r = q[rows_index, my_queen_index], r[rows_index, my_queen_index]
+    opp_queen_q, opp_queen_r = q[rows_index, opp_queen_index], r[rows_index, opp_queen_index]
+
+    directions = np.asarray(HEX_DIRECTIONS, dtype=np.int64)
+
+    def occupied_around(center_q: Any, center_r: Any, owners: Any) -> Any:
+        """[n, 6] occupancy of the neighbors of each center on board owners[n]."""
+        neighbor_q = center_q[:, None, None] + directions[None, :, 0, None]
+        neighbor_r = center_r[:, None, None] + directions[None, :, 1, None]
+        return present[owners][:, None, :] & (q[owners][:, None, :] == neighbor_q) & (r[owners][:, None, :] == neighbor_r)
+
+    my_surround = np.where(has_my_queen, occupied_around(my_queen_q, my_queen_r, rows_index).any(axis=2).sum(axis=1), 0)
+    opp_surround = np.where(has_opp_queen, occupied_around(opp_queen_q, opp_queen_r, rows_index).any(axis=2).sum(axis=1), 0)
+    phase = _tanh_over(turn_number - 18.0, 10.0)
+
+    # Tokens: pieces sorted by id rank, truncated or zero-padded to token_slots.
+    sort_index = np.argsort(np.where(present, order, np.iinfo(np.int64).max), axis=1, kind='stable')
+    if width < token_slots:
+        sort_index = np.pad(sort_index, ((0, 0), (0, token_slots - width)))
+    sort_index = sort_index[:, :token_slots]
+
+    def token_field(values: Any) -> Any:
+        return np.take_along_axis(values, sort_index, axis=1)
+
+    token_present = token_field(present)
+    if width < token_slots:
+        token_present[:, width:] = False
+    token_q = token_field(q)
+    token_r = token_field(r)
+    state_width = token_slots * TOKEN_FEATURES + GLOBAL_FEATURES
+    state = _output(state_out, (position_count, state_width))
+    tokens = state[:, :token_slots * TOKEN_FEATURES].reshape(position_count, token_slots, TOKEN_FEATURES)
+    for column, values in enumerate((
+        np.where(token_field(mine), 1.0, -1.0),
+        np.clip(token_field(piece_type) / (len(PIECE_TYPES) - 1), 0.0, 1.0),
+        _tanh_over(token_q, 5.0),
+        _tanh_over(token_r, 5.0),
+        np.clip(token_field(stack) / 5.0, 0.0, 1.0),
+        np.clip(1.0 - _hex_distance(token_q, token_r, 0, 0) / 10.0, -1.0, 1.0),
+        _queen_distance_feature(_hex_distance(token_q, token_r, opp_queen_q[:, None], opp_queen_r[:, None]), has_opp_queen[:, None]),
+        _queen_distance_feature(_hex_distance(token_q, token_r, my_queen_q[:, None], my_queen_r[:, None]), has_my_queen[:, None]),
+    )):
+        tokens[:, :, column] = np.where(token_present, values, 0.0)
+    my_hand = np.where(perspective == 0, hands[:, 0], hands[:, 1])
+    opp_hand = np.where(perspective == 0, hands[:, 1], hands[:, 0])
+    globals_ = state[:, token_slots * TOKEN_FEATURES:]
+    globals_[:, 0] = np.where(turn == perspective, 1.0, -1.0)
+    globals_[:, 1] = phase
+    globals_[:, 2] = my_hand / 14.0
+    globals_[:, 3] = opp_hand / 14.0
+    globals_[:, 4] = my_surround / 6.0
+    globals_[:, 5] = opp_surround / 6.0
+    np.nan_to_num(state, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+    if stack_top == 'board_order':
+        # A piece takes over its cell when its stackOrder is at least the
+        # number of pieces already seen there, scanning in board order.
+        same_cell = present[:, :, None] & present[:, None, :] & (q[:, :, None] == q[:, None, :]) & (r[:, :, None] == r[:, None, :])
+        earlier = np.tril(np.ones((width, width), dtype=bool), k=-1)
+        seen_before = (same_cell & earlier[None, :, :]).sum(axis=2)
+        takes_top = present & ((seen_before == 0) | (stack >= seen_before))
+
+    move_owner = np.repeat(np.arange(position_count), move_counts)
+    flags, move_type, to_q, to_r, from_q, from_r = (move_rows[:, column] for column in range(MOVE_COLUMNS))
+    is_move = (flags & MOVE_FLAG_MOVE) != 0
+    has_from = is_move & ((flags & MOVE_FLAG_FROM) != 0)
+    from_q = np.where(has_from, from_q, 0)
+    from_r = np.where(has_from, from_r, 0)
+    move_my_queen = has_my_queen[move_owner]
+    move_opp_queen = has_opp_queen[move_owner]
+    to_my_queen = _hex_distance(to_q, to_r, my_queen_q[move_owner], my_queen_r[move_owner])
+    to_opp_queen = _hex_distance(to_q, to_r, opp_queen_q[move_owner], opp_queen_r[move_owner])
+    from_my_queen = np.where(has_from & move_my_queen, _hex_distance(from_q, from_r, my_queen_q[move_owner], my_queen_r[move_owner]), 0.0)
+    from_opp_queen = np.where(has_from & move_opp_queen, _hex_distance(from_q, from_r, opp_queen_q[move_owner], opp_queen_r[move_owner]), 0.0)
+    move_distance = np.where(has_from, _hex_distance(from_q, from_r, to_q, to_r), 0.0)
+
+    neighbor_cells = occupied_around(to_q, to_r, move_owner)
+    neighbor_occupied = neighbor_cells.any(axis=2)
+    if stack_top == 'board_order':
+        top_candidates = neighbor_cells & takes_top[move_owner][:, None, :]
+    else:
+        # The last piece in board order among those with the cell's highest stack order.
+        move_stack = stack[move_owner][:, None, :]
+        highest = np.where(neighbor_cells, move_stack, np.iinfo(np.int64).min).max(axis=2, initial=np.iinfo(np.int64).min)
+        top_candidates = neighbor_cells & (move_stack == highest[:, :, None])
+    top_index = np.where(top_candidates, np.arange(1, width + 1), 0).argmax(axis=2)
+    top_mine = np.take_along_axis(mine[move_owner], top_index, axis=1)
+    neighbor_mine = (neighbor_occupied & top_mine).sum(axis=1)
+    neighbor_opp = (neighbor_occupied & ~top_mine).sum(axis=1)
+    to_stack = (present[move_owner] & (q[move_owner] == to_q[:, None]) & (r[move_owner] == to_r[:, None])).sum(axis=1)
+
+    actions = _output(action_out, (len(move_rows), ACTION_FEATURES))
+    actions[:, 0] = ~is_move
+    actions[:, 1] = is_move
+    actions[:, 2] = (flags & MOVE_FLAG_PILLBUG) != 0
+    actions[:, 3:3 + len(PIECE_TYPES)] = move_type[:, None] == np.arange(len(PIECE_TYPES))[None, :]
+    for column, values in enumerate((
+        _tanh_over(to_q, 5.0),
+        _tanh_over(to_r, 5.0),
+        np.clip(1.0 - _hex_distance(to_q, to_r, 0, 0) / 10.0, -1.0, 1.0),
+        _queen_distance_feature(to_opp_queen, move_opp_queen),
+        _queen_distance_feature(to_my_queen, move_my_queen),
+        my_surround[move_owner] / 6.0,
+        opp_surround[move_owner] / 6.0,
+        phase[move_owner],
+        _tanh_over(from_q, 5.0),
+        _tanh_over(from_r, 5.0),
+        np.clip(1.0 - _hex_distance(from_q, from_r, 0, 0) / 10.0, -1.0, 1.0),
+        np.clip(1.0 - from_opp_queen / 8.0, -1.0, 1.0),
+        np.clip(1.0 - from_my_queen / 8.0, -1.0, 1.0),
+        np.clip(move_distance / 6.0, 0.0, 1.0),
+        neighbor_mine / 6.0,
+        neighbor_opp / 6.0,
+        (6 - neighbor_occupied.sum(axis=1)) / 6.0,
+        move_my_queen & (to_my_queen == 1),
+        move_opp_queen & (to_opp_queen == 1),
+        np.clip(to_stack / 4.0, 0.0, 1.0),
+    ), start=3 + len(PIECE_TYPES)):
+        actions[:, column] = values
+    return state, actions, move_counts
+
+
+def main() -> None:
+    request = json.load(sys.stdin)
+    state, actions, counts = board_batch_features(
+        request.get('positions') or [],
+        int(request.get('tokenSlots') or DEFAULT_TOKEN_SLOTS),
+    )
+    json.dump({
+        'stateFeatures': state.tolist(),
+        'actionFeatures': actions.tolist(),
+        'counts': counts.tolist(),
+    }, sys.stdout)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
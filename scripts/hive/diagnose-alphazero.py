@@ -27,6 +27,7 @@ def load_train_module() -> Any:
 
 TRAIN = load_train_module()
 PolicyValueNet = TRAIN.PolicyValueNet
+check_factorized_policy = TRAIN.check_factorized_policy
 compute_batch_loss = TRAIN.compute_batch_loss
 load_initial_model = TRAIN.load_initial_model
 parse_hidden = TRAIN.parse_hidden
@@ -148,7 +149,7 @@ def compute_policy_metrics(
             embeddings = model.embed(state_tensor)
             for index, sample in enumerate(batch):
                 action_tensor = torch.tensor(sample.action_features, dtype=torch.float32, device=device)
-                sample_embedding = embeddings[index:index + 1].expand(len(sample.action_features), -1)
+                sample_embedding = embeddings[index:index + 1]
                 logits = model.policy_logits(sample_embedding, action_tensor).detach().cpu()
                 probs = softmax_from_logits(logits).tolist()
                 target = list(sample.action_probs)
@@ -210,8 +211,8 @@ def compare_models(
         for sample in samples:
             action_tensor = torch.tensor(sample.action_features, dtype=torch.float32, device=device)
             state_tensor = torch.tensor([sample.state_features], dtype=torch.float32, device=device)
-            base_embedding = baseline.embed(state_tensor).expand(len(sample.action_features), -1)
-            cand_embedding = candidate.embed(state_tensor).expand(len(sample.action_features), -1)
+            base_embedding = baseline.embed(state_tensor)
+            cand_embedding = candidate.embed(state_tensor)
             base_probs = softmax_from_logits(baseline.policy_logits(base_embedding, action_tensor).detach().cpu()).tolist()
             cand_probs = softmax_from_logits(candidate.policy_logits(cand_embedding, action_tensor).detach().cpu()).tolist()
             target = list(sample.action_probs)
@@ -253,6 +254,7 @@ def main() -> None:
         raise RuntimeError("No samples available for requested split")
 
     model = load_model(args.model, state_names, action_names, hidden, device)
+    factorized_diff = check_factorized_policy(model, selected, device)
     summary, losses = compute_policy_metrics(model, selected, device, args.batch_size)
 
     result: Dict[str, Any] = {
@@ -265,6 +267,7 @@ def main() -> None:
         "policyTargetTemperature": args.policy_target_temperature,
         "losses": losses,
         "policy": summary.__dict__,
+        "factorizedPolicyMaxDiff": factorized_diff,
     }
 
     if args.compare_model.strip():
@@ -4,12 +4,27 @@
  * This client communicates with the Python GPU inference server to provide
  * batched neural network inference. It collects inference requests and
  * sends them to the GPU in batches for better throughput.
+ *
+ * When HIVE_GPU_INFERENCE_SOCKET (or the socketPath option) is set, the client
+ * connects to a shared `gpu-inference-server.py --socket` daemon instead of
+ * spawning its own server, so every worker uses one resident model.
+ *
+ * On a daemon, infers carry the client's priority class (the priority option or
+ * HIVE_INFERENCE_PRIORITY). When a class queue is full, the daemon refuses the
+ * batch with a backpressure signal and the client retries it after the
+ * suggested delay.
+ *
+ * inferBoard sends compact boards (encodeHiveCompactBoard in lib/hive/ml.ts)
+ * instead of feature vectors; the server computes the features for the batch.
  */
 
 import { spawn, type ChildProcess } from 'node:child_process';
+import { EventEmitter } from 'node:events';
+import { createConnection } from 'node:net';
 import { createInterface, type Interface } from 'node:readline';
 import path from 'node:path';
 import { fileURLToPath } from 'node:url';
+import type { HiveCompactBoard } from '../../lib/hive/ml';
 
 const SCRIPTS_DIR = path.dirname(fileURLToPath(import.meta.url));
 
@@ -30,20 +45,55 @@ export interface GpuInferenceResult {
   actionLogits: Record<string, number>;
 }
 
+/** A compact board (encodeHiveCompactBoard); the server extracts the features itself. */
+export interface GpuBoardPosition extends HiveCompactBoard {
+  modelKey?: string;
+}
+
+export interface GpuBoardResult {
+  modelKey?: string;
+  value: number;
+  /** One logit per move, in the order of the position's moves. */
+  logits: number[];
+}
+
 interface PendingRequest {
   resolve: (result: Record<string, unknown>) => void;
   reject: (error: Error) => void;
 }
 
+interface GpuServerTransport {
+  stdin: NodeJS.WritableStream | null;
+  stdout: NodeJS.ReadableStream | null;
+  stderr: NodeJS.ReadableStream | null;
+  events: EventEmitter;
+  kill: () => void;
+}
+
 interface ServerResponse {
   id: string;
   ok: boolean;
   payload?: Record<string, unknown>;
   error?: string;
+  backpressure?: boolean;
+  retryAfterMs?: number;
+}
+
+export type GpuInferencePriority = 'high' | 'normal' | 'low';
+
+/** The daemon's queue for this client's priority class is full; retry after retryAfterMs. */
+export class GpuBackpressureError extends Error {
+  readonly retryAfterMs: number;
+
+  constructor(message: string, retryAfterMs: number) {
+    super(message);
+    this.name = 'GpuBackpressureError';
+    this.retryAfterMs = retryAfterMs;
+  }
 }
 
 export class GpuInferenceClient {
-  private process: ChildProcess;
+  private process: GpuServerTransport;
   private reader: Interface | null = null;
   private nextId = 1;
   private pending = new Map<string, PendingRequest>();
@@ -59,14 +109,17 @@ export class GpuInferenceClient {
   private batchTimer: ReturnType<typeof setTimeout> | null = null;
   private readonly batchDelayMs: number;
   private readonly maxBatchSize: number;
+  private readonly priority: GpuInferencePriority | undefined;
 
   private constructor(
-    process: ChildProcess,
-    options: { batchDelayMs?: number; maxBatchSize?: number } = {},
+    process: GpuServerTransport,
+    options: { batchDelayMs?: number; maxBatchSize?: number; priority?: GpuInferencePriority } = {},
   ) {
     this.process = process;
     this.batchDelayMs = options.batchDelayMs ?? 2;
     this.maxBatchSize = options.maxBatchSize ?? 128;
+    this.priority = options.priority
+      ?? (globalThis.process.env.HIVE_INFERENCE_PRIORITY as GpuInferencePriority | undefined);
 
     const stdout = process.stdout;
     if (stdout) {
@@ -84,11 +137,11 @@ export class GpuInferenceClient {
       }
     });
 
-    process.on('error', (error) => {
+    process.events.on('error', (error: Error) => {
       this.rejectAllPending(error);
     });
 
-    process.on('close', (code, signal) => {
+    process.events.on('close', (code: unknown, signal: unknown) => {
       if (!this.closed) {
         this.rejectAllPending(
           new Error(`GPU server exited: code=${code ?? 'null'} signal=${signal ?? 'null'}`),
@@ -105,10 +158,23 @@ export class GpuInferenceClient {
     batchDelayMs?: number;
     maxBatchSize?: number;
     modelKey?: string;
+    socketPath?: string;
+    /** 'numpy' runs a torch-free CPU server (defaults to HIVE_INFERENCE_BACKEND, then 'torch'). */
+    backend?: 'torch' | 'numpy';
+    /** Daemon priority class for infers (defaults to HIVE_INFERENCE_PRIORITY, then the daemon's 'normal'). */
+    priority?: GpuInferencePriority;
   }): Promise<GpuInferenceClient> {
-    const scriptPath = path.join(SCRIPTS_DIR, 'gpu-inference-server.py');
-    const pythonProcess = await spawnPythonWithFallback([scriptPath]);
-    const client = new GpuInferenceClient(pythonProcess, options);
+    const socketPath = options?.socketPath ?? process.env.HIVE_GPU_INFERENCE_SOCKET;
+    let transport: GpuServerTransport;
+    if (socketPath) {
+      transport = await connectDaemonSocket(socketPath);
+    } else {
+      const scriptPath = path.join(SCRIPTS_DIR, 'gpu-inference-server.py');
+      const backend = options?.backend ?? process.env.HIVE_INFERENCE_BACKEND;
+      const args = backend ? [scriptPath, '--backend', backend] : [scriptPath];
+      transport = childProcessTransport(await spawnPythonWithFallback(args));
+    }
+    const client = new GpuInferenceClient(transport, options);
 
     // Initialize the model
     const initResult = await client.request('init', {
@@ -154,10 +220,38 @@ export class GpuInferenceClient {
    * Send positions directly without batching.
    */
   private async inferDirect(positions: GpuInferencePosition[]): Promise<GpuInferenceResult[]> {
-    const response = await this.request('infer', { positions });
+    const response = await this.requestInfer('infer', positions);
     return (response.results as GpuInferenceResult[]) ?? [];
   }
 
+  /**
+   * Infer value and move logits for compact boards. Feature extraction runs
+   * on the server in one vectorized pass, so only the boards cross the wire.
+   */
+  async inferBoard(positions: GpuBoardPosition[]): Promise<GpuBoardResult[]> {
+    if (positions.length === 0) {
+      return [];
+    }
+    const response = await this.requestInfer('infer_board', positions);
+    return (response.results as GpuBoardResult[]) ?? [];
+  }
+
+  /**
+   * Send an infer command with this client's priority, retrying after
+   * backpressure until the daemon accepts it.
+   */
+  private async requestInfer(cmd: string, positions: unknown[]): Promise<Record<string, unknown>> {
+    const payload = this.priority ? { positions, priority: this.priority } : { positions };
+    for (;;) {
+      try {
+        return await this.request(cmd, payload);
+      } catch (error) {
+        if (!(error instanceof GpuBackpressureError) || this.closed) throw error;
+        await sleep(error.retryAfterMs);
+      }
+    }
+  }
+
   /**
    * Schedule batch flush after delay.
    */
@@ -228,6 +322,14 @@ export class GpuInferenceClient {
     });
   }
 
+  /**
+   * Drop a model key from the server registry. Unlike a budget eviction, the
+   * key is not reloaded on next use.
+   */
+  async unloadModel(modelKey: string): Promise<Record<string, unknown>> {
+    return this.request('unload_model', { modelKey });
+  }
+
   async reloadModel(modelKey: string, modelPath: string): Promise<Record<string, unknown>> {
     return this.request('reload', {
       modelKey,
@@ -235,6 +337,14 @@ export class GpuInferenceClient {
     });
   }
 
+  /**
+   * Run every shape bucket once (server started with --shape-buckets) so the
+   * compiled forwards are built before search traffic arrives.
+   */
+  async warmup(modelKey?: string): Promise<Record<string, unknown>> {
+    return this.request('warmup', modelKey ? { modelKey } : {});
+  }
+
   /**
    * Get server statistics.
    */
@@ -291,6 +401,8 @@ export class GpuInferenceClient {
     this.pending.delete(id);
     if (response.ok) {
       pending.resolve(response.payload ?? {});
+    } else if (response.backpressure) {
+      pending.reject(new GpuBackpressureError(response.error ?? 'GPU server queue full', response.retryAfterMs ?? 1));
     } else {
       pending.reject(new Error(response.error ?? 'GPU inference failed'));
     }
@@ -327,6 +439,34 @@ export class GpuInferenceClient {
   }
 }
 
+function childProcessTransport(proc: ChildProcess): GpuServerTransport {
+  return {
+    stdin: proc.stdin,
+    stdout: proc.stdout,
+    stderr: proc.stderr,
+    events: proc,
+    kill: () => proc.kill(),
+  };
+}
+
+/**
+ * Connect to a shared inference daemon listening on a Unix socket.
+ */
+async function connectDaemonSocket(socketPath: string): Promise<GpuServerTransport> {
+  const socket = createConnection(socketPath);
+  await new Promise<void>((resolve, reject) => {
+    socket.once('connect', resolve);
+    socket.once('error', reject);
+  });
+  return {
+    stdin: socket,
+    stdout: socket,
+    stderr: null,
+    events: socket,
+    kill: () => socket.destroy(),
+  };
+}
+
 /**
  * Try to spawn Python with multiple fallback paths.
  */
@@ -10,22 +10,149 @@ Protocol:
 - Input: JSON lines with {id, cmd, payload}
 - Output: JSON lines with {id, ok, payload/error}
 
+Binary infer frames may be interleaved with JSON lines on the same channel.
+A frame starts with a NUL byte, so it can never be confused with a JSON line:
+- Request: BINARY_REQUEST_HEADER (magic, header JSON length, positions, action
+  total, state dim, action dim), the header JSON ({id, modelKey, modelKeys?}),
+  then little-endian float32 state[positions * state_dim], float32
+  actions[action_total * action_dim] and int32 action_counts[positions].
+- Response: BINARY_RESPONSE_HEADER (magic, header JSON length, positions, action
+  total), the header JSON ({id, ok, error?, stats?}), then float32
+  values[positions] and float32 logits[action_total] in request order.
+
+Clients may keep several requests in flight and must match responses by id.
+In stdio mode a reader thread decodes the next request while the current one
+is being evaluated.
+
+Daemon mode (--socket PATH) serves many clients over a Unix domain socket with
+the same framing. Infer requests from all clients go into one queue and are
+flushed as a fused batch once --max-batch-positions positions are waiting or
+the oldest request has waited --batch-deadline-ms. Each client gets back only
+its own results.
+
+Infers carry an optional priority class ("priority": high, normal or low; in
+the payload or the binary header). Each class has its own queue. A flush is
+filled by deficit round robin using --priority-weights, so an arena at high
+priority overtakes bulk self-play without starving it. A class holding
+--max-queue-positions positions refuses new infers with
+{ok: false, backpressure: true, retryAfterMs}. stats['daemon'] reports
+per-class queue wait and end-to-end latency. In stdio mode the field is
+ignored. Models are shared: init/load_model for a key that is already
+resident with the same modelPath is a no-op, one naming a different
+modelPath for that key is refused, and shutdown only ends the calling
+client's session. The device is fixed by --device; a payload asking for a
+different one is refused.
+
+Result cache (--cache-mb, off by default): per-position values and logits are
+kept in an LRU keyed by (model key, model generation, digest of the float32
+state and action feature bytes). Hits are answered before any tensors are
+built; a reload bumps the generation and drops that key's entries.
+
+Model memory (--model-memory-mb, env HIVE_GPU_MODEL_MEMORY_MB): when resident
+weights exceed the budget, the least recently used keys not needed by the
+current batch are evicted. An evicted key is reloaded from its remembered
+modelPath the next time a request uses it. stats['modelResidentBytes'] has
+the bytes per key.
+
+Duplicate positions (--no-dedup disables): within each batch, positions with
+the same model key and the same state and action feature bytes are evaluated
+once and the result is copied to every requester. Per-response stats['dedup']
+reports the batch's positions, unique positions and dedup ratio; stats has
+the running totals.
+
+Mixed-model batches: positions for keys whose models share an architecture
+(e.g. arena candidate and champion) are padded per model and evaluated in one
+torch.func stack_module_state + vmap forward (--no-fused-forward disables it).
+
+Shape buckets (--shape-buckets 8x1024,64x8192,...): single-model batches are
+padded up to the smallest (positions, action rows) bucket that fits and run
+through a forward compiled once per bucket (--bucket-backend compile, trace or
+eager, falling back on failure). Larger batches run unpadded. warmup runs every
+bucket ahead of traffic; stats report per-bucket use and padding.
+
+int8 CPU mode (--cpu-int8, env HIVE_GPU_CPU_INT8): when a model loads onto the
+CPU, the trunk and policy Linears are dynamically quantized to int8 and checked
+against fp32 on a seeded synthetic batch. The int8 copy serves only if the max
+value and logit errors are within --int8-tolerance; stats['int8'] has the
+per-model report.
+
+Backends (--backend, env HIVE_INFERENCE_BACKEND): torch (default) or numpy.
+The numpy backend is chosen before torch is imported and serves the same stdio
+protocol from numpy_inference.py on CPU BLAS; stats report backend, startupMs
+and RSS for both so the two can be compared.
+
+Replica pool (--replicas N, env HIVE_INFERENCE_REPLICAS): a torch-free
+supervisor (replica_pool.py) runs N stdio replicas of this server, each pinned
+to its own cores with --intra-op-threads set to its share, shards every infer
+batch across them by position and merges the results in order.
+--replica-benchmark sweeps replicas against threads per replica.
+
+Hot swap: reload never blocks the request loop. Requests dispatched before the
+reload finish on the old weights, requests after the reply use the new ones,
+and the old model is released once the batch holding it returns.
+
 Commands:
 - init: Initialize or replace a model from file
 - load_model: Load a model under a registry key
-- infer: Batch inference for state + action features
-- reload: Reload a model for a registry key
-- stats: Return evaluator stats
+- unload_model: Drop a model key and free its weights
+- infer: Batch inference for state + action features (JSON or binary frame)
+- infer_priors: JSON infer that returns top-k, softmax-normalized, pruned
+  priors (with seeded Dirichlet noise on root positions) as action indices
+- infer_board: JSON infer from compact boards (pieces, hands, turn and legal
+  moves); the token state and action features are computed server-side for
+  the whole batch (board_features.py) and logits come back in move order
+- reload: Rebuild a model on a background thread and swap it in between
+  batches; the reply is sent once the new weights are serving
+- warmup: Run every shape bucket for one model key (or all) to trigger compilation
+- stats: Return evaluator stats, including per-model phase latency percentiles
+  (decode, tensor_build, forward, d2h, encode) and sliding-window throughput
 - shutdown: Graceful shutdown
 """
 
+import argparse
+import array
+import collections
 import contextlib
+import copy
+import hashlib
 import json
+import math
 import os
+import queue
+import random
+import signal
+import socket
+import struct
 import sys
+import threading
 import time
 import traceback
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Set, Tuple
+
+STARTED_AT = time.perf_counter()
+
+
+def early_args(argv: List[str]) -> argparse.Namespace:
+    """Options read before torch is imported, so the numpy backend and the replica supervisor never load it."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--backend', default=os.environ.get('HIVE_INFERENCE_BACKEND', 'torch'))
+    parser.add_argument('--replicas', type=int, default=int(os.environ.get('HIVE_INFERENCE_REPLICAS', '0') or 0))
+    parser.add_argument('--replica-benchmark', action='store_true')
+    return parser.parse_known_args(argv)[0]
+
+
+if __name__ == '__main__':
+    EARLY_ARGS = early_args(sys.argv[1:])
+    if EARLY_ARGS.replicas > 0 or EARLY_ARGS.replica_benchmark:
+        from replica_pool import main as replica_pool_main
+
+        replica_pool_main(sys.argv[1:], STARTED_AT, os.path.abspath(__file__))
+        sys.exit(0)
+    if EARLY_ARGS.backend == 'numpy':
+        from numpy_inference import main as numpy_main
+
+        numpy_main(sys.argv[1:], STARTED_AT)
+        sys.exit(0)
 
 try:
     import torch
@@ -34,6 +161,45 @@ except ImportError:
     print("PyTorch required. Install: pip install torch", file=sys.stderr, flush=True)
     sys.exit(1)
 
+from inference_protocol import (
+    JSON_INFER_COMMANDS,
+    BinaryInferFrame,
+    ProtocolError,
+    emit_binary_response,
+    emit_log,
+    emit_response,
+    encode_binary_response,
+    encode_binary_result,
+    encode_response,
+    exit_after_stdio,
+    infer_model_key,
+    process_footprint,
+    read_message,
+    write_output,
+)
+from board_features import board_batch_features, token_slots_for_state_size
+from policy_priors import position_seeds, segment_priors
+from policy_value_io import load_policy_value_weights, read_model_payload
+
+
+PRIOR_OPTION_KEYS = ('topK', 'minProb', 'dirichletAlpha', 'dirichletEpsilon')
+
+# Daemon priority classes, highest first, and their default weighted-fair shares.
+PRIORITY_CLASSES = ('high', 'normal', 'low')
+DEFAULT_PRIORITY_WEIGHTS = 'high=8,normal=4,low=1'
+
+# Queued on the request queue to wake the serving thread when a reload is ready.
+SWAP_READY = object()
+
+POSITION_DIGEST_PREFIX = struct.Struct('<III')
+
+# Stacked parameter copies kept for recent combinations of model keys.
+MAX_STACKED_MODEL_SETS = 4
+
+# Synthetic batch for the int8 parity check: positions and max actions per position.
+INT8_PARITY_POSITIONS = 64
+INT8_PARITY_MAX_ACTIONS = 48
+
 
 class PolicyValueNet(torch.nn.Module):
     """Policy-value network matching the TypeScript model format."""
@@ -57,12 +223,46 @@ class PolicyValueNet(torch.nn.Module):
         self.policy_output_weights = torch.nn.Parameter(torch.zeros(self.policy_hidden_size))
         self.policy_bias = torch.nn.Parameter(torch.zeros(1))
         self.policy_scale = torch.nn.Parameter(torch.ones(1), requires_grad=False)
+        # Set by split_policy_input (int8 CPU mode) in place of policy_input_hidden.
+        self.policy_state_input: Optional[torch.nn.Module] = None
+        self.policy_action_input: Optional[torch.nn.Module] = None
+
+    def split_policy_input(self) -> None:
+        """
+        Replace policy_input_hidden with separate state and action Linears.
+
+        Dynamically quantized Linears have no sliceable weight, so the int8 path
+        needs the factorized policy input as two real modules.
+        """
+        weight = self.policy_input_hidden.weight.detach()
+        state_input = torch.nn.Linear(self.embedding_size, self.policy_hidden_size)
+        action_input = torch.nn.Linear(weight.shape[1] - self.embedding_size, self.policy_hidden_size, bias=False)
+        with torch.no_grad():
+            state_input.weight.copy_(weight[:, :self.embedding_size])
+            state_input.bias.copy_(self.policy_input_hidden.bias.detach())
+            action_input.weight.copy_(weight[:, self.embedding_size:])
+        self.policy_state_input = state_input.to(weight.device)
+        self.policy_action_input = action_input.to(weight.device)
+        self.policy_input_hidden = None
+
+    def policy_input_parts(
+        self,
+        embeddings: torch.Tensor,
+        action_features: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """(per-position, per-action) halves of the policy input layer's pre-activation."""
+        if self.policy_state_input is not None:
+            return self.policy_state_input(embeddings), self.policy_action_input(action_features)
+        weight = self.policy_input_hidden.weight
+        state_part = F.linear(embeddings, weight[:, :self.embedding_size], self.policy_input_hidden.bias)
+        action_part = F.linear(action_features, weight[:, self.embedding_size:])
+        return state_part, action_part
 
     def forward_batch(
         self,
         state_features: torch.Tensor,
         action_features: torch.Tensor,
-        action_counts: List[int],
+        action_counts: Any,
     ) -> Tuple[torch.Tensor, torch.Tensor]:
         """
         Batch forward pass for multiple positions with variable action counts.
@@ -70,7 +270,7 @@ class PolicyValueNet(torch.nn.Module):
         Args:
             state_features: (B, state_dim) tensor of state features
             action_features: (total_actions, action_dim) tensor of all action features
-            action_counts: List of action counts per position
+            action_counts: List or 1-D tensor of action counts per position
 
         Returns:
             values: (B,) tensor of value predictions
@@ -80,147 +280,64 @@ class PolicyValueNet(torch.nn.Module):
         embeddings = self.trunk(state_features)  # (B, hidden)
         values = torch.tanh(self.value_head(embeddings)).squeeze(-1)  # (B,)
 
-        # Compute policy logits for all actions
-        # We need to repeat embeddings based on action counts
-        expanded_embeddings = torch.repeat_interleave(
-            embeddings,
-            torch.tensor(action_counts, device=embeddings.device),
+        # policy_input_hidden acts on [embedding, action]. Split its weight so the
+        # state half (plus bias) runs once per position and only the action half
+        # runs per action; the per-position rows are then repeated by action count.
+        state_part, action_part = self.policy_input_parts(embeddings, action_features)  # (B, H), (total_actions, H)
+
+        counts = action_counts if torch.is_tensor(action_counts) else torch.tensor(action_counts)
+        expanded_state = torch.repeat_interleave(
+            state_part,
+            counts.to(device=state_part.device, dtype=torch.long),
             dim=0,
-        )  # (total_actions, hidden)
+        )  # (total_actions, H)
 
-        joint = torch.cat([expanded_embeddings, action_features], dim=1)
-        hidden = torch.tanh(self.policy_input_hidden(joint))
+        hidden = torch.tanh(expanded_state + action_part)
         hidden = torch.tanh(self.policy_hidden(hidden))
         logits = (hidden @ self.policy_output_weights + self.policy_bias) * self.policy_scale  # (total_actions,)
 
         return values, logits
 
+    def forward(
+        self,
+        state_features: torch.Tensor,
+        action_features: torch.Tensor,
+        row_position: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Row-indexed variant of forward_batch: row_position[i] is the position that
+        action row i belongs to. All shapes are static, so this is the function the
+        fused multi-model path vmaps over (padding rows point at position 0 and are
+        dropped by the caller).
+        """
+        embeddings = self.trunk(state_features)
+        values = torch.tanh(self.value_head(embeddings)).squeeze(-1)
+        state_part, action_part = self.policy_input_parts(embeddings, action_features)
+        hidden = torch.tanh(state_part.index_select(0, row_position) + action_part)
+        hidden = torch.tanh(self.policy_hidden(hidden))
+        logits = (hidden @ self.policy_output_weights + self.policy_bias) * self.policy_scale
+        return values, logits
+
+
+def load_model(
+    path: str,
+    device: torch.device,
+    int8_tolerance: Optional[float] = None,
+) -> Tuple[PolicyValueNet, Dict[str, Any]]:
+    """
+    Load a model, memory-mapping its binary sidecar when present (JSON otherwise).
 
-def load_model(path: str, device: torch.device) -> Tuple[PolicyValueNet, Dict[str, Any]]:
-    """Load model from JSON file."""
-    with open(path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    With int8_tolerance set and a CPU device, the model is swapped for a dynamic
+    int8 copy if it passes the parity check (see quantize_for_cpu).
+    """
+    data, artifact = read_model_payload(path)
 
     state_size = len(data.get('stateFeatureNames', []))
     action_size = len(data.get('actionFeatureNames', []))
-    trunk_layers = data.get('stateTrunk', [])
-    hidden = [layer['outputSize'] for layer in trunk_layers]
+    hidden = [layer['outputSize'] for layer in data.get('stateTrunk', [])]
 
     model = PolicyValueNet(state_size, action_size, hidden).to(device)
-
-    # Load trunk weights
-    trunk_linears = [m for m in model.trunk if isinstance(m, torch.nn.Linear)]
-    for i, linear in enumerate(trunk_linears):
-        layer_data = trunk_layers[i]
-        weights = torch.tensor(layer_data['weights'], dtype=torch.float32)
-        bias = torch.tensor(layer_data['bias'], dtype=torch.float32)
-        with torch.no_grad():
-            linear.weight.copy_(weights.reshape(layer_data['outputSize'], layer_data['inputSize']))
-            linear.bias.copy_(bias)
-
-    # Load value head
-    value_head = data.get('valueHead', {})
-    with torch.no_grad():
-        model.value_head.weight.copy_(
-            torch.tensor(value_head['weights'], dtype=torch.float32).reshape(1, -1)
-        )
-        model.value_head.bias.copy_(
-            torch.tensor([value_head['bias']], dtype=torch.float32)
-        )
-
-    # Load policy head
-    policy_head = data.get('policyHead', {})
-    with torch.no_grad():
-        model.policy_bias.copy_(
-            torch.tensor([policy_head['bias']], dtype=torch.float32)
-        )
-        model.policy_scale.copy_(
-            torch.tensor([float(policy_head.get('actionScale', 1.0))], dtype=torch.float32)
-        )
-        state_hidden_weights = policy_head.get('stateHiddenWeights')
-        action_hidden_weights = policy_head.get('actionHiddenWeights')
-        hidden_bias = policy_head.get('hiddenBias')
-        input_weights = policy_head.get('inputWeights')
-        input_bias = policy_head.get('inputBias')
-        hidden_weights = policy_head.get('hiddenWeights')
-        hidden_layer_bias = policy_head.get('hiddenLayerBias')
-        input_hidden_size = policy_head.get('inputHiddenSize')
-        output_weights = policy_head.get('outputWeights')
-        hidden_size = policy_head.get('hiddenSize')
-        legacy_action_weights = policy_head.get('actionWeights')
-        legacy_context_weights = policy_head.get('contextWeights')
-        legacy_state_weights = policy_head.get('stateWeights')
-
-        if (
-            isinstance(input_hidden_size, int)
-            and input_hidden_size == model.policy_hidden_size
-            and isinstance(hidden_size, int)
-            and hidden_size == model.policy_hidden_size
-            and isinstance(input_weights, list)
-            and len(input_weights) == model.policy_input_hidden.in_features * model.policy_input_hidden.out_features
-            and isinstance(input_bias, list)
-            and len(input_bias) == model.policy_input_hidden.out_features
-            and isinstance(hidden_weights, list)
-            and len(hidden_weights) == model.policy_hidden.in_features * model.policy_hidden.out_features
-            and isinstance(hidden_layer_bias, list)
-            and len(hidden_layer_bias) == model.policy_hidden.out_features
-            and isinstance(output_weights, list)
-            and len(output_weights) == model.policy_hidden_size
-        ):
-            model.policy_input_hidden.weight.copy_(
-                torch.tensor(input_weights, dtype=torch.float32).reshape(
-                    model.policy_input_hidden.out_features,
-                    model.policy_input_hidden.in_features,
-                )
-            )
-            model.policy_input_hidden.bias.copy_(torch.tensor(input_bias, dtype=torch.float32))
-            model.policy_hidden.weight.copy_(
-                torch.tensor(hidden_weights, dtype=torch.float32).reshape(
-                    model.policy_hidden.out_features,
-                    model.policy_hidden.in_features,
-                )
-            )
-            model.policy_hidden.bias.copy_(torch.tensor(hidden_layer_bias, dtype=torch.float32))
-            model.policy_output_weights.copy_(torch.tensor(output_weights, dtype=torch.float32))
-        elif (
-            isinstance(hidden_size, int)
-            and hidden_size == model.policy_hidden_size
-            and isinstance(state_hidden_weights, list)
-            and len(state_hidden_weights) == model.embedding_size * model.policy_hidden_size
-            and isinstance(action_hidden_weights, list)
-            and len(action_hidden_weights) == action_size * model.policy_hidden_size
-            and isinstance(hidden_bias, list)
-            and len(hidden_bias) == model.policy_hidden_size
-            and isinstance(output_weights, list)
-            and len(output_weights) == model.policy_hidden_size
-        ):
-            model.policy_input_hidden.weight.zero_()
-            model.policy_input_hidden.weight[:, :model.embedding_size].copy_(
-                torch.tensor(state_hidden_weights, dtype=torch.float32).reshape(model.policy_hidden_size, model.embedding_size)
-            )
-            model.policy_input_hidden.weight[:, model.embedding_size:].copy_(
-                torch.tensor(action_hidden_weights, dtype=torch.float32).reshape(model.policy_hidden_size, action_size)
-            )
-            model.policy_input_hidden.bias.copy_(torch.tensor(hidden_bias, dtype=torch.float32))
-            model.policy_hidden.weight.zero_()
-            model.policy_hidden.bias.zero_()
-            model.policy_hidden.weight.copy_(torch.eye(model.policy_hidden_size, dtype=torch.float32))
-            model.policy_output_weights.copy_(torch.tensor(output_weights, dtype=torch.float32))
-        else:
-            model.policy_input_hidden.weight.zero_()
-            model.policy_input_hidden.bias.zero_()
-            model.policy_hidden.weight.zero_()
-            model.policy_hidden.bias.zero_()
-            model.policy_output_weights.zero_()
-            if isinstance(legacy_action_weights, list) and len(legacy_action_weights) == action_size:
-                model.policy_input_hidden.weight[0, model.embedding_size:].copy_(torch.tensor(legacy_action_weights, dtype=torch.float32))
-            if isinstance(legacy_state_weights, list) and len(legacy_state_weights) > 0:
-                model.policy_input_hidden.bias[0] = float(sum(float(v) for v in legacy_state_weights) / len(legacy_state_weights))
-            elif isinstance(legacy_context_weights, list) and len(legacy_context_weights) > 0:
-                model.policy_input_hidden.bias[0] = float(sum(float(v) for v in legacy_context_weights) / len(legacy_context_weights))
-            model.policy_hidden.weight[0, 0] = 1.0
-            model.policy_output_weights[0] = 1.0
-
+    load_policy_value_weights(model, data)
     model.eval()
 
     meta = {
@@ -228,25 +345,466 @@ def load_model(path: str, device: torch.device) -> Tuple[PolicyValueNet, Dict[st
         'action_size': action_size,
         'hidden': hidden,
         'device': str(device),
+        'artifact_source': artifact['source'],
+        'artifact_load_ms': artifact['loadMs'],
     }
+    if int8_tolerance is not None and device.type == 'cpu':
+        model, meta['int8'] = quantize_for_cpu(model, int8_tolerance)
     return model, meta
 
 
-def emit_response(request_id: Any, ok: bool, payload: Optional[Dict] = None, error: Optional[str] = None):
-    """Send response to stdout."""
-    msg = {'id': request_id, 'ok': ok}
-    if payload is not None:
-        msg['payload'] = payload
-    if error is not None:
-        msg['error'] = error
-    sys.stdout.write(json.dumps(msg))
-    sys.stdout.write('\n')
-    sys.stdout.flush()
+def quantize_for_cpu(model: PolicyValueNet, tolerance: float) -> Tuple[PolicyValueNet, Dict[str, Any]]:
+    """
+    Dynamic int8 copy of the trunk and policy Linears, used only when its
+    worst-case value and logit error against fp32 on a seeded synthetic batch
+    stay within tolerance. Returns (model to serve, parity report).
+    """
+    report: Dict[str, Any] = {'enabled': False, 'tolerance': tolerance}
+    started = time.perf_counter()
+    try:
+        quantization = torch.ao.quantization
+        quantized = copy.deepcopy(model)
+        quantized.split_policy_input()
+        qconfig = quantization.default_dynamic_qconfig
+        quantized = quantization.quantize_dynamic(
+            quantized,
+            {name: qconfig for name in ('trunk', 'policy_state_input', 'policy_action_input', 'policy_hidden')},
+        )
+        quantized.eval()
+    except Exception as e:
+        report['reason'] = f"quantize_dynamic failed: {type(e).__name__}: {e}"
+        emit_log(f"int8 disabled: {report['reason']}")
+        return model, report
+
+    generator = torch.Generator().manual_seed(0)
+    counts = torch.randint(1, INT8_PARITY_MAX_ACTIONS + 1, (INT8_PARITY_POSITIONS,), generator=generator)
+    state = torch.rand(INT8_PARITY_POSITIONS, model.trunk[0].in_features if len(model.trunk) else model.embedding_size,
+                       generator=generator)
+    actions = torch.rand(int(counts.sum()), model.policy_input_size - model.embedding_size, generator=generator)
+    with torch.inference_mode():
+        reference_values, reference_logits = model.forward_batch(state, actions, counts)
+        values, logits = quantized.forward_batch(state, actions, counts)
+    report['maxValueError'] = float((values - reference_values).abs().max())
+    report['maxLogitError'] = float((logits - reference_logits).abs().max())
+    report['parityMs'] = (time.perf_counter() - started) * 1000.0
+    report['enabled'] = max(report['maxValueError'], report['maxLogitError']) <= tolerance
+    if not report['enabled']:
+        report['reason'] = 'parity error above tolerance'
+    emit_log(
+        f"int8 parity: value_err={report['maxValueError']:.4g} logit_err={report['maxLogitError']:.4g} "
+        f"tolerance={tolerance:g} -> {'int8' if report['enabled'] else 'fp32'}"
+    )
+    return (quantized if report['enabled'] else model), report
+
+
+INFER_PHASES = ('decode', 'tensor_build', 'forward', 'd2h', 'encode')
+THROUGHPUT_WINDOWS_SEC = (10.0, 60.0)
+
+
+class RollingHistogram:
+    """The most recent latency samples of one phase; percentiles are computed on read."""
+
+    def __init__(self, capacity: int = 2048):
+        self.samples: 'collections.deque[float]' = collections.deque(maxlen=capacity)
+        self.count = 0
+
+    def add(self, value_ms: float) -> None:
+        self.samples.append(value_ms)
+        self.count += 1
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {'count': self.count, 'window': 0}
+
+        def percentile(q: float) -> float:
+            return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+        return {
+            'count': self.count,
+            'window': len(ordered),
+            'meanMs': sum(ordered) / len(ordered),
+            'p50Ms': percentile(0.50),
+            'p90Ms': percentile(0.90),
+            'p99Ms': percentile(0.99),
+            'maxMs': ordered[-1],
+        }
 
 
-def emit_log(message: str):
-    """Log to stderr."""
-    print(f"[gpu-server] {message}", file=sys.stderr, flush=True)
+class ThroughputWindow:
+    """Positions and actions served, bucketed per second, over the longest reporting window."""
+
+    def __init__(self, horizon_sec: float = max(THROUGHPUT_WINDOWS_SEC)):
+        self.horizon_sec = horizon_sec
+        self.buckets: 'collections.deque[List[float]]' = collections.deque()
+        self.started_at = time.monotonic()
+
+    def add(self, positions: int, actions: int, now: float) -> None:
+        second = math.floor(now)
+        if self.buckets and self.buckets[-1][0] == second:
+            self.buckets[-1][1] += positions
+            self.buckets[-1][2] += actions
+        else:
+            self.buckets.append([second, positions, actions])
+        self._prune(now)
+
+    def rates(self, now: float) -> Dict[str, Dict[str, float]]:
+        self._prune(now)
+        rates: Dict[str, Dict[str, float]] = {}
+        for window in THROUGHPUT_WINDOWS_SEC:
+            span = min(window, max(1.0, now - self.started_at))
+            positions = sum(bucket[1] for bucket in self.buckets if bucket[0] > now - window)
+            actions = sum(bucket[2] for bucket in self.buckets if bucket[0] > now - window)
+            rates[f'{window:g}s'] = {'positionsPerSec': positions / span, 'actionsPerSec': actions / span}
+        return rates
+
+    def _prune(self, now: float) -> None:
+        while self.buckets and self.buckets[0][0] <= now - self.horizon_sec:
+            self.buckets.popleft()
+
+
+class InferMetrics:
+    """
+    Per-model phase latencies and throughput.
+
+    The serving thread add()s phase time while it handles one infer call (or one
+    daemon flush) and commit()s once, so each call contributes a single sample
+    per phase. observe() records a standalone sample from any thread (decode runs
+    on the reader threads).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Dict[str, RollingHistogram]] = {}
+        self.throughput: Dict[str, ThroughputWindow] = {}
+        self.total_throughput = ThroughputWindow()
+        self.current: Dict[Tuple[str, str], float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, model_key: str, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(model_key, name, (time.perf_counter() - started) * 1000.0)
+
+    def add(self, model_key: str, name: str, elapsed_ms: float) -> None:
+        slot = (model_key, name)
+        self.current[slot] = self.current.get(slot, 0.0) + elapsed_ms
+
+    def add_shared(self, name: str, elapsed_ms: float, positions_by_key: Dict[str, int]) -> None:
+        """Split time spent on a whole mixed-model batch across keys by position count."""
+        total = sum(positions_by_key.values())
+        for model_key, positions in positions_by_key.items():
+            if total > 0:
+                self.add(model_key, name, elapsed_ms * positions / total)
+
+    def commit(self) -> None:
+        samples, self.current = self.current, {}
+        with self.lock:
+            for (model_key, name), elapsed_ms in samples.items():
+                self._histogram(model_key, name).add(elapsed_ms)
+
+    def observe(self, model_key: str, name: str, elapsed_ms: float) -> None:
+        with self.lock:
+            self._histogram(model_key, name).add(elapsed_ms)
+
+    def record_throughput(self, model_key: str, positions: int, actions: int) -> None:
+        now = time.monotonic()
+        with self.lock:
+            if model_key not in self.throughput:
+                self.throughput[model_key] = ThroughputWindow()
+            self.throughput[model_key].add(positions, actions, now)
+            self.total_throughput.add(positions, actions, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self.lock:
+            return {
+                'latency': {
+                    model_key: {
+                        name: phases[name].summary()
+                        for name in INFER_PHASES
+                        if name in phases
+                    }
+                    for model_key, phases in self.histograms.items()
+                },
+                'throughput': {
+                    'all': self.total_throughput.rates(now),
+                    **{model_key: window.rates(now) for model_key, window in self.throughput.items()},
+                },
+            }
+
+    def _histogram(self, model_key: str, name: str) -> RollingHistogram:
+        phases = self.histograms.setdefault(model_key, {})
+        if name not in phases:
+            phases[name] = RollingHistogram()
+        return phases[name]
+
+
+def position_digest(state: Any, actions: Any, state_dim: int, action_count: int, action_dim: int) -> bytes:
+    """Digest of one position's float32 feature bytes (state and actions are buffers)."""
+    digest = hashlib.blake2b(POSITION_DIGEST_PREFIX.pack(state_dim, action_count, action_dim), digest_size=16)
+    digest.update(state)
+    digest.update(actions)
+    return digest.digest()
+
+
+class ResultCache:
+    """LRU of per-position (value, logits) results bounded by an approximate byte budget."""
+
+    # Key tuple, digest, float and OrderedDict slot, roughly.
+    ENTRY_OVERHEAD_BYTES = 200
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max(0, int(max_bytes))
+        self.entries: 'collections.OrderedDict[Tuple[str, int, bytes], Tuple[float, torch.Tensor]]' = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @classmethod
+    def entry_size(cls, logits: torch.Tensor) -> int:
+        return cls.ENTRY_OVERHEAD_BYTES + 4 * logits.numel()
+
+    def get(self, key: Tuple[str, int, bytes]) -> Optional[Tuple[float, torch.Tensor]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Tuple[str, int, bytes], value: float, logits: torch.Tensor) -> None:
+        size = self.entry_size(logits)
+        if size > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= self.entry_size(previous[1])
+        self.entries[key] = (value, logits)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= self.entry_size(evicted)
+            self.evictions += 1
+
+    def invalidate(self, model_key: str) -> None:
+        stale = [key for key in self.entries if key[0] == model_key]
+        for key in stale:
+            _, logits = self.entries.pop(key)
+            self.bytes -= self.entry_size(logits)
+        self.invalidated += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'maxBytes': self.max_bytes,
+            'bytes': self.bytes,
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidated': self.invalidated,
+        }
+
+
+class DedupStats:
+    """Counters for collapsing identical positions inside a batch before the forward."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.positions = 0
+        self.unique_positions = 0
+        self.batches = 0
+        self.batches_with_duplicates = 0
+        self.last_batch: Dict[str, Any] = {}
+
+    def record(self, positions: int, unique_positions: int) -> Dict[str, Any]:
+        """Count one batch and return its per-response summary."""
+        self.positions += positions
+        self.unique_positions += unique_positions
+        self.batches += 1
+        if unique_positions < positions:
+            self.batches_with_duplicates += 1
+        self.last_batch = {
+            'positions': positions,
+            'uniquePositions': unique_positions,
+            'dedupRatio': 1.0 - unique_positions / positions if positions else 0.0,
+        }
+        return self.last_batch
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'positions': self.positions,
+            'uniquePositions': self.unique_positions,
+            'duplicatesSkipped': self.positions - self.unique_positions,
+            'dedupRatio': 1.0 - self.unique_positions / self.positions if self.positions else 0.0,
+            'batches': self.batches,
+            'batchesWithDuplicates': self.batches_with_duplicates,
+            'lastBatch': self.last_batch,
+        }
+
+
+def parse_shape_buckets(spec: str) -> List[Tuple[int, int]]:
+    """Parse "8x1024,32x4096" into sorted (positions, action rows) buckets; empty disables bucketing."""
+    buckets = set()
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        positions, _, rows = item.lower().partition('x')
+        try:
+            bucket = (int(positions), int(rows))
+        except ValueError:
+            raise ValueError(f"Invalid shape bucket {item!r} (expected POSITIONSxACTIONS)") from None
+        if bucket[0] <= 0 or bucket[1] <= 0:
+            raise ValueError(f"Invalid shape bucket {item!r} (sizes must be positive)")
+        buckets.add(bucket)
+    return sorted(buckets)
+
+
+def bucket_label(bucket: Tuple[int, int]) -> str:
+    return f"{bucket[0]}x{bucket[1]}"
+
+
+class ShapeBuckets:
+    """
+    Fixed (positions, action rows) shapes for the row-indexed forward.
+
+    Batches are padded up to the smallest bucket that holds them, so the compiled
+    or traced forward only ever sees len(buckets) shapes per model. Backends are
+    tried in BACKENDS order starting from the requested one: a backend that fails
+    on a bucket's first call is dropped for every model and the call is retried
+    on the next one ('trace' runs in float32; 'eager' is the plain module).
+    """
+
+    BACKENDS = ('compile', 'trace', 'eager')
+
+    def __init__(self, buckets: List[Tuple[int, int]], backend: str = 'compile'):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown bucket backend: {backend}")
+        if backend == 'compile' and not hasattr(torch, 'compile'):
+            backend = 'trace'
+        self.buckets = buckets
+        self.backend = backend
+        self.functions: Dict[Tuple[str, int, Optional[Tuple[int, int]]], Callable[..., Any]] = {}
+        self.warmed: set = set()
+        self.fallbacks: List[str] = []
+        self.usage: Dict[str, Dict[str, int]] = {}
+        self.overflow_count = 0
+        self.warmup_ms: Dict[str, float] = {}
+
+    def select(self, positions: int, rows: int) -> Optional[Tuple[int, int]]:
+        for bucket in self.buckets:
+            if positions <= bucket[0] and rows <= bucket[1]:
+                return bucket
+        return None
+
+    def function(
+        self,
+        model_key: str,
+        generation: int,
+        model: PolicyValueNet,
+        bucket: Tuple[int, int],
+        example: Tuple[torch.Tensor, torch.Tensor, torch.Tensor],
+    ) -> Callable[..., Any]:
+        # torch.compile specializes one graph per input shape behind a single
+        # wrapper; jit.trace needs its own trace per bucket.
+        slot = (model_key, generation, bucket if self.backend == 'trace' else None)
+        function = self.functions.get(slot)
+        if function is None:
+            if self.backend == 'compile':
+                function = torch.compile(model, dynamic=False)
+            elif self.backend == 'trace':
+                with torch.inference_mode(False), torch.no_grad():
+                    function = torch.jit.trace(model, example, check_trace=False)
+            else:
+                function = model
+            self.functions[slot] = function
+        return function
+
+    def is_warm(self, model_key: str, generation: int, bucket: Tuple[int, int]) -> bool:
+        return (model_key, generation, bucket) in self.warmed
+
+    def mark_warm(self, model_key: str, generation: int, bucket: Tuple[int, int]) -> None:
+        self.warmed.add((model_key, generation, bucket))
+
+    def demote(self, error: Exception) -> bool:
+        """Fall back to the next backend after a compile/trace failure; False once eager failed too."""
+        index = self.BACKENDS.index(self.backend)
+        if index + 1 >= len(self.BACKENDS):
+            return False
+        emit_log(f"Shape-bucket backend {self.backend} failed ({type(error).__name__}: {error}); "
+                 f"falling back to {self.BACKENDS[index + 1]}")
+        self.fallbacks.append(f"{self.backend}: {type(error).__name__}")
+        self.backend = self.BACKENDS[index + 1]
+        self.functions.clear()
+        self.warmed.clear()
+        return True
+
+    def forget(self, model_key: str) -> None:
+        for slot in [slot for slot in self.functions if slot[0] == model_key]:
+            del self.functions[slot]
+        self.warmed = {entry for entry in self.warmed if entry[0] != model_key}
+
+    def record(self, bucket: Optional[Tuple[int, int]], positions: int, rows: int) -> str:
+        if bucket is None:
+            self.overflow_count += 1
+            return 'overflow'
+        label = bucket_label(bucket)
+        usage = self.usage.setdefault(
+            label,
+            {'batches': 0, 'positions': 0, 'paddedPositions': 0, 'actionRows': 0, 'paddedActionRows': 0},
+        )
+        usage['batches'] += 1
+        usage['positions'] += positions
+        usage['paddedPositions'] += bucket[0] - positions
+        usage['actionRows'] += rows
+        usage['paddedActionRows'] += bucket[1] - rows
+        return label
+
+    def stats(self) -> Dict[str, Any]:
+        by_bucket = {}
+        for bucket in self.buckets:
+            label = bucket_label(bucket)
+            usage = dict(self.usage.get(label, {'batches': 0, 'positions': 0, 'paddedPositions': 0,
+                                                 'actionRows': 0, 'paddedActionRows': 0}))
+            position_slots = usage['positions'] + usage['paddedPositions']
+            row_slots = usage['actionRows'] + usage['paddedActionRows']
+            usage['positionPaddingRatio'] = usage['paddedPositions'] / position_slots if position_slots else 0.0
+            usage['actionPaddingRatio'] = usage['paddedActionRows'] / row_slots if row_slots else 0.0
+            if label in self.warmup_ms:
+                usage['warmupMs'] = self.warmup_ms[label]
+            by_bucket[label] = usage
+        return {
+            'enabled': True,
+            'backend': self.backend,
+            'fallbacks': list(self.fallbacks),
+            'buckets': by_bucket,
+            'overflowBatches': self.overflow_count,
+        }
+
+
+def model_resident_bytes(model: torch.nn.Module) -> int:
+    """Bytes held by a model's parameters and buffers, int8 packed weights included."""
+    total = 0
+    for value in model.state_dict().values():
+        items = value if isinstance(value, tuple) else (value,)
+        for item in items:
+            if isinstance(item, torch.Tensor):
+                total += item.numel() * item.element_size()
+    return total
 
 
 def adapt_action_features(features: List[float], expected_size: int) -> List[float]:
@@ -255,10 +813,138 @@ def adapt_action_features(features: List[float], expected_size: int) -> List[flo
     return features + [0.0] * (expected_size - len(features))
 
 
+def adapt_action_tensor(actions: torch.Tensor, expected_size: int) -> torch.Tensor:
+    if actions.shape[1] == expected_size:
+        return actions
+    if actions.shape[1] > expected_size:
+        return actions[:, :expected_size]
+    return F.pad(actions, (0, expected_size - actions.shape[1]))
+
+
+def segment_row_indices(offsets: torch.Tensor, counts: torch.Tensor, selected: torch.Tensor) -> torch.Tensor:
+    """Flattened action-row indices for the selected positions of a packed batch."""
+    selected_counts = counts[selected]
+    total = int(selected_counts.sum().item()) if selected_counts.numel() else 0
+    if total == 0:
+        return torch.empty(0, dtype=torch.long)
+    selected_starts = offsets[selected]
+    local_starts = torch.cumsum(selected_counts, dim=0) - selected_counts
+    return (
+        torch.arange(total, dtype=torch.long)
+        + torch.repeat_interleave(selected_starts - local_starts, selected_counts)
+    )
+
+
+class PendingReload:
+    """A reload being built off the request path."""
+
+    def __init__(self, model_key: str, model_path: str, device: torch.device, reply: Callable[..., None]):
+        self.model_key = model_key
+        self.model_path = model_path
+        self.device = device
+        self.reply = reply
+        self.requested_at = time.perf_counter()
+        self.model: Optional[PolicyValueNet] = None
+        self.meta: Optional[Dict[str, Any]] = None
+        self.error: Optional[Exception] = None
+        self.load_ms = 0.0
+
+
+class BackgroundModelLoader:
+    """Builds models on a worker thread; finished loads wait in `ready` until swapped in."""
+
+    def __init__(self, int8_tolerance: Optional[float] = None):
+        self.int8_tolerance = int8_tolerance
+        self.jobs: 'queue.Queue[PendingReload]' = queue.Queue()
+        self.ready: 'queue.Queue[PendingReload]' = queue.Queue()
+        self.notify: Optional[Callable[[], None]] = None
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    def submit(self, job: PendingReload) -> None:
+        with self.lock:
+            self.in_flight += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='model-loader', daemon=True)
+                self.thread.start()
+        self.jobs.put(job)
+
+    def pending(self) -> int:
+        with self.lock:
+            return self.in_flight
+
+    def finished(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+    def _run(self) -> None:
+        while True:
+            job = self.jobs.get()
+            started = time.perf_counter()
+            try:
+                with self._stream_context(job.device):
+                    job.model, job.meta = load_model(job.model_path, job.device, self.int8_tolerance)
+                    if job.device.type == 'cuda':
+                        # Weights were copied on a side stream; make them visible before the swap.
+                        torch.cuda.current_stream(job.device).synchronize()
+            except Exception as e:
+                job.error = e
+            job.load_ms = (time.perf_counter() - started) * 1000.0
+            self.ready.put(job)
+            if self.notify is not None:
+                self.notify()
+
+    @staticmethod
+    def _stream_context(device: torch.device):
+        if device.type == 'cuda':
+            return torch.cuda.stream(torch.cuda.Stream(device))
+        return contextlib.nullcontext()
+
+
+class PackedGroup:
+    """One model key's slice of a packed batch (selected/action_index are None when it is the whole batch)."""
+
+    __slots__ = ('selected', 'action_index', 'state_rows', 'action_rows', 'counts')
+
+    def __init__(
+        self,
+        selected: Optional[torch.Tensor],
+        action_index: Optional[torch.Tensor],
+        state_rows: torch.Tensor,
+        action_rows: torch.Tensor,
+        counts: torch.Tensor,
+    ):
+        self.selected = selected
+        self.action_index = action_index
+        self.state_rows = state_rows
+        self.action_rows = action_rows
+        self.counts = counts
+
+
 class InferenceServer:
     """GPU inference server for batched neural network evaluation."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        shared: bool = False,
+        cache_bytes: int = 0,
+        fused_forward: bool = True,
+        shape_buckets: Optional[ShapeBuckets] = None,
+        warmup_on_load: bool = False,
+        int8_tolerance: Optional[float] = None,
+        dedup: bool = True,
+        model_budget_bytes: int = 0,
+    ):
+        self.shared = shared
+        self.shape_buckets = shape_buckets
+        self.warmup_on_load = warmup_on_load and shape_buckets is not None
+        self.batch_buckets: List[str] = []
+        self.fused_forward = fused_forward and hasattr(torch, 'func') and hasattr(torch, 'vmap')
+        self.stacked_models: 'collections.OrderedDict[Tuple[Tuple[str, int], ...], Tuple[Callable[..., Any], Dict[str, torch.Tensor], Dict[str, torch.Tensor]]]' = collections.OrderedDict()
+        self.fused_forward_count = 0
+        self.fused_model_count = 0
+        self.daemon: Optional['SocketDaemon'] = None
         self.models: Dict[str, PolicyValueNet] = {}
         self.model_meta: Dict[str, Dict[str, Any]] = {}
         self.device: Optional[torch.device] = None
@@ -267,56 +953,216 @@ class InferenceServer:
         self.total_actions = 0
         self.total_batches = 0
         self.max_batch_size_seen = 0
+        self.binary_inference_count = 0
         self.per_model_request_count: Dict[str, int] = {}
         self.per_model_position_count: Dict[str, int] = {}
+        self.int8_tolerance = int8_tolerance
+        self.loader = BackgroundModelLoader(int8_tolerance)
+        self.model_generation: Dict[str, int] = {}
+        # Registry memory: least recently used keys first; evicted keys remember their modelPath.
+        self.model_budget_bytes = max(0, int(model_budget_bytes))
+        self.model_bytes: Dict[str, int] = {}
+        self.model_use_order: 'collections.OrderedDict[str, float]' = collections.OrderedDict()
+        self.evicted_models: Dict[str, str] = {}
+        # Copy of the registry the metrics dumper reads; only the serving thread rebinds it.
+        self.registry_snapshot: Dict[str, Any] = {'loadedModelKeys': [], 'modelGeneration': {}}
+        self.model_eviction_count = 0
+        self.lazy_reload_count = 0
+        self.swap_count = 0
+        self.last_swap_latency_ms: Optional[float] = None
+        self.max_swap_latency_ms = 0.0
+        self.last_swap_load_ms: Optional[float] = None
+        self.metrics = InferMetrics()
+        self.cache = ResultCache(cache_bytes)
+        self.dedup = DedupStats(dedup)
+        self.batch_dedup: Optional[Dict[str, Any]] = None
+        self.noise_rng = random.Random()
+        self.startup_ms: Optional[float] = None
+
+    def set_swap_notify(self, notify: Callable[[], None]) -> None:
+        """Register how the loader wakes the serving thread when a reload is ready."""
+        self.loader.notify = notify
 
     def handle_init(self, payload: Dict) -> Dict:
         """Initialize model from file."""
-        device_str = payload.get('device', 'auto')
-        if device_str == 'auto':
-            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        else:
-            self.device = torch.device(device_str)
-
+        if not self.shared:
+            self.device = None
+        self._ensure_device(payload)
         return self._load_model(payload, replace=True)
 
     def handle_load_model(self, payload: Dict) -> Dict:
         """Load a model under a registry key."""
         return self._load_model(payload, replace=False)
 
-    def _load_model(self, payload: Dict, replace: bool) -> Dict:
+    def _ensure_device(self, payload: Dict) -> torch.device:
+        device_str = payload.get('device', 'auto')
         if self.device is None:
-            device_str = payload.get('device', 'auto')
             if device_str == 'auto':
                 self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
             else:
                 self.device = torch.device(device_str)
-
+        elif self.shared and device_str != 'auto':
+            # The daemon's device is fixed by --device; one client cannot move every other client's models.
+            requested = torch.device(device_str)
+            if requested.type != self.device.type or (
+                requested.index is not None and requested.index != (self.device.index or 0)
+            ):
+                raise ValueError(f"Daemon runs on {self.device}; refusing device {device_str}")
+        return self.device
+
+    @staticmethod
+    def _model_target(payload: Dict) -> Tuple[str, str]:
         model_path = payload.get('modelPath')
         if not model_path:
             raise ValueError("modelPath required")
+        return str(payload.get('modelKey') or 'default'), os.path.abspath(model_path)
+
+    def handle_unload_model(self, payload: Dict) -> Dict:
+        """Drop a model key from the registry; unlike an eviction it is not reloaded on next use."""
         model_key = str(payload.get('modelKey') or 'default')
+        if model_key not in self.models and model_key not in self.evicted_models:
+            raise ValueError(f"Unknown model key: {model_key}")
+        freed = self.model_bytes.get(model_key, 0)
+        if model_key in self.models:
+            self._release_model(model_key)
+        self.evicted_models.pop(model_key, None)
+        emit_log(f"Unloaded model[{model_key}] ({freed / (1024 * 1024):.1f}MB)")
+        return {
+            'status': 'unloaded',
+            'modelKey': model_key,
+            'freedBytes': freed,
+            'loadedModelKeys': sorted(self.models.keys()),
+        }
+
+    def _release_model(self, model_key: str) -> None:
+        """Remove a resident model and everything derived from it."""
+        self._forget_derived_state(model_key)
+        del self.models[model_key]
+        del self.model_meta[model_key]
+        self.model_bytes.pop(model_key, None)
+        self.model_use_order.pop(model_key, None)
+        self._publish_registry()
+        if self.device is not None and self.device.type == 'cuda':
+            torch.cuda.empty_cache()
+
+    def _forget_derived_state(self, model_key: str) -> None:
+        self.cache.invalidate(model_key)
+        if self.shape_buckets is not None:
+            self.shape_buckets.forget(model_key)
+        for stacked_key in [key for key in self.stacked_models if any(entry[0] == model_key for entry in key)]:
+            del self.stacked_models[stacked_key]
+
+    def _enforce_model_budget(self, protected: Set[str]) -> None:
+        """Evict least recently used keys outside protected until the registry fits the budget."""
+        if not self.model_budget_bytes:
+            return
+        while sum(self.model_bytes.values()) > self.model_budget_bytes:
+            victim = next((model_key for model_key in self.model_use_order if model_key not in protected), None)
+            if victim is None:
+                emit_log(
+                    f"Model registry ({sum(self.model_bytes.values()) / (1024 * 1024):.1f}MB) exceeds the "
+                    f"{self.model_budget_bytes / (1024 * 1024):.1f}MB budget with only in-use keys resident"
+                )
+                return
+            freed = self.model_bytes.get(victim, 0)
+            self.evicted_models[victim] = self.model_meta[victim]['model_path']
+            self._release_model(victim)
+            self.model_eviction_count += 1
+            emit_log(f"Evicted idle model[{victim}] ({freed / (1024 * 1024):.1f}MB); reloads on next use")
+
+    def _require_models(self, model_keys: List[str]) -> None:
+        """Make every key resident, reloading evicted keys from their remembered modelPath."""
+        needed = set(model_keys)
+        for model_key in sorted(needed):
+            if model_key in self.models:
+                continue
+            model_path = self.evicted_models.get(model_key)
+            if model_path is None:
+                raise ValueError(f"Unknown model key: {model_key}")
+            started = time.perf_counter()
+            model, meta = load_model(model_path, self.device, self.int8_tolerance)
+            self.lazy_reload_count += 1
+            self._install_model(model_key, model_path, model, meta, protected=needed)
+            emit_log(f"Reloaded evicted model[{model_key}] on use ({(time.perf_counter() - started) * 1000.0:.0f}ms)")
+
+    def _load_model(self, payload: Dict, replace: bool, reuse_resident: bool = True) -> Dict:
+        self._ensure_device(payload)
+        model_key, resolved_path = self._model_target(payload)
+        if (
+            reuse_resident
+            and self.shared
+            and model_key in self.models
+            and self.model_meta[model_key].get('model_path') == resolved_path
+        ):
+            return self._ready_payload(model_key)
+        if self.shared and reuse_resident:
+            # Keys are shared by every client: a different modelPath under a resident (or evicted)
+            # key would silently swap another client's model. Explicit reloads still replace.
+            resident_path = (
+                self.model_meta[model_key].get('model_path') if model_key in self.models
+                else self.evicted_models.get(model_key)
+            )
+            if resident_path is not None and resident_path != resolved_path:
+                raise ValueError(
+                    f"Model key {model_key} is already bound to {resident_path}; "
+                    f"use another modelKey for {resolved_path}"
+                )
         if not replace and model_key in self.models:
             raise ValueError(f"Model key already loaded: {model_key}")
 
-        model, meta = load_model(model_path, self.device)
+        model, meta = load_model(resolved_path, self.device, self.int8_tolerance)
+        self._install_model(model_key, resolved_path, model, meta)
+        return self._ready_payload(model_key)
+
+    def _install_model(
+        self,
+        model_key: str,
+        resolved_path: str,
+        model: PolicyValueNet,
+        meta: Dict[str, Any],
+        protected: Optional[Set[str]] = None,
+    ) -> None:
+        # Rebinding the registry entry is the swap: a batch that already looked up
+        # the old model keeps its reference until it returns, then it is freed.
+        generation = self.model_generation.get(model_key, 0) + 1
+        if model_key in self.models:
+            self._forget_derived_state(model_key)
+        meta['model_path'] = resolved_path
+        meta['generation'] = generation
         self.models[model_key] = model
         self.model_meta[model_key] = meta
+        self.model_generation[model_key] = generation
+        self.model_bytes[model_key] = model_resident_bytes(model)
+        self.model_use_order[model_key] = time.time()
+        self.model_use_order.move_to_end(model_key)
+        self.evicted_models.pop(model_key, None)
         self.per_model_request_count.setdefault(model_key, 0)
         self.per_model_position_count.setdefault(model_key, 0)
+        self._publish_registry()
 
         emit_log(
-            f"Loaded model[{model_key}]: state={meta['state_size']} action={meta['action_size']} "
-            f"hidden={meta['hidden']} device={self.device}"
+            f"Loaded model[{model_key}] gen={generation}: state={meta['state_size']} action={meta['action_size']} "
+            f"hidden={meta['hidden']} device={self.device} "
+            f"source={meta['artifact_source']} ({meta['artifact_load_ms']:.1f}ms)"
         )
+        if self.warmup_on_load:
+            self.handle_warmup({'modelKey': model_key})
+        self._enforce_model_budget((protected or set()) | {model_key})
+
+    def _publish_registry(self) -> None:
+        self.registry_snapshot = {
+            'loadedModelKeys': sorted(self.models),
+            'modelGeneration': dict(self.model_generation),
+        }
 
+    def _ready_payload(self, model_key: str) -> Dict[str, Any]:
         return {
             'status': 'ready',
             'modelKey': model_key,
             'device': str(self.device),
             'cuda_available': torch.cuda.is_available(),
             'loadedModelKeys': sorted(self.models.keys()),
-            **meta,
+            **self.model_meta[model_key],
         }
 
     def handle_infer(self, payload: Dict) -> Dict:
@@ -349,109 +1195,863 @@ class InferenceServer:
             ]
         }
         """
-        if not self.models:
-            raise RuntimeError("Model not initialized")
+        positions = payload.get('positions', [])
+        if not positions:
+            return {'results': []}
+        position_keys, values, logits, counts, group_count = self._evaluate_positions(payload)
 
+        encode_started = time.perf_counter()
+        values_list = values.tolist()
+        logits_list = logits.tolist()
+        results = []
+        logit_offset = 0
+        for index, pos in enumerate(positions):
+            results.append({
+                'modelKey': position_keys[index],
+                'value': values_list[index],
+                'actionLogits': {
+                    action['actionKey']: logits_list[logit_offset + action_index]
+                    for action_index, action in enumerate(pos.get('actions', []))
+                },
+            })
+            logit_offset += counts[index]
+        self.metrics.add_shared('encode', (time.perf_counter() - encode_started) * 1000.0,
+                                dict(collections.Counter(position_keys)))
+        return {'results': results, 'stats': self._json_infer_stats(len(positions), group_count)}
+
+    def handle_infer_priors(self, payload: Dict) -> Dict:
+        """
+        Batch inference that returns search priors instead of raw logits.
+
+        Takes the infer payload plus topK, minProb, dirichletAlpha and
+        dirichletEpsilon; positions may set root (bool) and seed (int) to get
+        seeded Dirichlet noise (a root without a seed draws one from the
+        server's generator). Each result is
+        {"modelKey", "value", "actionIndices": [...], "priors": [...]} where
+        actionIndices point into that position's actions list.
+        """
         positions = payload.get('positions', [])
         if not positions:
             return {'results': []}
+        position_keys, values, logits, counts, group_count = self._evaluate_positions(payload)
+
+        encode_started = time.perf_counter()
+        kept_counts, action_index, priors = segment_priors(
+            logits,
+            torch.tensor(counts, dtype=torch.long),
+            int(payload.get('topK', 14)),
+            float(payload.get('minProb', 0.001)),
+            roots=[bool(pos.get('root')) for pos in positions],
+            seeds=position_seeds(positions, self.noise_rng),
+            dirichlet_alpha=float(payload.get('dirichletAlpha', 0.0)),
+            dirichlet_epsilon=float(payload.get('dirichletEpsilon', 0.0)),
+        )
+        values_list = values.tolist()
+        index_list = action_index.tolist()
+        prior_list = priors.tolist()
+        results = []
+        kept_offset = 0
+        for index, kept in enumerate(kept_counts.tolist()):
+            results.append({
+                'modelKey': position_keys[index],
+                'value': values_list[index],
+                'actionIndices': index_list[kept_offset:kept_offset + kept],
+                'priors': prior_list[kept_offset:kept_offset + kept],
+            })
+            kept_offset += kept
+        self.metrics.add_shared('encode', (time.perf_counter() - encode_started) * 1000.0,
+                                dict(collections.Counter(position_keys)))
+        return {'results': results, 'stats': self._json_infer_stats(len(positions), group_count)}
+
+    def handle_infer_board(self, payload: Dict) -> Dict:
+        """
+        Batch inference from compact boards (see board_features.py).
+
+        The server builds the token state and action features for the whole
+        batch in one vectorized pass and evaluates them like a binary frame.
+        Positions may carry their own modelKey. Each result is
+        {"modelKey", "value", "logits": [...]} with one logit per move, in the
+        order of the position's moves.
+        """
+        positions = payload.get('positions', [])
+        if not positions:
+            return {'results': []}
+        if not self.models and not self.evicted_models:
+            raise RuntimeError("Model not initialized")
+        self.batch_buckets = []
+        self.batch_dedup = None
+
+        default_model_key = str(payload.get('modelKey') or 'default')
+        position_keys = [str(pos.get('modelKey') or default_model_key) for pos in positions]
+        self._require_models(position_keys)
+        state_sizes = {self.model_meta[model_key]['state_size'] for model_key in position_keys}
+        if len(state_sizes) != 1:
+            raise ValueError("infer_board positions in one batch must share a state feature size")
+
+        positions_by_key = dict(collections.Counter(position_keys))
+        build_started = time.perf_counter()
+        state, actions, counts = board_batch_features(positions, token_slots_for_state_size(state_sizes.pop()))
+        state_all = torch.from_numpy(state)
+        actions_all = torch.from_numpy(actions)
+        counts_all = torch.from_numpy(counts)
+        self.metrics.add_shared('tensor_build', (time.perf_counter() - build_started) * 1000.0, positions_by_key)
+        if self.cache.enabled:
+            values, logits, group_count = self._infer_packed_cached(state_all, actions_all, counts_all, position_keys)
+        else:
+            values, logits, group_count = self._infer_packed_unique(state_all, actions_all, counts_all, position_keys)
+
+        encode_started = time.perf_counter()
+        values_list = values.tolist()
+        logits_list = logits.tolist()
+        results = []
+        logit_offset = 0
+        for index, count in enumerate(counts.tolist()):
+            results.append({
+                'modelKey': position_keys[index],
+                'value': values_list[index],
+                'logits': logits_list[logit_offset:logit_offset + count],
+            })
+            logit_offset += count
+        self.metrics.add_shared('encode', (time.perf_counter() - encode_started) * 1000.0, positions_by_key)
+        return {'results': results, 'stats': self._json_infer_stats(len(positions), group_count)}
+
+    def _json_infer_stats(self, position_count: int, group_count: int) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            'queueDepth': position_count,
+            'groupCount': group_count,
+            'loadedModelKeys': sorted(self.models.keys()),
+        }
+        if self.shape_buckets is not None:
+            stats['shapeBuckets'] = self.batch_buckets
+        if self.batch_dedup is not None:
+            stats['dedup'] = self.batch_dedup
+        return stats
 
+    def _evaluate_positions(self, payload: Dict) -> Tuple[List[str], torch.Tensor, torch.Tensor, List[int], int]:
+        """
+        Evaluate JSON positions, answering cache hits first.
+
+        Returns (position keys, values[positions], packed logits, action counts,
+        group count) in request order.
+        """
+        if not self.models and not self.evicted_models:
+            raise RuntimeError("Model not initialized")
+        self.batch_buckets = []
+        self.batch_dedup = None
+
+        positions = payload['positions']
         default_model_key = str(payload.get('modelKey') or 'default')
-        indexed_positions_by_key: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        position_keys = [str(pos.get('modelKey') or default_model_key) for pos in positions]
+        self._require_models(position_keys)
+        counts = [len(pos.get('actions', [])) for pos in positions]
+
+        values_out = torch.zeros(len(positions), dtype=torch.float32)
+        logits_parts: List[Optional[torch.Tensor]] = [None] * len(positions)
+        pending = list(range(len(positions)))
+        cache_keys: Dict[int, Tuple[str, int, bytes]] = {}
+        if self.cache.enabled:
+            build_started = time.perf_counter()
+            pending = self._take_cached_positions(positions, position_keys, values_out, logits_parts, cache_keys)
+            self.metrics.add_shared(
+                'tensor_build',
+                (time.perf_counter() - build_started) * 1000.0,
+                dict(collections.Counter(position_keys)),
+            )
+
+        group_count = 0
+        if pending:
+            pending_keys = [position_keys[index] for index in pending]
+            positions_by_key = dict(collections.Counter(pending_keys))
+
+            # Pack every pending position once; _infer_packed groups (or fuses) by key.
+            build_started = time.perf_counter()
+            action_dim = max(self.model_meta[model_key]['action_size'] for model_key in positions_by_key)
+            state_features_list = []
+            action_features_list = []
+            for index in pending:
+                pos = positions[index]
+                state_features_list.append(pos['stateFeatures'])
+                for action in pos.get('actions', []):
+                    action_features_list.append(adapt_action_features(action['actionFeatures'], action_dim))
+            state_all = torch.tensor(state_features_list, dtype=torch.float32)
+            actions_all = torch.tensor(action_features_list, dtype=torch.float32) \
+                if action_features_list else torch.empty(0, action_dim)
+            pending_counts = [counts[index] for index in pending]
+            counts_all = torch.tensor(pending_counts, dtype=torch.long)
+            self.metrics.add_shared('tensor_build', (time.perf_counter() - build_started) * 1000.0, positions_by_key)
+
+            digests = [cache_keys[index][2] for index in pending] if cache_keys else None
+            values, logits, group_count = self._infer_packed_unique(state_all, actions_all, counts_all, pending_keys, digests)
+
+            values_out[torch.tensor(pending, dtype=torch.long)] = values
+            for index, position_logits, value in zip(pending, logits.split(pending_counts), values.tolist()):
+                logits_parts[index] = position_logits
+                if self.cache.enabled:
+                    self.cache.put(cache_keys[index], value, position_logits.clone())
+
+        logits_out = torch.cat(logits_parts) if logits_parts else torch.empty(0)
+        return position_keys, values_out, logits_out, counts, group_count
+
+    def _take_cached_positions(
+        self,
+        positions: List[Dict[str, Any]],
+        position_keys: List[str],
+        values_out: torch.Tensor,
+        logits_parts: List[Optional[torch.Tensor]],
+        cache_keys: Dict[int, Tuple[str, int, bytes]],
+    ) -> List[int]:
+        """Answer JSON positions from the cache; returns the indices that still need a forward."""
+        misses: List[int] = []
         for index, pos in enumerate(positions):
-            model_key = str(pos.get('modelKey') or default_model_key)
+            model_key = position_keys[index]
+            state = array.array('f', pos['stateFeatures'])
+            actions = pos.get('actions', [])
+            action_dim = len(actions[0]['actionFeatures']) if actions else 0
+            action_features = array.array('f')
+            for action in actions:
+                action_features.extend(action['actionFeatures'])
+            digest = position_digest(state, action_features, len(state), len(actions), action_dim)
+            key = (model_key, self.model_generation.get(model_key, 0), digest)
+            entry = self.cache.get(key)
+            if entry is None:
+                cache_keys[index] = key
+                misses.append(index)
+                continue
+            values_out[index] = entry[0]
+            logits_parts[index] = entry[1]
+        return misses
+
+    def handle_infer_binary(self, frame: BinaryInferFrame) -> Dict[str, Any]:
+        """
+        Batch inference for a binary frame.
+
+        The frame tensors are zero-copy views over the receive buffer. Positions
+        use header["modelKeys"][i] when present, otherwise header["modelKey"].
+        Values and logits come back packed as float32 in request order.
+        """
+        return self.handle_infer_binary_batch([frame])[0]
+
+    def handle_infer_binary_batch(self, frames: List[BinaryInferFrame]) -> List[Dict[str, Any]]:
+        """Run several binary frames as one fused batch and split the results per frame."""
+        if not self.models and not self.evicted_models:
+            raise RuntimeError("Model not initialized")
+
+        self.batch_buckets = []
+        self.batch_dedup = None
+        build_started = time.perf_counter()
+        states: List[torch.Tensor] = []
+        actions: List[torch.Tensor] = []
+        counts: List[torch.Tensor] = []
+        position_keys: List[str] = []
+        action_dim = max(frame.action_dim for frame in frames)
+        for frame in frames:
+            state_all, actions_all, counts_all = frame.tensors()
+            if frame.position_count and int(counts_all.sum().item()) != frame.action_total:
+                raise ValueError("Binary frame action counts do not sum to the action total")
+            if frame.state_dim != frames[0].state_dim:
+                raise ValueError("Binary frames in one batch must share a state feature size")
+            states.append(state_all)
+            actions.append(adapt_action_tensor(actions_all, action_dim))
+            counts.append(counts_all)
+            position_keys.extend(self._frame_model_keys(frame))
+        self._require_models(position_keys)
+
+        state_all = states[0] if len(states) == 1 else torch.cat(states, dim=0)
+        actions_all = actions[0] if len(actions) == 1 else torch.cat(actions, dim=0)
+        counts_all = counts[0] if len(counts) == 1 else torch.cat(counts, dim=0)
+        positions_by_key = dict(collections.Counter(position_keys))
+        self.metrics.add_shared('tensor_build', (time.perf_counter() - build_started) * 1000.0, positions_by_key)
+        if self.cache.enabled:
+            values_out, logits_out, group_count = self._infer_packed_cached(state_all, actions_all, counts_all, position_keys)
+        else:
+            values_out, logits_out, group_count = self._infer_packed_unique(state_all, actions_all, counts_all, position_keys)
+
+        encode_started = time.perf_counter()
+        values_bytes = values_out.contiguous().numpy().astype('<f4', copy=False).tobytes()
+        logits_bytes = logits_out.contiguous().numpy().astype('<f4', copy=False).tobytes()
+        results: List[Dict[str, Any]] = []
+        position_offset = 0
+        action_offset = 0
+        for frame in frames:
+            stats: Dict[str, Any] = {
+                'queueDepth': len(position_keys),
+                'groupCount': group_count,
+                'fusedRequests': len(frames),
+                'loadedModelKeys': sorted(self.models.keys()),
+            }
+            if self.shape_buckets is not None:
+                stats['shapeBuckets'] = self.batch_buckets
+            if self.batch_dedup is not None:
+                stats['dedup'] = self.batch_dedup
+            results.append({
+                'values': values_bytes[4 * position_offset: 4 * (position_offset + frame.position_count)],
+                'logits': logits_bytes[4 * action_offset: 4 * (action_offset + frame.action_total)],
+                'positionCount': frame.position_count,
+                'actionTotal': frame.action_total,
+                'stats': stats,
+            })
+            position_offset += frame.position_count
+            action_offset += frame.action_total
+
+        self.metrics.add_shared('encode', (time.perf_counter() - encode_started) * 1000.0, positions_by_key)
+        self.binary_inference_count += len(frames)
+        return results
+
+    def _frame_model_keys(self, frame: BinaryInferFrame) -> List[str]:
+        header = frame.header
+        default_model_key = str(header.get('modelKey') or 'default')
+        raw_keys = header.get('modelKeys')
+        if isinstance(raw_keys, list):
+            if len(raw_keys) != frame.position_count:
+                raise ValueError("modelKeys length must match the position count")
+            return [str(key or default_model_key) for key in raw_keys]
+        return [default_model_key] * frame.position_count
+
+    def _infer_packed_cached(
+        self,
+        state_all: torch.Tensor,
+        actions_all: torch.Tensor,
+        counts_all: torch.Tensor,
+        position_keys: List[str],
+    ) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        """_infer_packed, answering cached positions first and forwarding only the misses."""
+        build_started = time.perf_counter()
+        counts_long = counts_all.to(torch.long)
+        offsets = torch.cumsum(counts_long, dim=0) - counts_long
+        counts_list = counts_long.tolist()
+        offsets_list = offsets.tolist()
+        state_rows = state_all.contiguous().numpy()
+        action_rows = actions_all.contiguous().numpy()
+        state_dim = int(state_all.shape[1])
+        action_dim = int(actions_all.shape[1])
+
+        values_out = torch.zeros(len(position_keys), dtype=torch.float32)
+        logits_out = torch.zeros(int(sum(counts_list)), dtype=torch.float32)
+        cache_keys: List[Tuple[str, int, bytes]] = []
+        miss_indices: List[int] = []
+        for index, model_key in enumerate(position_keys):
             if model_key not in self.models:
                 raise ValueError(f"Unknown model key: {model_key}")
-            indexed_positions_by_key.setdefault(model_key, []).append((index, pos))
+            start, count = offsets_list[index], counts_list[index]
+            digest = position_digest(state_rows[index], action_rows[start:start + count], state_dim, count, action_dim)
+            key = (model_key, self.model_generation.get(model_key, 0), digest)
+            cache_keys.append(key)
+            entry = self.cache.get(key)
+            if entry is None:
+                miss_indices.append(index)
+                continue
+            values_out[index] = entry[0]
+            logits_out[start:start + count] = entry[1]
+        self.metrics.add_shared(
+            'tensor_build',
+            (time.perf_counter() - build_started) * 1000.0,
+            dict(collections.Counter(position_keys)),
+        )
+
+        if not miss_indices:
+            return values_out, logits_out, 0
+
+        selected = torch.tensor(miss_indices, dtype=torch.long)
+        action_index = segment_row_indices(offsets, counts_long, selected)
+        miss_values, miss_logits, group_count = self._infer_packed_unique(
+            state_all.index_select(0, selected),
+            actions_all.index_select(0, action_index),
+            counts_long.index_select(0, selected),
+            [position_keys[index] for index in miss_indices],
+            [cache_keys[index][2] for index in miss_indices],
+        )
+        values_out[selected] = miss_values
+        if action_index.numel():
+            logits_out[action_index] = miss_logits
+
+        local_offset = 0
+        for miss_position, index in enumerate(miss_indices):
+            count = counts_list[index]
+            self.cache.put(
+                cache_keys[index],
+                float(miss_values[miss_position]),
+                miss_logits[local_offset:local_offset + count].clone(),
+            )
+            local_offset += count
+        return values_out, logits_out, group_count
+
+    def _infer_packed_unique(
+        self,
+        state_all: torch.Tensor,
+        actions_all: torch.Tensor,
+        counts_all: torch.Tensor,
+        position_keys: List[str],
+        digests: Optional[List[bytes]] = None,
+    ) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        """
+        _infer_packed over the distinct positions only, fanned back out in request order.
+
+        Positions are identical when they share a model key and the digest of
+        their state and action feature bytes (the result-cache digest, passed
+        in when the caller already computed it).
+        """
+        if not self.dedup.enabled or len(position_keys) < 2:
+            return self._infer_packed(state_all, actions_all, counts_all, position_keys)
+
+        build_started = time.perf_counter()
+        counts_long = counts_all.to(torch.long)
+        if digests is None:
+            counts_list = counts_long.tolist()
+            state_rows = state_all.contiguous().numpy()
+            action_rows = actions_all.contiguous().numpy()
+            state_dim = int(state_all.shape[1])
+            action_dim = int(actions_all.shape[1]) if actions_all.dim() == 2 else 0
+            digests = []
+            start = 0
+            for index, count in enumerate(counts_list):
+                digests.append(position_digest(state_rows[index], action_rows[start:start + count], state_dim, count, action_dim))
+                start += count
+
+        slots: Dict[Tuple[str, bytes], int] = {}
+        unique: List[int] = []
+        inverse: List[int] = []
+        for index, identity in enumerate(zip(position_keys, digests)):
+            slot = slots.setdefault(identity, len(unique))
+            if slot == len(unique):
+                unique.append(index)
+            inverse.append(slot)
+        self.batch_dedup = self.dedup.record(len(position_keys), len(unique))
+        self.metrics.add_shared(
+            'tensor_build',
+            (time.perf_counter() - build_started) * 1000.0,
+            dict(collections.Counter(position_keys)),
+        )
+        if len(unique) == len(position_keys):
+            return self._infer_packed(state_all, actions_all, counts_all, position_keys)
+
+        offsets = torch.cumsum(counts_long, dim=0) - counts_long
+        selected = torch.tensor(unique, dtype=torch.long)
+        unique_counts = counts_long.index_select(0, selected)
+        values, logits, group_count = self._infer_packed(
+            state_all.index_select(0, selected),
+            actions_all.index_select(0, segment_row_indices(offsets, counts_long, selected)),
+            unique_counts,
+            [position_keys[index] for index in unique],
+        )
 
-        results: List[Optional[Dict[str, Any]]] = [None] * len(positions)
-        queue_depth = len(positions)
-        batch_groups = 0
+        fan_out = torch.tensor(inverse, dtype=torch.long)
+        unique_offsets = torch.cumsum(unique_counts, dim=0) - unique_counts
+        values_out = values.index_select(0, fan_out)
+        logits_out = logits.index_select(0, segment_row_indices(unique_offsets, unique_counts, fan_out)) \
+            if logits.numel() else logits
+        return values_out, logits_out, group_count
 
-        for model_key, indexed_positions in indexed_positions_by_key.items():
-            model = self.models[model_key]
+    def _infer_packed(
+        self,
+        state_all: torch.Tensor,
+        actions_all: torch.Tensor,
+        counts_all: torch.Tensor,
+        position_keys: List[str],
+    ) -> Tuple[torch.Tensor, torch.Tensor, int]:
+        """
+        Evaluate a packed batch, grouping positions by model key.
+
+        Keys whose models share an architecture run as one stacked vmap forward
+        (see _forward_fused); the rest run one forward per key.
+        """
+        position_count = len(position_keys)
+        indices_by_key: Dict[str, List[int]] = {}
+        for index, model_key in enumerate(position_keys):
+            if model_key not in self.models:
+                raise ValueError(f"Unknown model key: {model_key}")
+            indices_by_key.setdefault(model_key, []).append(index)
+
+        counts_long = counts_all.to(torch.long)
+        action_total = int(counts_long.sum().item()) if position_count else 0
+        offsets = torch.cumsum(counts_long, dim=0) - counts_long
+        values_out = torch.zeros(position_count, dtype=torch.float32)
+        logits_out = torch.zeros(action_total, dtype=torch.float32)
+
+        groups: Dict[str, PackedGroup] = {}
+        for model_key, indices in indices_by_key.items():
+            build_started = time.perf_counter()
+            if len(indices_by_key) == 1:
+                groups[model_key] = PackedGroup(None, None, state_all, actions_all, counts_long)
+            else:
+                selected = torch.tensor(indices, dtype=torch.long)
+                action_index = segment_row_indices(offsets, counts_long, selected)
+                groups[model_key] = PackedGroup(
+                    selected,
+                    action_index,
+                    state_all.index_select(0, selected),
+                    actions_all.index_select(0, action_index),
+                    counts_long.index_select(0, selected),
+                )
+            self.metrics.add(model_key, 'tensor_build', (time.perf_counter() - build_started) * 1000.0)
+
+        forward_count = 0
+        for fused_keys in self._fusion_groups(list(indices_by_key)):
+            if len(fused_keys) == 1 and self.shape_buckets is not None:
+                model_key = fused_keys[0]
+                outputs = [(model_key, *self._forward_bucketed(model_key, groups[model_key]))]
+            elif len(fused_keys) == 1:
+                model_key = fused_keys[0]
+                group = groups[model_key]
+                meta = self.model_meta[model_key]
+                with self.metrics.phase(model_key, 'tensor_build'):
+                    state_tensor = group.state_rows.to(self.device, non_blocking=True)
+                    action_tensor = adapt_action_tensor(group.action_rows, meta['action_size']).to(self.device, non_blocking=True)
+                outputs = [(model_key, *self._forward(model_key, self.models[model_key], state_tensor, action_tensor, group.counts))]
+            else:
+                outputs = self._forward_fused(fused_keys, [groups[model_key] for model_key in fused_keys])
+            forward_count += 1
+
+            for model_key, values, logits in outputs:
+                self.model_use_order[model_key] = time.time()
+                self.model_use_order.move_to_end(model_key)
+                group = groups[model_key]
+                if group.selected is None:
+                    values_out = values
+                    logits_out = logits if logits.numel() else logits_out
+                else:
+                    values_out[group.selected] = values
+                    if group.action_index.numel():
+                        logits_out[group.action_index] = logits
+
+                position_total = len(indices_by_key[model_key])
+                self.per_model_request_count[model_key] = self.per_model_request_count.get(model_key, 0) + 1
+                self.per_model_position_count[model_key] = self.per_model_position_count.get(model_key, 0) + position_total
+                self.metrics.record_throughput(model_key, position_total, int(group.action_rows.shape[0]))
+
+        self.inference_count += 1
+        self.total_positions += position_count
+        self.total_actions += action_total
+        self.total_batches += forward_count
+        self.max_batch_size_seen = max(self.max_batch_size_seen, position_count)
+        return values_out, logits_out, len(indices_by_key)
+
+    def _fusion_groups(self, model_keys: List[str]) -> List[List[str]]:
+        """Partition keys into runs of same-architecture models (singletons when fusion is off)."""
+        if not self.fused_forward or len(model_keys) < 2:
+            return [[model_key] for model_key in model_keys]
+        by_signature: Dict[Tuple[Any, ...], List[str]] = {}
+        for model_key in model_keys:
             meta = self.model_meta[model_key]
+            signature = (meta['state_size'], meta['action_size'], tuple(meta['hidden']))
+            if meta.get('int8', {}).get('enabled'):
+                # Quantized modules cannot be stacked for vmap.
+                signature = (model_key,)
+            by_signature.setdefault(signature, []).append(model_key)
+        return list(by_signature.values())
+
+    def _stacked_models(self, model_keys: List[str]) -> Tuple[Callable[..., Any], Dict[str, torch.Tensor], Dict[str, torch.Tensor]]:
+        """Stacked parameters and a vmapped functional forward for a set of keys, cached by generation."""
+        cache_key = tuple((model_key, self.model_generation.get(model_key, 0)) for model_key in model_keys)
+        entry = self.stacked_models.get(cache_key)
+        if entry is not None:
+            self.stacked_models.move_to_end(cache_key)
+            return entry
+
+        models = [self.models[model_key] for model_key in model_keys]
+        with torch.no_grad():
+            params, buffers = torch.func.stack_module_state(models)
+        # functional_call only needs the module structure, not a third copy of the weights.
+        base_model = copy.deepcopy(models[0]).to('meta')
 
-            state_features_list = []
-            action_features_list = []
-            action_keys_list = []
-            action_counts = []
+        def call_model(model_params, model_buffers, state, actions, row_position):
+            return torch.func.functional_call(base_model, (model_params, model_buffers), (state, actions, row_position))
 
-            for _, pos in indexed_positions:
-                state_features_list.append(pos['stateFeatures'])
-                actions = pos.get('actions', [])
-                action_counts.append(len(actions))
-                keys = []
-                for action in actions:
-                    action_features_list.append(
-                        adapt_action_features(action['actionFeatures'], meta['action_size'])
-                    )
-                    keys.append(action['actionKey'])
-                action_keys_list.append(keys)
+        entry = (torch.vmap(call_model), params, buffers)
+        self.stacked_models[cache_key] = entry
+        while len(self.stacked_models) > MAX_STACKED_MODEL_SETS:
+            self.stacked_models.popitem(last=False)
+        return entry
 
-            state_tensor = torch.tensor(state_features_list, dtype=torch.float32, device=self.device)
-            action_tensor = torch.tensor(action_features_list, dtype=torch.float32, device=self.device) \
-                if action_features_list else torch.empty(0, meta['action_size'], device=self.device)
+    def _forward_fused(self, model_keys: List[str], groups: List['PackedGroup']) -> List[Tuple[str, torch.Tensor, torch.Tensor]]:
+        """
+        One vmap forward over same-architecture models.
 
-            with torch.inference_mode():
+        Each model's positions are padded to the largest group and its action rows
+        to the largest action total; row_position maps every action row to its
+        position so the policy head needs no per-model repeat_interleave.
+        """
+        positions_by_key = {model_key: int(group.state_rows.shape[0]) for model_key, group in zip(model_keys, groups)}
+        build_started = time.perf_counter()
+        action_size = self.model_meta[model_keys[0]]['action_size']
+        state_dim = int(groups[0].state_rows.shape[1])
+        sizes = [(int(group.state_rows.shape[0]), int(group.action_rows.shape[0])) for group in groups]
+        max_positions = max(positions for positions, _ in sizes)
+        max_rows = max(1, max(rows for _, rows in sizes))
+
+        state = torch.zeros(len(groups), max_positions, state_dim, dtype=torch.float32)
+        actions = torch.zeros(len(groups), max_rows, action_size, dtype=torch.float32)
+        row_position = torch.zeros(len(groups), max_rows, dtype=torch.long)
+        for model_index, (group, (positions, rows)) in enumerate(zip(groups, sizes)):
+            state[model_index, :positions] = group.state_rows
+            if rows:
+                actions[model_index, :rows] = adapt_action_tensor(group.action_rows, action_size)
+                row_position[model_index, :rows] = torch.repeat_interleave(torch.arange(positions), group.counts)
+        state = state.to(self.device, non_blocking=True)
+        actions = actions.to(self.device, non_blocking=True)
+        row_position = row_position.to(self.device, non_blocking=True)
+        fused_forward, params, buffers = self._stacked_models(model_keys)
+        self.metrics.add_shared('tensor_build', (time.perf_counter() - build_started) * 1000.0, positions_by_key)
+
+        with torch.inference_mode():
+            started = time.perf_counter()
+            with self._autocast_context():
+                values, logits = fused_forward(params, buffers, state, actions, row_position)
+            if values.is_cuda:
+                torch.cuda.synchronize(values.device)
+            self.metrics.add_shared('forward', (time.perf_counter() - started) * 1000.0, positions_by_key)
+
+            started = time.perf_counter()
+            values = values.float().cpu()
+            logits = logits.float().cpu()
+            self.metrics.add_shared('d2h', (time.perf_counter() - started) * 1000.0, positions_by_key)
+
+        self.fused_forward_count += 1
+        self.fused_model_count += len(model_keys)
+        return [
+            (model_key, values[model_index, :positions], logits[model_index, :rows])
+            for model_index, (model_key, (positions, rows)) in enumerate(zip(model_keys, sizes))
+        ]
+
+    def _forward(
+        self,
+        model_key: str,
+        model: PolicyValueNet,
+        state_tensor: torch.Tensor,
+        action_tensor: torch.Tensor,
+        action_counts: Any,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Run one forward pass and return float32 CPU values and logits."""
+        with torch.inference_mode():
+            with self.metrics.phase(model_key, 'forward'):
                 with self._autocast_context():
                     values, logits = model.forward_batch(state_tensor, action_tensor, action_counts)
-                values = values.float().cpu().numpy()
-                logits = logits.float().cpu().numpy() if len(logits) > 0 else []
-
-            logit_offset = 0
-            for batch_index, (original_index, _) in enumerate(indexed_positions):
-                count = action_counts[batch_index]
-                action_logits = {}
-                for action_index, key in enumerate(action_keys_list[batch_index]):
-                    action_logits[key] = float(logits[logit_offset + action_index])
-                logit_offset += count
-
-                results[original_index] = {
-                    'modelKey': model_key,
-                    'value': float(values[batch_index]),
-                    'actionLogits': action_logits,
-                }
-
-            batch_groups += 1
-            self.per_model_request_count[model_key] = self.per_model_request_count.get(model_key, 0) + 1
-            self.per_model_position_count[model_key] = self.per_model_position_count.get(model_key, 0) + len(indexed_positions)
+                if values.is_cuda:
+                    # Kernels are async; wait here so forward and d2h are timed apart.
+                    torch.cuda.synchronize(values.device)
+            with self.metrics.phase(model_key, 'd2h'):
+                return values.float().cpu(), logits.float().cpu()
+
+    def _forward_bucketed(self, model_key: str, group: PackedGroup) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Pad one key's rows to its shape bucket and run that bucket's compiled forward."""
+        buckets = self.shape_buckets
+        model = self.models[model_key]
+        meta = self.model_meta[model_key]
+        positions = int(group.state_rows.shape[0])
+        rows = int(group.action_rows.shape[0])
+        bucket = buckets.select(positions, rows)
+        self.batch_buckets.append(buckets.record(bucket, positions, rows))
+        if bucket is None:
+            with self.metrics.phase(model_key, 'tensor_build'):
+                state_tensor = group.state_rows.to(self.device, non_blocking=True)
+                action_tensor = adapt_action_tensor(group.action_rows, meta['action_size']).to(self.device, non_blocking=True)
+            return self._forward(model_key, model, state_tensor, action_tensor, group.counts)
+
+        with self.metrics.phase(model_key, 'tensor_build'):
+            inputs = self._bucket_inputs(
+                bucket,
+                meta,
+                group.state_rows,
+                adapt_action_tensor(group.action_rows, meta['action_size']),
+                torch.repeat_interleave(torch.arange(positions), group.counts),
+            )
+        values, logits = self._run_bucket(model_key, bucket, inputs)
+        return values[:positions], logits[:rows]
 
-        self.inference_count += 1
-        self.total_positions += len(positions)
-        self.total_actions += sum(len(pos.get('actions', [])) for pos in positions)
-        self.total_batches += batch_groups
-        self.max_batch_size_seen = max(self.max_batch_size_seen, len(positions))
+    def _bucket_inputs(
+        self,
+        bucket: Tuple[int, int],
+        meta: Dict[str, Any],
+        state_rows: torch.Tensor,
+        action_rows: torch.Tensor,
+        row_position: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        # Padding rows are zeros pointing at position 0; the caller slices them off.
+        state = torch.zeros(bucket[0], meta['state_size'], dtype=torch.float32)
+        actions = torch.zeros(bucket[1], meta['action_size'], dtype=torch.float32)
+        rows_position = torch.zeros(bucket[1], dtype=torch.long)
+        state[:state_rows.shape[0]] = state_rows
+        actions[:action_rows.shape[0]] = action_rows
+        rows_position[:row_position.shape[0]] = row_position
+        return (
+            state.to(self.device, non_blocking=True),
+            actions.to(self.device, non_blocking=True),
+            rows_position.to(self.device, non_blocking=True),
+        )
+
+    def _run_bucket(
+        self,
+        model_key: str,
+        bucket: Tuple[int, int],
+        inputs: Tuple[torch.Tensor, torch.Tensor, torch.Tensor],
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        buckets = self.shape_buckets
+        generation = self.model_generation.get(model_key, 0)
+        while True:
+            warm = buckets.is_warm(model_key, generation, bucket)
+            try:
+                function = buckets.function(model_key, generation, self.models[model_key], bucket, inputs)
+                with torch.inference_mode():
+                    with self.metrics.phase(model_key, 'forward'):
+                        autocast = self._autocast_context() if buckets.backend != 'trace' else contextlib.nullcontext()
+                        with autocast:
+                            values, logits = function(*inputs)
+                        if values.is_cuda:
+                            torch.cuda.synchronize(values.device)
+            except Exception as error:
+                # Only a bucket's first call may be a compiler failure; later errors are real.
+                if warm or not buckets.demote(error):
+                    raise
+                continue
+            buckets.mark_warm(model_key, generation, bucket)
+            with self.metrics.phase(model_key, 'd2h'):
+                return values.float().cpu(), logits.float().cpu()
+
+    def handle_warmup(self, payload: Dict) -> Dict:
+        """
+        Run every shape bucket once for the given model keys (all loaded keys by
+        default) so compilation happens before real traffic arrives.
+        """
+        if self.shape_buckets is None:
+            return {'enabled': False, 'buckets': {}}
+        if not self.models:
+            raise RuntimeError("Model not initialized")
+        model_keys = [str(payload['modelKey'])] if payload.get('modelKey') else sorted(self.models)
+        self._require_models(model_keys)
 
+        started = time.perf_counter()
+        timings: Dict[str, Dict[str, float]] = {}
+        for model_key in model_keys:
+            meta = self.model_meta[model_key]
+            for bucket in self.shape_buckets.buckets:
+                bucket_started = time.perf_counter()
+                inputs = self._bucket_inputs(
+                    bucket,
+                    meta,
+                    torch.zeros(0, meta['state_size']),
+                    torch.zeros(0, meta['action_size']),
+                    torch.zeros(0, dtype=torch.long),
+                )
+                self._run_bucket(model_key, bucket, inputs)
+                elapsed_ms = (time.perf_counter() - bucket_started) * 1000.0
+                label = bucket_label(bucket)
+                timings.setdefault(model_key, {})[label] = elapsed_ms
+                self.shape_buckets.warmup_ms[label] = elapsed_ms
+        total_ms = (time.perf_counter() - started) * 1000.0
+        emit_log(f"Warmed {len(self.shape_buckets.buckets)} shape buckets for {model_keys} "
+                 f"({self.shape_buckets.backend}, {total_ms:.0f}ms)")
         return {
-            'results': [result for result in results if result is not None],
-            'stats': {
-                'queueDepth': queue_depth,
-                'groupCount': batch_groups,
-                'loadedModelKeys': sorted(self.models.keys()),
-            },
+            'enabled': True,
+            'backend': self.shape_buckets.backend,
+            'modelKeys': model_keys,
+            'bucketMs': timings,
+            'totalMs': total_ms,
         }
 
     def handle_reload(self, payload: Dict) -> Dict:
-        """Reload model from file."""
-        return self._load_model(payload, replace=True)
+        """Reload model from file, blocking the caller (serving loops use handle_reload_async)."""
+        return self._load_model(payload, replace=True, reuse_resident=False)
+
+    def handle_reload_async(self, payload: Dict, reply: Callable[..., None]) -> None:
+        """
+        Build the model for payload on the loader thread.
+
+        reply(ok, payload, error) is called from apply_ready_swaps on the serving
+        thread once the new weights are installed (or the load failed).
+        """
+        device = self._ensure_device(payload)
+        model_key, resolved_path = self._model_target(payload)
+        self.loader.submit(PendingReload(model_key, resolved_path, device, reply))
+
+    def apply_ready_swaps(self) -> int:
+        """Install finished reloads. Only call between batches on the serving thread."""
+        applied = 0
+        while True:
+            try:
+                job = self.loader.ready.get_nowait()
+            except queue.Empty:
+                return applied
+            self.loader.finished()
+            if job.error is not None:
+                emit_log(f"Reload of model[{job.model_key}] failed: {job.error}")
+                job.reply(False, None, str(job.error))
+                continue
+
+            self._install_model(job.model_key, job.model_path, job.model, job.meta)
+            latency_ms = (time.perf_counter() - job.requested_at) * 1000.0
+            self.swap_count += 1
+            self.last_swap_latency_ms = latency_ms
+            self.last_swap_load_ms = job.load_ms
+            self.max_swap_latency_ms = max(self.max_swap_latency_ms, latency_ms)
+            applied += 1
+            job.reply(True, {**self._ready_payload(job.model_key), 'swapLatencyMs': latency_ms, 'loadMs': job.load_ms}, None)
 
     def handle_stats(self, payload: Dict) -> Dict:
         """Return server statistics."""
         average_batch_size = self.total_positions / self.inference_count if self.inference_count > 0 else 0.0
         return {
+            'backend': 'torch',
+            'startupMs': self.startup_ms,
+            **process_footprint(),
             'inferenceCount': self.inference_count,
             'totalPositions': self.total_positions,
             'totalActions': self.total_actions,
             'totalBatches': self.total_batches,
             'averageBatchSize': average_batch_size,
             'maxBatchSizeSeen': self.max_batch_size_seen,
+            'binaryInferenceCount': self.binary_inference_count,
             'device': str(self.device) if self.device else None,
             'cudaAvailable': torch.cuda.is_available(),
             'cudaDeviceName': torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
             'loadedModelKeys': sorted(self.models.keys()),
             'perModelRequestCount': self.per_model_request_count,
             'perModelPositionCount': self.per_model_position_count,
+            'modelGeneration': self.model_generation,
+            'swapCount': self.swap_count,
+            'pendingReloads': self.loader.pending(),
+            'lastSwapLatencyMs': self.last_swap_latency_ms,
+            'lastSwapLoadMs': self.last_swap_load_ms,
+            'maxSwapLatencyMs': self.max_swap_latency_ms,
+            **self.metrics.snapshot(),
+            'cache': self.cache.stats(),
+            'dedup': self.dedup.stats(),
+            'fusedForward': self.fused_forward,
+            'fusedForwardCount': self.fused_forward_count,
+            'averageModelsPerFusedForward': self.fused_model_count / self.fused_forward_count if self.fused_forward_count else 0.0,
+            'stackedModelSets': len(self.stacked_models),
+            'int8': {model_key: meta['int8'] for model_key, meta in self.model_meta.items() if 'int8' in meta},
+            'modelResidentBytes': dict(self.model_bytes),
+            'modelMemory': {
+                'budgetBytes': self.model_budget_bytes,
+                'residentBytes': sum(self.model_bytes.values()),
+                'evictions': self.model_eviction_count,
+                'lazyReloads': self.lazy_reload_count,
+                'evictedModelKeys': sorted(self.evicted_models),
+                'idleOrder': list(self.model_use_order),
+            },
+            'shapeBuckets': self.shape_buckets.stats() if self.shape_buckets is not None else {'enabled': False},
+            'daemon': self.daemon.stats() if self.daemon is not None else None,
+        }
+
+    def metrics_event(self) -> Dict[str, Any]:
+        """
+        Fields for the periodic gpu_inference_stats line (safe to call off the serving thread).
+
+        Registry fields come from registry_snapshot, which the serving thread
+        republishes whenever it installs or releases a model, so the registry
+        dicts are never iterated here while they may change. Counters are
+        single int reads and the phase metrics take their own lock.
+        """
+        inference_count = self.inference_count
+        total_positions = self.total_positions
+        device = self.device
+        return {
+            'inferenceCount': inference_count,
+            'totalPositions': total_positions,
+            'totalActions': self.total_actions,
+            'averageBatchSize': total_positions / inference_count if inference_count > 0 else 0.0,
+            'device': str(device) if device else None,
+            **self.registry_snapshot,
+            **self.metrics.snapshot(),
         }
 
     def _autocast_context(self):
@@ -460,43 +2060,798 @@ class InferenceServer:
         return contextlib.nullcontext()
 
 
-def main():
-    server = InferenceServer()
+def dispatch_command(server: InferenceServer, cmd: Any, payload: Dict) -> Dict:
+    """Run a JSON control or infer command."""
+    if cmd == 'init':
+        return server.handle_init(payload)
+    if cmd == 'load_model':
+        return server.handle_load_model(payload)
+    if cmd == 'unload_model':
+        return server.handle_unload_model(payload)
+    if cmd == 'infer':
+        return server.handle_infer(payload)
+    if cmd == 'infer_priors':
+        return server.handle_infer_priors(payload)
+    if cmd == 'infer_board':
+        return server.handle_infer_board(payload)
+    if cmd == 'reload':
+        return server.handle_reload(payload)
+    if cmd == 'stats':
+        return server.handle_stats(payload)
+    if cmd == 'warmup':
+        return server.handle_warmup(payload)
+    raise ValueError(f"Unknown command: {cmd}")
+
+
+class MetricsDumper:
+    """Appends a gpu_inference_stats event to the training metrics JSONL every interval."""
+
+    def __init__(self, server: InferenceServer, metrics_path: str, interval_sec: float, run_id: str):
+        self.server = server
+        self.metrics_path = metrics_path
+        self.interval_sec = max(1.0, interval_sec)
+        self.run_id = run_id
+        self.stopped = threading.Event()
+
+    def start(self) -> None:
+        threading.Thread(target=self._run, name='metrics-dumper', daemon=True).start()
+
+    def stop(self) -> None:
+        if not self.stopped.is_set():
+            self.stopped.set()
+            self.dump()
+
+    def _run(self) -> None:
+        while not self.stopped.wait(self.interval_sec):
+            self.dump()
+
+    def dump(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.metrics_path) or '.', exist_ok=True)
+            event = {
+                'ts': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'source': 'az',
+                'runId': self.run_id,
+                'eventType': 'gpu_inference_stats',
+                **self.server.metrics_event(),
+            }
+            with open(self.metrics_path, 'a', encoding='utf-8') as handle:
+                handle.write(json.dumps(event))
+                handle.write('\n')
+        except Exception as e:
+            emit_log(f"Failed to append metrics: {e}")
 
-    for raw_line in sys.stdin:
-        line = raw_line.strip()
-        if not line:
-            continue
 
+class ClientSession:
+    """One connected socket client with its own serialized writer."""
+
+    def __init__(self, session_id: int, conn: socket.socket):
+        self.session_id = session_id
+        self.conn = conn
+        self.reader = conn.makefile('rb')
+        self.write_lock = threading.Lock()
+        self.closed = False
+
+    def send(self, data: bytes) -> None:
+        with self.write_lock:
+            if self.closed:
+                return
+            try:
+                self.conn.sendall(data)
+            except OSError:
+                self.closed = True
+
+    def close(self) -> None:
+        with self.write_lock:
+            self.closed = True
+        with contextlib.suppress(OSError):
+            self.conn.shutdown(socket.SHUT_RDWR)
+        with contextlib.suppress(OSError):
+            self.reader.close()
+            self.conn.close()
+
+
+class QueuedRequest:
+    """A request read from a client, waiting for the dispatcher."""
+
+    def __init__(self, session: ClientSession, request: Dict[str, Any], frame: Optional[BinaryInferFrame]):
+        self.session = session
+        self.request = request
+        self.frame = frame
+        self.request_id = request.get('id') if isinstance(request, dict) else None
+        self.enqueued_at = time.perf_counter()
+        options: Dict[str, Any] = {}
+        if frame is not None:
+            self.position_count = frame.position_count
+            options = frame.header
+        elif isinstance(request, dict) and request.get('cmd') in JSON_INFER_COMMANDS:
+            options = request.get('payload') or {}
+            self.position_count = len(options.get('positions') or [])
+        else:
+            self.position_count = 0
+        self.priority = str(options.get('priority') or 'normal')
+
+    @property
+    def is_infer(self) -> bool:
+        return self.frame is not None or (isinstance(self.request, dict) and self.request.get('cmd') in JSON_INFER_COMMANDS)
+
+    def encode(self, ok: bool, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bytes:
+        if self.frame is not None:
+            return encode_binary_result(self.request_id, ok, result, error)
+        return encode_response(self.request_id, ok, result, error)
+
+    def reply(self, ok: bool, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        self.session.send(self.encode(ok, result, error))
+
+    def reply_backpressure(self, error: str, retry_after_ms: float) -> None:
+        """Refuse the request with a machine-readable signal to retry after retry_after_ms."""
+        fields = {'id': self.request_id, 'ok': False, 'error': error, 'backpressure': True, 'retryAfterMs': retry_after_ms}
+        if self.frame is not None:
+            self.session.send(encode_binary_response(fields))
+        else:
+            self.session.send(json.dumps(fields).encode('utf-8') + b'\n')
+
+
+def parse_priority_weights(spec: str) -> Dict[str, float]:
+    """Parse "high=8,normal=4,low=1" into per-class weights (unlisted classes keep the defaults)."""
+    weights: Dict[str, float] = {}
+    for source in (DEFAULT_PRIORITY_WEIGHTS, spec):
+        for part in (source or '').split(','):
+            if not part.strip():
+                continue
+            name, _, value = part.partition('=')
+            name = name.strip()
+            if name not in PRIORITY_CLASSES:
+                raise ValueError(f"Unknown priority class {name!r} (expected one of {', '.join(PRIORITY_CLASSES)})")
+            weight = float(value)
+            if weight <= 0:
+                raise ValueError(f"Priority weight for {name} must be positive")
+            weights[name] = weight
+    return weights
+
+
+class PriorityClassQueue:
+    """Queued infers of one priority class with its deficit-round-robin state and latency figures."""
+
+    def __init__(self, name: str, weight: float):
+        self.name = name
+        self.weight = weight
+        self.items: 'collections.deque[QueuedRequest]' = collections.deque()
+        self.positions = 0
+        self.deficit = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.served_requests = 0
+        self.served_positions = 0
+        self.queue_wait = RollingHistogram()
+        self.latency = RollingHistogram()
+
+    def stats(self, admitted_positions: int) -> Dict[str, Any]:
+        return {
+            'weight': self.weight,
+            'queuedRequests': len(self.items),
+            'queuedPositions': admitted_positions,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'servedRequests': self.served_requests,
+            'servedPositions': self.served_positions,
+            'queueWaitMs': self.queue_wait.summary(),
+            'latencyMs': self.latency.summary(),
+        }
+
+
+class SocketDaemon:
+    """
+    Unix-socket front end that fuses infer requests from many clients.
+
+    Reader threads decode requests per client; the dispatcher (caller thread)
+    owns the models and flushes queued infers as one batch on size or deadline.
+    """
+
+    def __init__(
+        self,
+        server: InferenceServer,
+        socket_path: str,
+        max_batch_positions: int,
+        batch_deadline_ms: float,
+        priority_weights: Optional[Dict[str, float]] = None,
+        max_queue_positions: int = 0,
+    ):
+        self.server = server
+        self.socket_path = socket_path
+        self.max_batch_positions = max(1, max_batch_positions)
+        self.batch_deadline = max(0.0, batch_deadline_ms) / 1000.0
+        self.work: 'queue.Queue[Any]' = queue.Queue()
+        self.held: Optional[Any] = None
+        weights = priority_weights or parse_priority_weights('')
+        self.priority_queues = {name: PriorityClassQueue(name, weights[name]) for name in PRIORITY_CLASSES}
+        self.pending_positions = 0
+        # Admission is checked on the reader threads, so queued positions per class are counted under a lock.
+        self.max_queue_positions = max(0, max_queue_positions)
+        self.admission_lock = threading.Lock()
+        self.admitted_positions = {name: 0 for name in PRIORITY_CLASSES}
+        self.flush_ms_average = 0.0
+        self.sessions: Dict[int, ClientSession] = {}
+        self.sessions_lock = threading.Lock()
+        self.next_session_id = 1
+        self.running = True
+        self.listener: Optional[socket.socket] = None
+        self.flush_count = 0
+        self.fused_request_count = 0
+        self.size_flush_count = 0
+        self.deadline_flush_count = 0
+        server.daemon = self
+        server.set_swap_notify(lambda: self.work.put(SWAP_READY))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.sessions_lock:
+            client_count = len(self.sessions)
+        return {
+            'socketPath': self.socket_path,
+            'connectedClients': client_count,
+            'maxBatchPositions': self.max_batch_positions,
+            'batchDeadlineMs': self.batch_deadline * 1000.0,
+            'flushCount': self.flush_count,
+            'sizeFlushCount': self.size_flush_count,
+            'deadlineFlushCount': self.deadline_flush_count,
+            'averageRequestsPerFlush': self.fused_request_count / self.flush_count if self.flush_count else 0.0,
+            'averageFlushMs': self.flush_ms_average,
+            'maxQueuePositions': self.max_queue_positions,
+            'priorityClasses': {
+                name: state.stats(self.admitted_positions[name]) for name, state in self.priority_queues.items()
+            },
+        }
+
+    def serve(self) -> None:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise RuntimeError("Unix domain sockets are not supported on this platform")
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        self.listener.listen()
+        emit_log(
+            f"Listening on {self.socket_path} (max_batch_positions={self.max_batch_positions} "
+            f"deadline_ms={self.batch_deadline * 1000.0:g})"
+        )
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        try:
+            self._dispatch_loop()
+        finally:
+            self.running = False
+            with contextlib.suppress(OSError):
+                self.listener.close()
+            with contextlib.suppress(OSError):
+                os.unlink(self.socket_path)
+            with self.sessions_lock:
+                sessions = list(self.sessions.values())
+            for session in sessions:
+                session.close()
+
+    def stop(self) -> None:
+        self.running = False
+
+    def _accept_loop(self) -> None:
+        assert self.listener is not None
+        while self.running:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            with self.sessions_lock:
+                session = ClientSession(self.next_session_id, conn)
+                self.next_session_id += 1
+                self.sessions[session.session_id] = session
+            threading.Thread(target=self._read_loop, args=(session,), daemon=True).start()
+
+    def _read_loop(self, session: ClientSession) -> None:
+        try:
+            while self.running and not session.closed:
+                try:
+                    message = read_message(session.reader)
+                except json.JSONDecodeError as e:
+                    session.send(encode_response(None, False, error=str(e)))
+                    continue
+                if message is None:
+                    break
+                request, frame, decode_ms = message
+                model_key = infer_model_key(request, frame)
+                if model_key is not None:
+                    self.server.metrics.observe(model_key, 'decode', decode_ms)
+                item = QueuedRequest(session, request, frame)
+                if item.is_infer and not self._admit(item):
+                    continue
+                self.work.put(item)
+        except ProtocolError as e:
+            emit_log(f"Client {session.session_id} protocol error, closing: {e}")
+        except Exception as e:
+            emit_log(f"Client {session.session_id} read error: {e}")
+        finally:
+            with self.sessions_lock:
+                self.sessions.pop(session.session_id, None)
+            session.close()
+
+    def _admit(self, item: QueuedRequest) -> bool:
+        """Count an infer against its class's queue limit; refuse it with a backpressure reply when full."""
+        if item.priority not in self.priority_queues:
+            item.reply(False, error=f"Unknown priority class: {item.priority}")
+            return False
+        state = self.priority_queues[item.priority]
+        with self.admission_lock:
+            queued = self.admitted_positions[item.priority]
+            # A request larger than the whole limit is still taken when its class is idle.
+            if self.max_queue_positions and queued and queued + item.position_count > self.max_queue_positions:
+                state.rejected += 1
+                rejected = True
+            else:
+                self.admitted_positions[item.priority] = queued + item.position_count
+                state.admitted += 1
+                rejected = False
+        if rejected:
+            flushes_ahead = math.ceil(queued / self.max_batch_positions)
+            retry_after_ms = max(1.0, flushes_ahead * self.flush_ms_average + self.batch_deadline * 1000.0)
+            item.reply_backpressure(
+                f"Inference queue for priority {item.priority} is full ({queued} positions queued)",
+                round(retry_after_ms, 1),
+            )
+        return not rejected
+
+    def _next_work_item(self, timeout: float) -> Optional[Any]:
+        if self.held is not None:
+            item, self.held = self.held, None
+            return item
+        try:
+            return self.work.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _enqueue_ready_infers(self) -> None:
+        """Move infers that already arrived into their class queues, stopping at the first control command."""
+        while self.held is None:
+            try:
+                item = self.work.get_nowait()
+            except queue.Empty:
+                return
+            if item is not SWAP_READY and item.is_infer:
+                self._enqueue(item)
+            else:
+                self.held = item
+
+    def _enqueue(self, item: QueuedRequest) -> None:
+        self.priority_queues[item.priority].items.append(item)
+        self.pending_positions += item.position_count
+
+    def _oldest_enqueued_at(self) -> Optional[float]:
+        heads = [state.items[0].enqueued_at for state in self.priority_queues.values() if state.items]
+        return min(heads) if heads else None
+
+    def _dispatch_loop(self) -> None:
+        while self.running:
+            timeout = 0.25
+            oldest = self._oldest_enqueued_at()
+            if oldest is not None:
+                timeout = max(0.0, oldest + self.batch_deadline - time.perf_counter())
+            item = self._next_work_item(timeout)
+            if item is None:
+                if oldest is not None:
+                    self.deadline_flush_count += 1
+                    self._flush(self._take_batch())
+                continue
+
+            if item is SWAP_READY:
+                self.server.apply_ready_swaps()
+                continue
+
+            if item.is_infer:
+                self._enqueue(item)
+                self._enqueue_ready_infers()
+                while self.pending_positions >= self.max_batch_positions:
+                    self.size_flush_count += 1
+                    self._flush(self._take_batch())
+                continue
+
+            # Control commands observe every infer queued before them.
+            while self._oldest_enqueued_at() is not None:
+                self._flush(self._take_batch())
+            self._handle_control(item)
+
+    def _take_batch(self) -> List[QueuedRequest]:
+        """
+        Pick up to max_batch_positions queued positions by deficit round robin.
+
+        Each round credits every non-empty class weight * quantum positions and
+        takes requests from its head while the credit covers them, so higher
+        classes get proportionally more of every flush and lower classes are
+        never starved.
+        """
+        total_weight = sum(state.weight for state in self.priority_queues.values())
+        quantum = max(1.0, self.max_batch_positions / total_weight)
+        batch: List[QueuedRequest] = []
+        positions = 0
+        full = False
+        now = time.perf_counter()
+        while not full:
+            active = [state for state in self.priority_queues.values() if state.items]
+            if not active:
+                break
+            for state in active:
+                state.deficit += state.weight * quantum
+                while state.items and state.items[0].position_count <= state.deficit:
+                    item = state.items[0]
+                    if batch and positions + item.position_count > self.max_batch_positions:
+                        full = True
+                        break
+                    state.items.popleft()
+                    state.deficit -= item.position_count
+                    state.queue_wait.add((now - item.enqueued_at) * 1000.0)
+                    batch.append(item)
+                    positions += item.position_count
+                if not state.items:
+                    state.deficit = 0.0
+                if full:
+                    break
+
+        self.pending_positions -= positions
+        with self.admission_lock:
+            for item in batch:
+                self.admitted_positions[item.priority] -= item.position_count
+        return batch
+
+    def _finish_infer(self, item: QueuedRequest) -> None:
+        state = self.priority_queues[item.priority]
+        state.served_requests += 1
+        state.served_positions += item.position_count
+        state.latency.add((time.perf_counter() - item.enqueued_at) * 1000.0)
+
+    def _handle_control(self, item: QueuedRequest) -> None:
+        try:
+            request = item.request
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            cmd = request.get('cmd')
+            if cmd == 'shutdown':
+                item.reply(True, {'status': 'bye'})
+                item.session.close()
+                return
+            if cmd == 'reload':
+                self.server.handle_reload_async(request.get('payload') or {}, item.reply)
+                return
+            item.reply(True, dispatch_command(self.server, cmd, request.get('payload') or {}))
+        except Exception as e:
+            emit_log(f"Error: {e}")
+            traceback.print_exc(file=sys.stderr)
+            item.reply(False, error=str(e))
+
+    def _flush(self, pending: List[QueuedRequest]) -> None:
+        started = time.perf_counter()
+        self.server.apply_ready_swaps()
+        self.flush_count += 1
+        self.fused_request_count += len(pending)
+        json_items = [item for item in pending if item.frame is None]
+        binary_items = [item for item in pending if item.frame is not None]
+        if json_items:
+            self._flush_json(json_items)
+        if binary_items:
+            self._flush_binary(binary_items)
+        self.server.metrics.commit()
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self.flush_ms_average = elapsed_ms if self.flush_count == 1 else 0.9 * self.flush_ms_average + 0.1 * elapsed_ms
+
+    def _reply_infer(self, item: QueuedRequest, result: Dict[str, Any]) -> None:
+        with self.server.metrics.phase(infer_model_key(item.request, item.frame) or 'default', 'encode'):
+            data = item.encode(True, result)
+        item.session.send(data)
+        self._finish_infer(item)
+
+    def _reply_infer_error(self, item: QueuedRequest, error: Exception) -> None:
+        emit_log(f"Error: {error}")
+        item.reply(False, error=str(error))
+        self._finish_infer(item)
+
+    def _flush_json(self, items: List[QueuedRequest]) -> None:
+        # infer_priors requests only fuse with ones that asked for the same pruning.
+        groups: Dict[Tuple[Any, ...], List[QueuedRequest]] = {}
+        for item in items:
+            payload = item.request.get('payload') or {}
+            cmd = item.request.get('cmd')
+            options = tuple(payload.get(key) for key in PRIOR_OPTION_KEYS) if cmd == 'infer_priors' else ()
+            groups.setdefault((cmd, options), []).append(item)
+        for (cmd, options), group in groups.items():
+            self._flush_json_group(cmd, dict(zip(PRIOR_OPTION_KEYS, options)), group)
+
+    def _flush_json_group(self, cmd: str, options: Dict[str, Any], items: List[QueuedRequest]) -> None:
+        if len(items) > 1:
+            try:
+                merged: List[Dict[str, Any]] = []
+                spans: List[Tuple[int, int]] = []
+                for item in items:
+                    payload = item.request.get('payload') or {}
+                    default_model_key = payload.get('modelKey') or 'default'
+                    positions = payload.get('positions') or []
+                    spans.append((len(merged), len(positions)))
+                    merged.extend(
+                        {**position, 'modelKey': position.get('modelKey') or default_model_key}
+                        for position in positions
+                    )
+                fused = dispatch_command(self.server, cmd, {**options, 'positions': merged})
+                stats = {**fused['stats'], 'fusedRequests': len(items)}
+                for item, (start, count) in zip(items, spans):
+                    self._reply_infer(item, {'results': fused['results'][start:start + count], 'stats': stats})
+                return
+            except Exception as e:
+                emit_log(f"Fused infer failed, retrying per request: {e}")
+        for item in items:
+            try:
+                self._reply_infer(item, dispatch_command(self.server, cmd, item.request.get('payload') or {}))
+            except Exception as e:
+                self._reply_infer_error(item, e)
+
+    def _flush_binary(self, items: List[QueuedRequest]) -> None:
+        if len(items) > 1:
+            try:
+                results = self.server.handle_infer_binary_batch([item.frame for item in items])
+                for item, result in zip(items, results):
+                    self._reply_infer(item, result)
+                return
+            except Exception as e:
+                emit_log(f"Fused binary infer failed, retrying per request: {e}")
+        for item in items:
+            try:
+                self._reply_infer(item, self.server.handle_infer_binary(item.frame))
+            except Exception as e:
+                self._reply_infer_error(item, e)
+
+
+def start_request_reader(
+    stream: BinaryIO,
+    max_queued: int = 64,
+    metrics: Optional[InferMetrics] = None,
+) -> 'queue.Queue[Optional[Tuple[Any, Optional[BinaryInferFrame], Optional[Exception]]]]':
+    """Decode requests on a background thread; None marks end of stream."""
+    requests: 'queue.Queue[Optional[Tuple[Any, Optional[BinaryInferFrame], Optional[Exception]]]]' = queue.Queue(maxsize=max_queued)
+
+    def pump() -> None:
+        while True:
+            try:
+                message = read_message(stream)
+            except json.JSONDecodeError as e:
+                requests.put(({}, None, e))
+                continue
+            except Exception as e:
+                requests.put(({}, None, ProtocolError(str(e))))
+                requests.put(None)
+                return
+            if message is None:
+                requests.put(None)
+                return
+            request, frame, decode_ms = message
+            model_key = infer_model_key(request, frame)
+            if metrics is not None and model_key is not None:
+                metrics.observe(model_key, 'decode', decode_ms)
+            requests.put((request, frame, None))
+
+    threading.Thread(target=pump, daemon=True).start()
+    return requests
+
+
+def serve_stdio(server: InferenceServer):
+    requests = start_request_reader(sys.stdin.buffer, metrics=server.metrics)
+    server.set_swap_notify(lambda: requests.put(SWAP_READY))
+
+    while True:
+        item = requests.get()
+        server.apply_ready_swaps()
+        if item is None:
+            return
+        if item is SWAP_READY:
+            continue
+        request, frame, read_error = item
         request_id = None
         try:
-            request = json.loads(line)
+            if isinstance(read_error, ProtocolError):
+                emit_log(f"Protocol error, closing: {read_error}")
+                return
+            if read_error is not None:
+                raise read_error
             request_id = request.get('id')
+            model_key = infer_model_key(request, frame)
+
+            if frame is not None:
+                result = server.handle_infer_binary(frame)
+                with server.metrics.phase(model_key, 'encode'):
+                    data = encode_binary_result(request_id, True, result)
+                write_output(data)
+                server.metrics.commit()
+                continue
+
             cmd = request.get('cmd')
             payload = request.get('payload', {})
 
-            if cmd == 'init':
-                result = server.handle_init(payload)
-            elif cmd == 'load_model':
-                result = server.handle_load_model(payload)
-            elif cmd == 'infer':
-                result = server.handle_infer(payload)
-            elif cmd == 'reload':
-                result = server.handle_reload(payload)
-            elif cmd == 'stats':
-                result = server.handle_stats(payload)
-            elif cmd == 'shutdown':
+            if cmd == 'shutdown':
                 emit_response(request_id, True, {'status': 'bye'})
                 return
-            else:
-                raise ValueError(f"Unknown command: {cmd}")
 
-            emit_response(request_id, True, result)
+            if cmd == 'reload':
+                server.handle_reload_async(
+                    payload,
+                    lambda ok, result=None, error=None, rid=request_id: emit_response(rid, ok, result, error),
+                )
+                continue
+
+            result = dispatch_command(server, cmd, payload)
+            if model_key is None:
+                emit_response(request_id, True, result)
+                continue
+            with server.metrics.phase(model_key, 'encode'):
+                data = encode_response(request_id, True, result)
+            write_output(data)
+            server.metrics.commit()
 
         except Exception as e:
             emit_log(f"Error: {e}")
             traceback.print_exc(file=sys.stderr)
-            emit_response(request_id, False, error=str(e))
+            server.metrics.commit()
+            if frame is not None:
+                emit_binary_response(request_id, False, error=str(e))
+            else:
+                emit_response(request_id, False, error=str(e))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Hive AlphaZero inference server")
+    parser.add_argument(
+        '--backend',
+        choices=['torch', 'numpy'],
+        default=os.environ.get('HIVE_INFERENCE_BACKEND', 'torch'),
+        help="numpy: CPU-only stdio server that never imports torch (see numpy_inference.py)",
+    )
+    parser.add_argument('--socket', default='', help="Serve many clients on this Unix socket path instead of stdin")
+    parser.add_argument('--max-batch-positions', type=int, default=1024, help="Daemon: flush once this many positions are queued")
+    parser.add_argument('--batch-deadline-ms', type=float, default=2.0, help="Daemon: flush once the oldest request waited this long")
+    parser.add_argument('--device', default='auto', help="Daemon: device for every model; clients cannot override it")
+    parser.add_argument(
+        '--priority-weights',
+        default=os.environ.get('HIVE_GPU_PRIORITY_WEIGHTS', ''),
+        help=f"Daemon: weighted-fair shares per priority class (default {DEFAULT_PRIORITY_WEIGHTS})",
+    )
+    parser.add_argument(
+        '--max-queue-positions',
+        type=int,
+        default=int(os.environ.get('HIVE_GPU_MAX_QUEUE_POSITIONS', '16384') or 0),
+        help="Daemon: queued positions per priority class before infers are refused with a "
+             "backpressure error; 0 means unlimited",
+    )
+    parser.add_argument(
+        '--metrics-log',
+        default=os.environ.get('HIVE_GPU_METRICS_LOG', ''),
+        help="Append gpu_inference_stats events to this metrics JSONL (off when empty)",
+    )
+    parser.add_argument(
+        '--cache-mb',
+        type=float,
+        default=float(os.environ.get('HIVE_GPU_CACHE_MB', '0') or 0),
+        help="Byte budget (MiB) for the position result cache; 0 disables it",
+    )
+    parser.add_argument(
+        '--no-fused-forward',
+        dest='fused_forward',
+        action='store_false',
+        help="Run one forward per model key instead of stacking same-architecture models under vmap",
+    )
+    parser.add_argument(
+        '--model-memory-mb',
+        type=float,
+        default=float(os.environ.get('HIVE_GPU_MODEL_MEMORY_MB', '0') or 0),
+        help="Budget (MiB) for resident model weights; least recently used keys are evicted "
+             "and reloaded on next use. 0 means unlimited",
+    )
+    parser.add_argument(
+        '--no-dedup',
+        dest='dedup',
+        action='store_false',
+        help="Evaluate every copy of a repeated position instead of each distinct position once per batch",
+    )
+    parser.add_argument(
+        '--shape-buckets',
+        default=os.environ.get('HIVE_GPU_SHAPE_BUCKETS', ''),
+        help="Pad batches to these POSITIONSxACTIONS shapes (e.g. 8x1024,64x8192,512x65536) "
+             "and run a compiled forward per shape; off when empty",
+    )
+    parser.add_argument(
+        '--bucket-backend',
+        choices=ShapeBuckets.BACKENDS,
+        default='compile',
+        help="How shape buckets are specialized (falls back compile -> trace -> eager on failure)",
+    )
+    parser.add_argument('--warmup-on-load', action='store_true', help="Run every shape bucket whenever a model is installed")
+    parser.add_argument(
+        '--cpu-int8',
+        action='store_true',
+        default=os.environ.get('HIVE_GPU_CPU_INT8', '') not in ('', '0'),
+        help="On CPU, serve dynamic int8 copies of models that pass the fp32 parity check",
+    )
+    parser.add_argument(
+        '--int8-tolerance',
+        type=float,
+        default=0.05,
+        help="Largest value/logit error vs fp32 the int8 parity check accepts",
+    )
+    parser.add_argument(
+        '--replicas',
+        type=int,
+        default=0,
+        help="Supervisor mode: serve through N replica processes, each pinned to its own cores "
+             "(see replica_pool.py; env HIVE_INFERENCE_REPLICAS)",
+    )
+    parser.add_argument('--threads-per-replica', type=int, default=0, help="Supervisor: cores per replica (default cores/N)")
+    parser.add_argument('--min-shard-positions', type=int, default=16, help="Supervisor: smallest per-replica shard of a batch")
+    parser.add_argument(
+        '--replica-benchmark',
+        action='store_true',
+        help="Sweep replicas x threads per replica on --benchmark-model and print positions/s per split",
+    )
+    parser.add_argument(
+        '--intra-op-threads',
+        type=int,
+        default=0,
+        help="torch.set_num_threads for this process (set by the replica supervisor); 0 keeps torch's default",
+    )
+    parser.add_argument('--metrics-interval-sec', type=float, default=30.0, help="Seconds between metrics events")
+    parser.add_argument('--metrics-run-id', default='', help="runId for metrics events (default: az-gpu-server-<time>-<pid>)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.intra_op_threads > 0:
+        torch.set_num_threads(args.intra_op_threads)
+        torch.set_num_interop_threads(1)
+    buckets = parse_shape_buckets(args.shape_buckets)
+    server = InferenceServer(
+        shared=bool(args.socket),
+        cache_bytes=int(args.cache_mb * 1024 * 1024),
+        fused_forward=args.fused_forward,
+        shape_buckets=ShapeBuckets(buckets, args.bucket_backend) if buckets else None,
+        warmup_on_load=args.warmup_on_load,
+        int8_tolerance=args.int8_tolerance if args.cpu_int8 else None,
+        dedup=args.dedup,
+        model_budget_bytes=int(args.model_memory_mb * 1024 * 1024),
+    )
+    server.startup_ms = (time.perf_counter() - STARTED_AT) * 1000.0
+    rss = process_footprint()['rssMb']
+    emit_log(f"Ready: backend=torch startup={server.startup_ms:.0f}ms rss={'n/a' if rss is None else f'{rss:.0f}MB'}")
+    dumper: Optional[MetricsDumper] = None
+    if args.metrics_log:
+        run_id = args.metrics_run_id or f"az-gpu-server-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        dumper = MetricsDumper(server, args.metrics_log, args.metrics_interval_sec, run_id)
+        dumper.start()
+
+    try:
+        if not args.socket:
+            serve_stdio(server)
+            if dumper is not None:
+                dumper.stop()
+            # The request reader may still be blocked on stdin after shutdown.
+            exit_after_stdio(0)
+
+        server.device = torch.device('cuda' if args.device == 'auto' and torch.cuda.is_available() else
+                                     ('cpu' if args.device == 'auto' else args.device))
+        daemon = SocketDaemon(
+            server,
+            args.socket,
+            args.max_batch_positions,
+            args.batch_deadline_ms,
+            priority_weights=parse_priority_weights(args.priority_weights),
+            max_queue_positions=args.max_queue_positions,
+        )
+        signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+        try:
+            daemon.serve()
+        except KeyboardInterrupt:
+            pass
+    finally:
+        if dumper is not None:
+            dumper.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Wire protocol shared by the Hive inference server backends.
+
+JSON lines and binary infer frames (see gpu-inference-server.py for the frame
+layout) are read and written here without importing torch or numpy, so the
+numpy backend can serve the same clients without paying for torch at startup.
+BinaryInferFrame exposes its body as torch tensors or numpy arrays on demand.
+"""
+
+import json
+import os
+import struct
+import sys
+import time
+from typing import Any, BinaryIO, Dict, Optional, Sequence, Tuple
+
+
+BINARY_REQUEST_MAGIC = b'\x00HVI'
+BINARY_RESPONSE_MAGIC = b'\x00HVO'
+BINARY_REQUEST_HEADER = struct.Struct('<4sIIIII')
+BINARY_RESPONSE_HEADER = struct.Struct('<4sIII')
+
+
+class ProtocolError(Exception):
+    """Raised when the input stream can no longer be framed."""
+
+
+# JSON commands the daemon queues and fuses like infer.
+JSON_INFER_COMMANDS = ('infer', 'infer_priors', 'infer_board')
+
+
+def write_output(data: bytes):
+    """Write raw bytes to stdout."""
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+
+
+def exit_after_stdio(code: int = 0) -> None:
+    """
+    Flush stdout/stderr and end the process without interpreter teardown.
+
+    A reader thread blocked in sys.stdin.buffer.read holds the buffer lock, and
+    finalizing stdin under it aborts with "_enter_buffered_busy" (SIGABRT).
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
+
+
+def encode_response(request_id: Any, ok: bool, payload: Optional[Dict] = None, error: Optional[str] = None) -> bytes:
+    """Encode a JSON-line response."""
+    msg = {'id': request_id, 'ok': ok}
+    if payload is not None:
+        msg['payload'] = payload
+    if error is not None:
+        msg['error'] = error
+    return json.dumps(msg).encode('utf-8') + b'\n'
+
+
+def emit_response(request_id: Any, ok: bool, payload: Optional[Dict] = None, error: Optional[str] = None):
+    """Send response to stdout."""
+    write_output(encode_response(request_id, ok, payload, error))
+
+
+def encode_binary_response(
+    header: Dict[str, Any],
+    values: bytes = b'',
+    logits: bytes = b'',
+    position_count: int = 0,
+    action_total: int = 0,
+) -> bytes:
+    """Pack a binary infer response frame."""
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix = BINARY_RESPONSE_HEADER.pack(BINARY_RESPONSE_MAGIC, len(header_bytes), position_count, action_total)
+    return b''.join([prefix, header_bytes, values, logits])
+
+
+def encode_binary_result(request_id: Any, ok: bool, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bytes:
+    """Encode a binary infer result (or error) as a response frame."""
+    header: Dict[str, Any] = {'id': request_id, 'ok': ok}
+    if error is not None:
+        header['error'] = error
+    if result is None:
+        return encode_binary_response(header)
+    header['stats'] = result['stats']
+    return encode_binary_response(
+        header,
+        result['values'],
+        result['logits'],
+        result['positionCount'],
+        result['actionTotal'],
+    )
+
+
+def encode_binary_request(
+    header: Dict[str, Any],
+    position_count: int,
+    action_total: int,
+    state_dim: int,
+    action_dim: int,
+    sections: Sequence[bytes],
+) -> bytes:
+    """Pack a binary infer request frame; sections are state, actions and counts bytes."""
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix = BINARY_REQUEST_HEADER.pack(
+        BINARY_REQUEST_MAGIC, len(header_bytes), position_count, action_total, state_dim, action_dim,
+    )
+    return b''.join([prefix, header_bytes, *sections])
+
+
+def emit_binary_response(request_id: Any, ok: bool, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+    """Send a binary infer response frame to stdout."""
+    write_output(encode_binary_result(request_id, ok, result, error))
+
+
+def read_exact(stream: BinaryIO, size: int) -> bytearray:
+    """Read exactly size bytes into a fresh writable buffer."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    filled = 0
+    while filled < size:
+        count = stream.readinto(view[filled:])
+        if not count:
+            raise ProtocolError(f"Stream closed inside a binary frame ({filled}/{size} bytes)")
+        filled += count
+    return buffer
+
+
+class BinaryInferFrame:
+    """A binary infer request whose tensors are views over one receive buffer."""
+
+    def __init__(self, header: Dict[str, Any], body: bytearray, position_count: int,
+                 action_total: int, state_dim: int, action_dim: int):
+        self.header = header
+        self.body = body
+        self.position_count = position_count
+        self.action_total = action_total
+        self.state_dim = state_dim
+        self.action_dim = action_dim
+
+    @staticmethod
+    def body_size(position_count: int, action_total: int, state_dim: int, action_dim: int) -> int:
+        return 4 * (position_count * state_dim + action_total * action_dim + position_count)
+
+    def tensors(self) -> Tuple[Any, Any, Any]:
+        """Return (state, actions, counts) torch tensors sharing memory with the frame body."""
+        import torch
+
+        state_len = self.position_count * self.state_dim
+        action_len = self.action_total * self.action_dim
+        offset = 0
+        state = torch.frombuffer(self.body, dtype=torch.float32, count=state_len, offset=offset) \
+            if state_len else torch.empty(0, dtype=torch.float32)
+        offset += 4 * state_len
+        actions = torch.frombuffer(self.body, dtype=torch.float32, count=action_len, offset=offset) \
+            if action_len else torch.empty(0, dtype=torch.float32)
+        offset += 4 * action_len
+        counts = torch.frombuffer(self.body, dtype=torch.int32, count=self.position_count, offset=offset) \
+            if self.position_count else torch.empty(0, dtype=torch.int32)
+        return (
+            state.view(self.position_count, self.state_dim),
+            actions.view(self.action_total, self.action_dim),
+            counts,
+        )
+
+
+    def arrays(self) -> Tuple[Any, Any, Any]:
+        """Return (state, actions, counts) numpy arrays sharing memory with the frame body."""
+        import numpy as np
+
+        state_len = self.position_count * self.state_dim
+        action_len = self.action_total * self.action_dim
+        state = np.frombuffer(self.body, dtype='<f4', count=state_len)
+        actions = np.frombuffer(self.body, dtype='<f4', count=action_len, offset=4 * state_len)
+        counts = np.frombuffer(self.body, dtype='<i4', count=self.position_count, offset=4 * (state_len + action_len))
+        return (
+            state.reshape(self.position_count, self.state_dim),
+            actions.reshape(self.action_total, self.action_dim),
+            counts,
+        )
+
+
+def read_binary_frame(stream: BinaryIO, first: bytes) -> Tuple[BinaryInferFrame, float]:
+    """Read one binary frame; also returns the header decode time in ms (I/O excluded)."""
+    prefix = first + read_exact(stream, BINARY_REQUEST_HEADER.size - len(first))
+    magic, header_len, position_count, action_total, state_dim, action_dim = BINARY_REQUEST_HEADER.unpack(prefix)
+    if magic != BINARY_REQUEST_MAGIC:
+        raise ProtocolError(f"Bad binary frame magic: {bytes(magic)!r}")
+    raw_header = read_exact(stream, header_len) if header_len else b''
+    # The body is consumed before the header is decoded, and a bad header is a ProtocolError:
+    # a recoverable JSON error here would leave the body bytes to be parsed as the next request.
+    body = read_exact(stream, BinaryInferFrame.body_size(position_count, action_total, state_dim, action_dim))
+    started = time.perf_counter()
+    try:
+        header = json.loads(bytes(raw_header).decode('utf-8')) if header_len else {}
+    except ValueError as e:
+        raise ProtocolError(f"Bad binary frame header: {e}") from e
+    if not isinstance(header, dict):
+        raise ProtocolError("Binary frame header must be a JSON object")
+    decode_ms = (time.perf_counter() - started) * 1000.0
+    return BinaryInferFrame(header, body, position_count, action_total, state_dim, action_dim), decode_ms
+
+
+def read_message(stream: BinaryIO) -> Optional[Tuple[Any, Optional[BinaryInferFrame], float]]:
+    """
+    Read the next request from the stream.
+
+    Returns (request dict, None, decode_ms) for JSON lines, (header, frame,
+    decode_ms) for binary infer frames and None at end of stream. decode_ms only
+    covers parsing, not waiting on the stream.
+    """
+    while True:
+        first = stream.read(1)
+        if not first:
+            return None
+        if first == BINARY_REQUEST_MAGIC[:1]:
+            frame, decode_ms = read_binary_frame(stream, first)
+            return frame.header, frame, decode_ms
+        line = (first + stream.readline()).strip()
+        if not line:
+            continue
+        started = time.perf_counter()
+        request = json.loads(line)
+        return request, None, (time.perf_counter() - started) * 1000.0
+
+
+def read_response(stream: BinaryIO) -> Optional[Tuple[Dict[str, Any], Optional[Tuple[bytearray, bytearray]]]]:
+    """
+    Read the next response a server wrote (the client side of read_message).
+
+    Returns (response dict, None) for JSON lines, (header, (values, logits))
+    for binary infer responses and None at end of stream.
+    """
+    while True:
+        first = stream.read(1)
+        if not first:
+            return None
+        if first == BINARY_RESPONSE_MAGIC[:1]:
+            prefix = first + read_exact(stream, BINARY_RESPONSE_HEADER.size - 1)
+            magic, header_len, position_count, action_total = BINARY_RESPONSE_HEADER.unpack(prefix)
+            if magic != BINARY_RESPONSE_MAGIC:
+                raise ProtocolError(f"Bad binary response magic: {bytes(magic)!r}")
+            raw_header = read_exact(stream, header_len) if header_len else b''
+            values = read_exact(stream, 4 * position_count)
+            logits = read_exact(stream, 4 * action_total)
+            try:
+                header = json.loads(bytes(raw_header).decode('utf-8')) if header_len else {}
+            except ValueError as e:
+                raise ProtocolError(f"Bad binary response header: {e}") from e
+            return header, (values, logits)
+        line = (first + stream.readline()).strip()
+        if line:
+            return json.loads(line), None
+
+
+def infer_model_key(request: Any, frame: Optional[BinaryInferFrame]) -> Optional[str]:
+    """Model key that request-level timings of an infer are filed under; None for other commands."""
+    if frame is not None:
+        return str(frame.header.get('modelKey') or 'default')
+    if isinstance(request, dict) and request.get('cmd') in JSON_INFER_COMMANDS:
+        return str((request.get('payload') or {}).get('modelKey') or 'default')
+    return None
+
+
+def emit_log(message: str):
+    """Log to stderr."""
+    print(f"[gpu-server] {message}", file=sys.stderr, flush=True)
+
+
+def process_footprint() -> Dict[str, Any]:
+    """Current and peak resident set size of this process in MiB (None where unavailable)."""
+    rss_mb: Optional[float] = None
+    peak_mb: Optional[float] = None
+    try:
+        with open('/proc/self/statm', 'r', encoding='utf-8') as handle:
+            rss_mb = int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes.
+        peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except (ImportError, OSError):
+        pass
+    return {'rssMb': rss_mb, 'peakRssMb': peak_mb}
@@ -10,6 +10,10 @@ Key features:
 - PyTorch-based neural network inference
 - Compatible with the existing model format
 - Same MCTS algorithm as the TypeScript version
+- Array-backed search tree with Zobrist-keyed transpositions
+- Subtree reuse between searches
+- Single-pass batched features and policy forward
+- Optional make/unmake descent and compact slotted state types
 """
 
 import hashlib
@@ -17,8 +21,10 @@ import json
 import math
 import os
 import random
+import sys
 import time
-from dataclasses import dataclass, field
+import tracemalloc
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple, Set
 
 try:
@@ -28,6 +34,21 @@ except ImportError:
     print("PyTorch is required. Install with: pip install torch", flush=True)
     raise
 
+import numpy as np
+
+from board_features import (
+    ACTION_FEATURES,
+    GLOBAL_FEATURES,
+    HEX_DIRECTIONS,
+    MOVE_FLAG_FROM,
+    MOVE_FLAG_MOVE,
+    MOVE_FLAG_PILLBUG,
+    TOKEN_FEATURES,
+    board_batch_features,
+)
+from policy_priors import dirichlet_noise, segment_priors
+from policy_value_io import load_policy_value_weights, read_model_payload
+
 
 # =============================================================================
 # Piece and Game State Types
@@ -36,85 +57,237 @@ except ImportError:
 PIECE_TYPES = ['queen', 'beetle', 'grasshopper', 'spider', 'ant', 'ladybug', 'mosquito', 'pillbug']
 PIECE_TYPE_TO_INDEX = {t: i for i, t in enumerate(PIECE_TYPES)}
 
+# HexCoord packs (q, r) into one int: (q + HEX_BIAS) * HEX_STRIDE + (r + HEX_BIAS).
+# Offsets add directly in packed form while both axes stay inside the bias.
+HEX_BIAS = 1 << 15
+HEX_STRIDE = 1 << 16
+HEX_NEIGHBOR_OFFSETS = tuple(dq * HEX_STRIDE + dr for dq, dr in HEX_DIRECTIONS)
+_INTERNED_HEX: Dict[int, 'HexCoord'] = {}
+
 
-@dataclass
 class HexCoord:
-    q: int
-    r: int
+    """
+    Axial hex coordinate. packed holds (q, r) in one int, used for hashing,
+    equality and neighbor arithmetic.
+
+    Coordinates are shared (hex_at interns them and GameState.clone reuses
+    them), so they are immutable: assigning any attribute raises. Build a new
+    one instead. neighbors() returns interned coordinates cached per instance.
+    """
+
+    __slots__ = ('q', 'r', 'packed', '_neighbors')
+
+    def __init__(self, q: int, r: int):
+        if not (-HEX_BIAS <= q < HEX_BIAS and -HEX_BIAS <= r < HEX_BIAS):
+            raise ValueError(f"Hex coordinate ({q}, {r}) is out of range")
+        object.__setattr__(self, 'q', q)
+        object.__setattr__(self, 'r', r)
+        object.__setattr__(self, 'packed', (q + HEX_BIAS) * HEX_STRIDE + (r + HEX_BIAS))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"HexCoord is immutable; cannot assign {name}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"HexCoord is immutable; cannot delete {name}")
+
+    def __reduce__(self) -> Tuple[Any, Tuple[int, int]]:
+        return HexCoord, (self.q, self.r)
 
     def __hash__(self) -> int:
-        return hash((self.q, self.r))
+        return hash(self.packed)
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, HexCoord):
             return False
-        return self.q == other.q and self.r == other.r
+        return self.packed == other.packed
+
+    def __repr__(self) -> str:
+        return f"HexCoord(q={self.q!r}, r={self.r!r})"
 
     def neighbors(self) -> List['HexCoord']:
         """Get all 6 neighboring hex coordinates."""
-        directions = [(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)]
-        return [HexCoord(self.q + dq, self.r + dr) for dq, dr in directions]
+        try:
+            cached = self._neighbors
+        except AttributeError:
+            cached = tuple(hex_at_packed(self.packed + offset) for offset in HEX_NEIGHBOR_OFFSETS)
+            object.__setattr__(self, '_neighbors', cached)
+        return list(cached)
+
+
+def hex_at(q: int, r: int) -> HexCoord:
+    """Interned HexCoord for (q, r)."""
+    return hex_at_packed((q + HEX_BIAS) * HEX_STRIDE + (r + HEX_BIAS))
+
+
+def hex_at_packed(packed: int) -> HexCoord:
+    coord = _INTERNED_HEX.get(packed)
+    if coord is None:
+        coord = _INTERNED_HEX[packed] = HexCoord(packed // HEX_STRIDE - HEX_BIAS, packed % HEX_STRIDE - HEX_BIAS)
+    return coord
 
 
-@dataclass
 class Piece:
-    id: str
-    type: str
-    color: str  # 'white' or 'black'
+    """A piece; type_index is its type's index in PIECE_TYPES (-1 if unknown), set at construction."""
+
+    __slots__ = ('id', 'type', 'color', 'type_index')
+
+    def __init__(self, id: str, type: str, color: str):
+        self.id = id
+        self.type = type
+        self.color = color  # 'white' or 'black'
+        self.type_index = PIECE_TYPE_TO_INDEX.get(type, -1)
+
+    def _fields(self) -> Tuple[Any, ...]:
+        return (self.id, self.type, self.color)
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Piece(id={self.id!r}, type={self.type!r}, color={self.color!r})"
+
+    def copy(self) -> 'Piece':
+        piece = Piece.__new__(Piece)
+        piece.id, piece.type, piece.color, piece.type_index = self.id, self.type, self.color, self.type_index
+        return piece
 
 
-@dataclass
 class PlacedPiece(Piece):
-    position: HexCoord
-    stack_order: int = 0
+    __slots__ = ('position', 'stack_order')
+
+    def __init__(self, id: str, type: str, color: str, position: HexCoord, stack_order: int = 0):
+        self.id = id
+        self.type = type
+        self.color = color
+        self.type_index = PIECE_TYPE_TO_INDEX.get(type, -1)
+        self.position = position
+        self.stack_order = stack_order
+
+    def _fields(self) -> Tuple[Any, ...]:
+        return (self.id, self.type, self.color, self.position, self.stack_order)
+
+    def __repr__(self) -> str:
+        return (
+            f"PlacedPiece(id={self.id!r}, type={self.type!r}, color={self.color!r}, "
+            f"position={self.position!r}, stack_order={self.stack_order!r})"
+        )
+
+    def copy(self) -> 'PlacedPiece':
+        piece = PlacedPiece.__new__(PlacedPiece)
+        piece.id, piece.type, piece.color, piece.type_index = self.id, self.type, self.color, self.type_index
+        piece.position, piece.stack_order = self.position, self.stack_order
+        return piece
 
 
-@dataclass
 class Move:
-    type: str  # 'place' or 'move'
-    piece_id: str
-    to: HexCoord
-    from_pos: Optional[HexCoord] = None
-    is_pillbug_ability: bool = False
+    """A place or move action. Moves are not changed once created, so the action key is cached."""
+
+    __slots__ = ('type', 'piece_id', 'to', 'from_pos', 'is_pillbug_ability', '_action_key')
+
+    def __init__(
+        self,
+        type: str,  # 'place' or 'move'
+        piece_id: str,
+        to: HexCoord,
+        from_pos: Optional[HexCoord] = None,
+        is_pillbug_ability: bool = False,
+    ):
+        self.type = type
+        self.piece_id = piece_id
+        self.to = to
+        self.from_pos = from_pos
+        self.is_pillbug_ability = is_pillbug_ability
+        self._action_key: Optional[str] = None
 
     def to_action_key(self) -> str:
         """Convert move to a unique string key."""
-        if self.type == 'place':
-            return f"place:{self.piece_id}:{self.to.q},{self.to.r}"
-        else:
-            prefix = "pillbug:" if self.is_pillbug_ability else "move:"
-            return f"{prefix}{self.piece_id}:{self.to.q},{self.to.r}"
+        if self._action_key is None:
+            if self.type == 'place':
+                self._action_key = f"place:{self.piece_id}:{self.to.q},{self.to.r}"
+            else:
+                prefix = "pillbug:" if self.is_pillbug_ability else "move:"
+                self._action_key = f"{prefix}{self.piece_id}:{self.to.q},{self.to.r}"
+        return self._action_key
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            (self.type, self.piece_id, self.to, self.from_pos, self.is_pillbug_ability)
+            == (other.type, other.piece_id, other.to, other.from_pos, other.is_pillbug_ability)
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"Move(type={self.type!r}, piece_id={self.piece_id!r}, to={self.to!r}, "
+            f"from_pos={self.from_pos!r}, is_pillbug_ability={self.is_pillbug_ability!r})"
+        )
 
 
-@dataclass
 class GameState:
     """Simplified game state for MCTS."""
-    board: List[PlacedPiece]
-    white_hand: List[Piece]
-    black_hand: List[Piece]
-    current_turn: str  # 'white' or 'black'
-    turn_number: int
-    status: str  # 'playing' or 'finished'
-    winner: Optional[str] = None
-    white_queen_placed: bool = False
-    black_queen_placed: bool = False
+
+    __slots__ = (
+        'board', 'white_hand', 'black_hand', 'current_turn', 'turn_number', 'status',
+        'winner', 'white_queen_placed', 'black_queen_placed', 'zobrist',
+    )
+
+    def __init__(
+        self,
+        board: List[PlacedPiece],
+        white_hand: List[Piece],
+        black_hand: List[Piece],
+        current_turn: str,  # 'white' or 'black'
+        turn_number: int,
+        status: str,  # 'playing' or 'finished'
+        winner: Optional[str] = None,
+        white_queen_placed: bool = False,
+        black_queen_placed: bool = False,
+        zobrist: Optional[int] = None,  # Zobrist key, set by GpuMcts (see zobrist_hash)
+    ):
+        self.board = board
+        self.white_hand = white_hand
+        self.black_hand = black_hand
+        self.current_turn = current_turn
+        self.turn_number = turn_number
+        self.status = status
+        self.winner = winner
+        self.white_queen_placed = white_queen_placed
+        self.black_queen_placed = black_queen_placed
+        self.zobrist = zobrist
+
+    def __eq__(self, other: object) -> bool:
+        # zobrist is a cache of the position, not part of it: states reached by
+        # different paths (or not yet keyed) still compare equal.
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__ if name != 'zobrist')
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"GameState({fields})"
 
     def clone(self) -> 'GameState':
-        """Create a deep copy of the game state."""
+        """Create a deep copy of the game state (coordinates are immutable and shared)."""
         return GameState(
-            board=[PlacedPiece(
-                id=p.id, type=p.type, color=p.color,
-                position=HexCoord(p.position.q, p.position.r),
-                stack_order=p.stack_order
-            ) for p in self.board],
-            white_hand=[Piece(id=p.id, type=p.type, color=p.color) for p in self.white_hand],
-            black_hand=[Piece(id=p.id, type=p.type, color=p.color) for p in self.black_hand],
+            board=[p.copy() for p in self.board],
+            white_hand=[p.copy() for p in self.white_hand],
+            black_hand=[p.copy() for p in self.black_hand],
             current_turn=self.current_turn,
             turn_number=self.turn_number,
             status=self.status,
             winner=self.winner,
             white_queen_placed=self.white_queen_placed,
             black_queen_placed=self.black_queen_placed,
+            zobrist=self.zobrist,
         )
 
 
@@ -136,9 +309,9 @@ def get_queen_surround_count(board: List[PlacedPiece], color: str) -> int:
     if queen is None:
         return 0
 
-    occupied = {(p.position.q, p.position.r) for p in board}
-    neighbors = queen.position.neighbors()
-    return sum(1 for n in neighbors if (n.q, n.r) in occupied)
+    occupied = {p.position.packed for p in board}
+    center = queen.position.packed
+    return sum(1 for offset in HEX_NEIGHBOR_OFFSETS if center + offset in occupied)
 
 
 def clamp(value: float, min_val: float, max_val: float) -> float:
@@ -274,6 +447,96 @@ def adapt_action_features(features: List[float], expected_size: int) -> List[flo
     return features + [0.0] * (expected_size - len(features))
 
 
+def compact_position(state: GameState, moves: List[Move], perspective: str) -> Dict[str, Any]:
+    """
+    board_features encoding of a state and moves.
+
+    Pieces keep board order with their rank by id, and move piece types are
+    resolved as extract_action_features does, so board_batch_features with
+    stack_top='highest' reproduces the per-move extractors.
+    """
+    board = state.board
+    order = [0] * len(board)
+    for rank, index in enumerate(sorted(range(len(board)), key=lambda i: board[i].id)):
+        order[index] = rank
+    board_types: Dict[str, int] = {}
+    for piece in board:
+        board_types.setdefault(piece.id, piece.type_index)
+
+    move_rows = []
+    for move in moves:
+        is_move = move.type == 'move'
+        if is_move:
+            type_index = board_types.get(move.piece_id, PIECE_TYPE_TO_INDEX['queen'])
+        else:
+            type_index = PIECE_TYPE_TO_INDEX.get(move.piece_id.split('-')[0] if '-' in move.piece_id else 'queen', -1)
+        from_pos = move.from_pos if is_move else None
+        flags = (
+            (MOVE_FLAG_MOVE if is_move else 0)
+            | (MOVE_FLAG_PILLBUG if move.is_pillbug_ability else 0)
+            | (MOVE_FLAG_FROM if from_pos else 0)
+        )
+        move_rows.append([
+            flags,
+            type_index,
+            move.to.q,
+            move.to.r,
+            from_pos.q if from_pos else 0,
+            from_pos.r if from_pos else 0,
+        ])
+
+    return {
+        'pieces': [
+            [p.type_index, 0 if p.color == 'white' else 1, p.position.q, p.position.r, p.stack_order, order[i]]
+            for i, p in enumerate(board)
+        ],
+        'hands': [len(state.white_hand), len(state.black_hand)],
+        'turn': 0 if state.current_turn == 'white' else 1,
+        'turnNumber': state.turn_number,
+        'perspective': 0 if perspective == 'white' else 1,
+        'moves': move_rows,
+    }
+
+
+def game_state_from_json(data: Dict[str, Any]) -> GameState:
+    """GameState from the TypeScript GameState JSON (camelCase fields; extra fields ignored)."""
+    def piece(entry: Dict[str, Any]) -> Piece:
+        return Piece(id=entry['id'], type=entry['type'], color=entry['color'])
+
+    return GameState(
+        board=[
+            PlacedPiece(
+                id=entry['id'],
+                type=entry['type'],
+                color=entry['color'],
+                position=hex_at(int(entry['position']['q']), int(entry['position']['r'])),
+                stack_order=int(entry.get('stackOrder', 0)),
+            )
+            for entry in data.get('board') or []
+        ],
+        white_hand=[piece(entry) for entry in data.get('whiteHand') or []],
+        black_hand=[piece(entry) for entry in data.get('blackHand') or []],
+        current_turn=data['currentTurn'],
+        turn_number=int(data.get('turnNumber', 0)),
+        status=data.get('status', 'playing'),
+        winner=data.get('winner'),
+        white_queen_placed=bool(data.get('whiteQueenPlaced', False)),
+        black_queen_placed=bool(data.get('blackQueenPlaced', False)),
+    )
+
+
+def move_from_json(data: Dict[str, Any]) -> Move:
+    """Move from the TypeScript Move JSON."""
+    from_pos = data.get('from')
+    return Move(
+        type=data['type'],
+        piece_id=data['pieceId'],
+        to=hex_at(int(data['to']['q']), int(data['to']['r'])),
+        from_pos=hex_at(int(from_pos['q']), int(from_pos['r'])) if from_pos else None,
+        is_pillbug_ability=bool(data.get('isPillbugAbility', False)),
+    )
+
+
 # =============================================================================
 # Neural Network Model
 # =============================================================================
@@ -291,6 +554,7 @@ class PolicyValueNet(torch.nn.Module):
             prev = width
         self.trunk = torch.nn.Sequential(*layers)
         self.embedding_size = prev
+        self.action_size = action_size
 
         self.value_head = torch.nn.Linear(prev, 1)
         self.policy_input_size = prev + action_size
@@ -307,140 +571,42 @@ class PolicyValueNet(torch.nn.Module):
     def value(self, embedding: torch.Tensor) -> torch.Tensor:
         return torch.tanh(self.value_head(embedding))
 
-    def policy_logits(self, embedding: torch.Tensor, action_features: torch.Tensor) -> torch.Tensor:
-        """Compute policy logits for a batch of actions."""
-        joint = torch.cat([embedding, action_features], dim=-1)
-        hidden = torch.tanh(self.policy_input_hidden(joint))
+    def policy_logits(
+        self,
+        embedding: torch.Tensor,
+        action_features: torch.Tensor,
+        action_counts: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        """
+        Compute policy logits for a batch of actions.
+
+        policy_input_hidden is applied to [embedding, action] in two halves: the
+        state half (with the bias) once per embedding row, the action half once per
+        action. A (1, E) embedding broadcasts across all N actions; with
+        action_counts, embedding row i covers the next action_counts[i] actions.
+        """
+        weight = self.policy_input_hidden.weight
+        state_part = F.linear(embedding, weight[:, :self.embedding_size], self.policy_input_hidden.bias)
+        action_part = F.linear(action_features, weight[:, self.embedding_size:])
+        if action_counts is not None:
+            # output_size spares CUDA a sync to read the counts back.
+            state_part = torch.repeat_interleave(state_part, action_counts, dim=0, output_size=action_features.shape[0])
+        hidden = torch.tanh(state_part + action_part)
         hidden = torch.tanh(self.policy_hidden(hidden))
         logits = torch.matmul(hidden, self.policy_output_weights) + self.policy_bias
         return logits * self.policy_scale
 
 
 def load_model(model_path: str, device: torch.device) -> Tuple[PolicyValueNet, int, int, List[int]]:
-    """Load a model from JSON format."""
-    with open(model_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    """Load a model, memory-mapping its binary sidecar when present (JSON otherwise)."""
+    data, _ = read_model_payload(model_path)
 
     state_size = len(data.get('stateFeatureNames', []))
     action_size = len(data.get('actionFeatureNames', []))
-    trunk_layers = data.get('stateTrunk', [])
-    hidden = [layer['outputSize'] for layer in trunk_layers]
+    hidden = [layer['outputSize'] for layer in data.get('stateTrunk', [])]
 
     model = PolicyValueNet(state_size, action_size, hidden).to(device)
-
-    # Load trunk weights
-    trunk_linears = [m for m in model.trunk if isinstance(m, torch.nn.Linear)]
-    for i, linear in enumerate(trunk_linears):
-        layer_data = trunk_layers[i]
-        weights = torch.tensor(layer_data['weights'], dtype=torch.float32)
-        bias = torch.tensor(layer_data['bias'], dtype=torch.float32)
-        with torch.no_grad():
-            linear.weight.copy_(weights.reshape(layer_data['outputSize'], layer_data['inputSize']))
-            linear.bias.copy_(bias)
-
-    # Load value head
-    value_head = data.get('valueHead', {})
-    with torch.no_grad():
-        model.value_head.weight.copy_(
-            torch.tensor(value_head['weights'], dtype=torch.float32).reshape(1, -1)
-        )
-        model.value_head.bias.copy_(
-            torch.tensor([value_head['bias']], dtype=torch.float32)
-        )
-
-    # Load policy head
-    policy_head = data.get('policyHead', {})
-    with torch.no_grad():
-        model.policy_bias.copy_(
-            torch.tensor([policy_head['bias']], dtype=torch.float32)
-        )
-        model.policy_scale.copy_(
-            torch.tensor([float(policy_head.get('actionScale', 1.0))], dtype=torch.float32)
-        )
-        state_hidden_weights = policy_head.get('stateHiddenWeights')
-        action_hidden_weights = policy_head.get('actionHiddenWeights')
-        hidden_bias = policy_head.get('hiddenBias')
-        input_weights = policy_head.get('inputWeights')
-        input_bias = policy_head.get('inputBias')
-        hidden_weights = policy_head.get('hiddenWeights')
-        hidden_layer_bias = policy_head.get('hiddenLayerBias')
-        input_hidden_size = policy_head.get('inputHiddenSize')
-        output_weights = policy_head.get('outputWeights')
-        hidden_size = policy_head.get('hiddenSize')
-        legacy_action_weights = policy_head.get('actionWeights')
-        legacy_context_weights = policy_head.get('contextWeights')
-        legacy_state_weights = policy_head.get('stateWeights')
-
-        if (
-            isinstance(input_hidden_size, int)
-            and input_hidden_size == model.policy_hidden_size
-            and isinstance(hidden_size, int)
-            and hidden_size == model.policy_hidden_size
-            and isinstance(input_weights, list)
-            and len(input_weights) == model.policy_input_hidden.in_features * model.policy_input_hidden.out_features
-            and isinstance(input_bias, list)
-            and len(input_bias) == model.policy_input_hidden.out_features
-            and isinstance(hidden_weights, list)
-            and len(hidden_weights) == model.policy_hidden.in_features * model.policy_hidden.out_features
-            and isinstance(hidden_layer_bias, list)
-            and len(hidden_layer_bias) == model.policy_hidden.out_features
-            and isinstance(output_weights, list)
-            and len(output_weights) == model.policy_hidden_size
-        ):
-            model.policy_input_hidden.weight.copy_(
-                torch.tensor(input_weights, dtype=torch.float32).reshape(
-                    model.policy_input_hidden.out_features,
-                    model.policy_input_hidden.in_features,
-                )
-            )
-            model.policy_input_hidden.bias.copy_(torch.tensor(input_bias, dtype=torch.float32))
-            model.policy_hidden.weight.copy_(
-                torch.tensor(hidden_weights, dtype=torch.float32).reshape(
-                    model.policy_hidden.out_features,
-                    model.policy_hidden.in_features,
-                )
-            )
-            model.policy_hidden.bias.copy_(torch.tensor(hidden_layer_bias, dtype=torch.float32))
-            model.policy_output_weights.copy_(torch.tensor(output_weights, dtype=torch.float32))
-        elif (
-            isinstance(hidden_size, int)
-            and hidden_size == model.policy_hidden_size
-            and isinstance(state_hidden_weights, list)
-            and len(state_hidden_weights) == model.embedding_size * model.policy_hidden_size
-            and isinstance(action_hidden_weights, list)
-            and len(action_hidden_weights) == action_size * model.policy_hidden_size
-            and isinstance(hidden_bias, list)
-            and len(hidden_bias) == model.policy_hidden_size
-            and isinstance(output_weights, list)
-            and len(output_weights) == model.policy_hidden_size
-        ):
-            model.policy_input_hidden.weight.zero_()
-            model.policy_input_hidden.weight[:, :model.embedding_size].copy_(
-                torch.tensor(state_hidden_weights, dtype=torch.float32).reshape(model.policy_hidden_size, model.embedding_size)
-            )
-            model.policy_input_hidden.weight[:, model.embedding_size:].copy_(
-                torch.tensor(action_hidden_weights, dtype=torch.float32).reshape(model.policy_hidden_size, action_size)
-            )
-            model.policy_input_hidden.bias.copy_(torch.tensor(hidden_bias, dtype=torch.float32))
-            model.policy_hidden.weight.zero_()
-            model.policy_hidden.bias.zero_()
-            model.policy_hidden.weight.copy_(torch.eye(model.policy_hidden_size, dtype=torch.float32))
-            model.policy_output_weights.copy_(torch.tensor(output_weights, dtype=torch.float32))
-        else:
-            model.policy_input_hidden.weight.zero_()
-            model.policy_input_hidden.bias.zero_()
-            model.policy_hidden.weight.zero_()
-            model.policy_hidden.bias.zero_()
-            model.policy_output_weights.zero_()
-            if isinstance(legacy_action_weights, list) and len(legacy_action_weights) == action_size:
-                model.policy_input_hidden.weight[0, model.embedding_size:].copy_(torch.tensor(legacy_action_weights, dtype=torch.float32))
-            if isinstance(legacy_state_weights, list) and len(legacy_state_weights) > 0:
-                model.policy_input_hidden.bias[0] = float(sum(float(v) for v in legacy_state_weights) / len(legacy_state_weights))
-            elif isinstance(legacy_context_weights, list) and len(legacy_context_weights) > 0:
-                model.policy_input_hidden.bias[0] = float(sum(float(v) for v in legacy_context_weights) / len(legacy_context_weights))
-            model.policy_hidden.weight[0, 0] = 1.0
-            model.policy_output_weights[0] = 1.0
-
+    load_policy_value_weights(model, data)
     model.eval()
     return model, state_size, action_size, hidden
 
@@ -462,33 +628,188 @@ class MctsConfig:
     max_depth: int = 180
     virtual_loss: float = 1.0
     batch_size: int = 64  # Number of leaves to batch for GPU inference
+    debug_hash: bool = False  # Cross-check every Zobrist key (slow)
+    reuse_tree: bool = True  # Continue from the previous search's subtree when the root is in it
+    tree_node_budget: int = 100000  # Nodes kept when a subtree is reused
 
 
-@dataclass
-class MctsEdge:
-    action_key: str
-    move: Move
-    prior: float
-    visit_count: int = 0
-    value_sum: float = 0.0
-    virtual_loss_count: int = 0
-    child: Optional['MctsNode'] = None
+class SearchTree:
+    """
+    MCTS tree stored as parallel arrays indexed by integer node and edge ids.
+
+    A node's edges are created together on expansion and occupy the contiguous
+    slice [node_edge_start, node_edge_start + node_edge_count). Game states
+    (None for nodes added with keep_state=False), moves and action keys stay in
+    Python lists beside the arrays. Capacity doubles whenever a node or edge
+    would not fit. PUCT selection is one vectorized argmax over a node's edge
+    slice.
+    """
 
+    NODE_ARRAYS = (
+        ('node_hash', np.uint64),
+        ('node_visits', np.int64),
+        ('node_value_sum', np.float64),
+        ('node_pending_value', np.float64),
+        ('node_entropy', np.float64),
+        ('node_expanded', np.bool_),
+        ('node_finished', np.bool_),
+        ('node_terminal_value', np.float64),
+        ('node_edge_start', np.int64),
+        ('node_edge_count', np.int64),
+    )
+    EDGE_ARRAYS = (
+        ('edge_prior', np.float64),
+        ('edge_network_prior', np.float64),  # edge_prior before any root noise
+        ('edge_visits', np.int64),
+        ('edge_value_sum', np.float64),
+        ('edge_virtual_loss', np.int64),
+        ('edge_child', np.int64),
+    )
 
-@dataclass
-class MctsNode:
-    state: GameState
-    state_hash: str
-    to_play: str
-    visit_count: int = 0
-    value_sum: float = 0.0
-    expanded: bool = False
-    edges: Dict[str, MctsEdge] = field(default_factory=dict)
-    policy_entropy: float = 0.0
+    def __init__(self, node_capacity: int = 1024, edge_capacity: int = 16384):
+        self.node_count = 0
+        self.edge_count = 0
+        for name, dtype in self.NODE_ARRAYS:
+            setattr(self, name, np.zeros(node_capacity, dtype=dtype))
+        for name, dtype in self.EDGE_ARRAYS:
+            setattr(self, name, np.zeros(edge_capacity, dtype=dtype))
+        self.edge_child.fill(-1)
+        self.node_states: List[Optional[GameState]] = []
+        self.node_to_play: List[str] = []
+        self.edge_moves: List[Move] = []
+        self.edge_keys: List[str] = []
+
+    @property
+    def node_capacity(self) -> int:
+        return int(self.node_visits.shape[0])
+
+    @property
+    def edge_capacity(self) -> int:
+        return int(self.edge_prior.shape[0])
+
+    def _grow(self, arrays: Tuple[Tuple[str, Any], ...], needed: int) -> None:
+        capacity = max(1, int(getattr(self, arrays[0][0]).shape[0]))
+        while capacity < needed:
+            capacity *= 2
+        for name, dtype in arrays:
+            old = getattr(self, name)
+            new = np.full(capacity, -1, dtype=dtype) if name == 'edge_child' else np.zeros(capacity, dtype=dtype)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+
+    def add_node(self, state: GameState, state_hash: int, to_play: str, keep_state: bool = True) -> int:
+        """New node for state; only its terminal flags are kept unless keep_state."""
+        if self.node_count >= self.node_capacity:
+            self._grow(self.NODE_ARRAYS, self.node_count + 1)
+        node = self.node_count
+        self.node_count += 1
+        self.node_hash[node] = state_hash
+        self.node_finished[node] = state.status == 'finished'
+        self.node_terminal_value[node] = terminal_value(state, to_play)
+        self.node_states.append(state if keep_state else None)
+        self.node_to_play.append(to_play)
+        return node
+
+    def set_edges(
+        self,
+        node: int,
+        moves: List[Move],
+        keys: List[str],
+        priors: List[float],
+        network_priors: Optional[List[float]] = None,
+    ) -> None:
+        """Give a node a fresh edge slice and mark it expanded; network_priors defaults to priors."""
+        count = len(moves)
+        start = self.edge_count
+        if start + count > self.edge_capacity:
+            self._grow(self.EDGE_ARRAYS, start + count)
+        self.edge_count += count
+        self.edge_prior[start:start + count] = priors
+        self.edge_network_prior[start:start + count] = priors if network_priors is None else network_priors
+        self.edge_moves.extend(moves)
+        self.edge_keys.extend(keys)
+        self.node_edge_start[node] = start
+        self.node_edge_count[node] = count
+        self.node_expanded[node] = True
+
+    def edge_ids(self, node: int) -> range:
+        start = int(self.node_edge_start[node])
+        return range(start, start + int(self.node_edge_count[node]))
+
+    def select_edge(self, node: int, c_puct: float) -> int:
+        """PUCT argmax over the node's edges (first best on ties); -1 when it has none."""
+        count = int(self.node_edge_count[node])
+        if count == 0:
+            return -1
+        start = int(self.node_edge_start[node])
+        end = start + count
+        effective = self.edge_visits[start:end] + self.edge_virtual_loss[start:end]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            q_value = np.where(effective > 0, self.edge_value_sum[start:end] / effective, 0.0)
+        sqrt_visits = math.sqrt(int(self.node_visits[node]) + 1)
+        u_value = c_puct * self.edge_prior[start:end] * sqrt_visits / (1 + effective)
+        return start + int(np.argmax(q_value + u_value))
+
+    def compact(self, root: int, node_budget: int) -> 'SearchTree':
+        """
+        New tree holding the nodes reachable from root (renumbered breadth-first,
+        root = 0) and their edges. Past node_budget nodes, edges to further
+        children are cut; their statistics stay on the edge.
+        """
+        order = [root]
+        remap = np.full(self.node_count, -1, dtype=np.int64)
+        remap[root] = 0
+        cursor = 0
+        while cursor < len(order):
+            node = order[cursor]
+            cursor += 1
+            for edge in self.edge_ids(node):
+                child = int(self.edge_child[edge])
+                if child >= 0 and remap[child] < 0 and len(order) < node_budget:
+                    remap[child] = len(order)
+                    order.append(child)
+
+        nodes = np.asarray(order, dtype=np.int64)
+        counts = self.node_edge_count[nodes]
+        starts = self.node_edge_start[nodes]
+        new_starts = np.cumsum(counts) - counts
+        edge_total = int(counts.sum())
+        edges = np.repeat(starts - new_starts, counts) + np.arange(edge_total, dtype=np.int64)
+
+        tree = SearchTree(max(1024, len(order)), max(16384, edge_total))
+        tree.node_count = len(order)
+        tree.edge_count = edge_total
+        for name, _ in self.NODE_ARRAYS:
+            getattr(tree, name)[:len(order)] = getattr(self, name)[nodes]
+        for name, _ in self.EDGE_ARRAYS:
+            getattr(tree, name)[:edge_total] = getattr(self, name)[edges]
+        tree.node_edge_start[:len(order)] = new_starts
+        children = tree.edge_child[:edge_total]
+        tree.edge_child[:edge_total] = np.where(children >= 0, remap[np.maximum(children, 0)], -1)
+        tree.edge_virtual_loss[:edge_total] = 0
+        tree.node_states = [self.node_states[node] for node in order]
+        tree.node_to_play = [self.node_to_play[node] for node in order]
+        edge_list = edges.tolist()
+        tree.edge_moves = [self.edge_moves[edge] for edge in edge_list]
+        tree.edge_keys = [self.edge_keys[edge] for edge in edge_list]
+        return tree
+
+    def backpropagate(self, path_nodes: List[int], path_edges: List[int], value: float) -> None:
+        """Add value at the leaf, flipping sign at each step to the root, and release virtual loss."""
+        nodes = np.asarray(path_nodes, dtype=np.int64)
+        depth = len(path_nodes) - 1
+        values = np.where((depth - np.arange(len(path_nodes))) % 2 == 0, value, -value)
+        np.add.at(self.node_visits, nodes, 1)
+        np.add.at(self.node_value_sum, nodes, values)
+        if path_edges:
+            edges = np.asarray(path_edges, dtype=np.int64)
+            np.add.at(self.edge_visits, edges, 1)
+            np.add.at(self.edge_value_sum, edges, values[:-1])
+            self.edge_virtual_loss[edges] = np.maximum(0, self.edge_virtual_loss[edges] - 1)
 
 
 def hash_state(state: GameState) -> str:
-    """Create a hash of the game state for transposition table."""
+    """Legacy string hash of the game state; debug_hash checks Zobrist keys against it."""
     board_str = '|'.join(
         f"{p.id}:{p.position.q},{p.position.r}:{p.stack_order}"
         for p in sorted(state.board, key=lambda x: x.id)
@@ -497,6 +818,106 @@ def hash_state(state: GameState) -> str:
     return hashlib.sha256(key.encode()).hexdigest()[:16]
 
 
+# Zobrist keys are drawn on first use from a keyed BLAKE2b of the feature, so
+# the unbounded board needs no preallocated table and keys match across runs.
+_ZOBRIST_KEYS: Dict[Tuple[Any, ...], int] = {}
+
+
+def zobrist_key(*feature: Any) -> int:
+    """64-bit key for one hashed feature: ('piece', id, q, r, stack), ('turn', n) or ('black',)."""
+    key = _ZOBRIST_KEYS.get(feature)
+    if key is None:
+        digest = hashlib.blake2b(repr(feature).encode(), digest_size=8, person=b'hive-zobrist').digest()
+        key = _ZOBRIST_KEYS[feature] = int.from_bytes(digest, 'little')
+    return key
+
+
+def piece_zobrist(piece: PlacedPiece) -> int:
+    return zobrist_key('piece', piece.id, piece.position.q, piece.position.r, piece.stack_order)
+
+
+def zobrist_hash(state: GameState) -> int:
+    """Full Zobrist key: every placed piece, the side to move and the turn number."""
+    key = zobrist_key('turn', state.turn_number)
+    if state.current_turn == 'black':
+        key ^= zobrist_key('black')
+    for piece in state.board:
+        key ^= piece_zobrist(piece)
+    return key
+
+
+def zobrist_after_move(parent: GameState, child: GameState, move: Move) -> int:
+    """
+    child's key from parent's, touching only the moved piece, the side to move
+    and the turn number. Pillbug-ability moves, whose Move does not name the
+    piece that is carried, and parents without a key are rehashed in full.
+    """
+    return zobrist_with_move(zobrist_without_move(parent, move), child, move)
+
+
+def zobrist_without_move(parent: GameState, move: Move) -> Optional[int]:
+    """
+    First half of zobrist_after_move, read before move is made (in place):
+    parent's key without its side to move, turn number and the piece move
+    lifts. None when the child has to be rehashed in full.
+    """
+    if parent.zobrist is None or move.is_pillbug_ability:
+        return None
+    key = parent.zobrist ^ zobrist_key('turn', parent.turn_number)
+    if parent.current_turn == 'black':
+        key ^= zobrist_key('black')
+    before = next((p for p in parent.board if p.id == move.piece_id), None) if move.type == 'move' else None
+    if before is not None:
+        key ^= piece_zobrist(before)
+    return key
+
+
+def zobrist_with_move(partial: Optional[int], child: GameState, move: Move) -> int:
+    """Second half of zobrist_after_move: child's key from zobrist_without_move."""
+    if partial is None:
+        return zobrist_hash(child)
+    key = partial ^ zobrist_key('turn', child.turn_number)
+    if child.current_turn == 'black':
+        key ^= zobrist_key('black')
+    after = next((p for p in child.board if p.id == move.piece_id), None)
+    if after is not None:
+        key ^= piece_zobrist(after)
+    return key
+
+
+class ZobristCheck:
+    """
+    debug_hash bookkeeping: incremental keys against a full rehash and the legacy string hash.
+
+    GpuMcts keys every state with a 64-bit Zobrist key, updated with a few XORs
+    when a move is executed, and keys its transposition table by it. With
+    MctsConfig.debug_hash (or HIVE_MCTS_DEBUG_HASH=1), every new state is
+    checked here to count incremental mismatches and key collisions.
+    """
+
+    def __init__(self):
+        self.checks = 0
+        self.incremental_mismatches = 0
+        self.collisions = 0
+        self.legacy_by_key: Dict[int, str] = {}
+
+    def check(self, state: GameState) -> None:
+        self.checks += 1
+        if state.zobrist != zobrist_hash(state):
+            self.incremental_mismatches += 1
+        legacy = hash_state(state)
+        if self.legacy_by_key.setdefault(state.zobrist, legacy) != legacy:
+            self.collisions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'checks': self.checks,
+            'distinct_keys': len(self.legacy_by_key),
+            'incremental_mismatches': self.incremental_mismatches,
+            'collisions': self.collisions,
+        }
+
+
 def terminal_value(state: GameState, perspective: str) -> float:
     """Return terminal value from perspective's view."""
     if state.winner == 'draw':
@@ -508,23 +929,6 @@ def terminal_value(state: GameState, perspective: str) -> float:
     return 0.0
 
 
-def sample_dirichlet(n: int, alpha: float, rng: random.Random) -> List[float]:
-    """Sample from Dirichlet distribution."""
-    samples = [rng.gammavariate(alpha, 1.0) for _ in range(n)]
-    total = sum(samples)
-    return [s / total if total > 0 else 1.0 / n for s in samples]
-
-
-def softmax(logits: List[float]) -> List[float]:
-    """Compute softmax probabilities."""
-    if not logits:
-        return []
-    max_logit = max(logits)
-    exp_logits = [math.exp(l - max_logit) for l in logits]
-    total = sum(exp_logits)
-    return [e / total if total > 0 else 1.0 / len(logits) for e in exp_logits]
-
-
 def softmax_entropy(probs: List[float]) -> float:
     """Compute entropy of a probability distribution."""
     entropy = 0.0
@@ -537,10 +941,11 @@ def softmax_entropy(probs: List[float]) -> float:
 @dataclass
 class BatchedLeaf:
     """Represents a leaf node waiting for neural network evaluation."""
-    node: MctsNode
-    path_nodes: List[MctsNode]
-    path_edges: List[MctsEdge]
+    node: int
+    path_nodes: List[int]
+    path_edges: List[int]
     legal_moves: List[Move]
+    position: Dict[str, Any]  # compact_position, taken while the leaf's state was at hand
 
 
 class GpuMcts:
@@ -561,14 +966,25 @@ class GpuMcts:
         legal_move_generator,  # Function: (GameState, str) -> List[Move]
         move_executor,  # Function: (GameState, Move) -> GameState
         seed: int = 42,
+        make_move=None,  # Function: (GameState, Move) -> undo record; applies the move in place
+        unmake_move=None,  # Function: (GameState, Move, undo record) -> None; restores the state exactly
     ):
+        if (make_move is None) != (unmake_move is None):
+            raise ValueError("make_move and unmake_move must be given together")
         self.model = model
         self.device = device
         self.config = config
         self.get_legal_moves = legal_move_generator
         self.execute_move = move_executor
+        self.make_move = make_move
+        self.unmake_move = unmake_move
+        self.in_place = make_move is not None
         self.rng = random.Random(seed)
-        self.transposition: Dict[str, MctsNode] = {}
+        self.tree = SearchTree()
+        self.transposition: Dict[int, int] = {}
+        self.host_buffers: Dict[str, torch.Tensor] = {}
+        debug_hash = config.debug_hash or os.environ.get('HIVE_MCTS_DEBUG_HASH') == '1'
+        self.hash_check = ZobristCheck() if debug_hash else None
 
     def search(self, state: GameState, perspective: str) -> Tuple[Move, List[Dict], Dict]:
         """
@@ -580,28 +996,31 @@ class GpuMcts:
             - stats: Search statistics
         """
         start_time = time.time()
-        self.transposition.clear()
-
-        # Create root node
-        root_hash = hash_state(state)
-        root = MctsNode(
-            state=state,
-            state_hash=root_hash,
-            to_play=perspective,
-        )
-        self.transposition[root_hash] = root
 
-        # Expand root immediately
-        self._expand_single(root, is_root=True)
-
-        nodes_expanded = 1
+        # The root key is rebuilt in full because the caller's executor may
+        # have moved pieces since the key was last set.
+        state.zobrist = zobrist_hash(state)
+        root = self._root_node(state, perspective)
+        tree = self.tree
+        inherited_nodes = tree.node_count - 1
+        inherited_visits = int(tree.node_visits[root])
+
+        # Expand a new root immediately; a reused one only needs its noise.
+        nodes_expanded = 0
+        if tree.node_expanded[root]:
+            self._add_root_noise(root)
+        else:
+            self._expand_single(root, is_root=True)
+            nodes_expanded = 1
         depth_sum = 0
         simulations_done = 0
+        # Make/unmake descents all run on one copy of the root state.
+        descent_state = state.clone() if self.in_place else None
 
         # Run simulations in batches
         while simulations_done < self.config.simulations:
             batch_size = min(self.config.batch_size, self.config.simulations - simulations_done)
-            leaves = self._collect_leaves(root, batch_size)
+            leaves = self._collect_leaves(root, batch_size, descent_state)
 
             if not leaves:
                 break
@@ -629,303 +1048,371 @@ class GpuMcts:
             'nodes_per_second': nodes_expanded / max(0.001, elapsed),
             'average_simulation_depth': depth_sum / max(1, simulations_done),
             'policy_entropy': softmax_entropy([p['probability'] for p in policy]),
-            'root_value': root.value_sum / max(1, root.visit_count),
+            'root_value': float(tree.node_value_sum[root]) / max(1, int(tree.node_visits[root])),
             'batch_size': self.config.batch_size,
+            'execution': 'make_unmake' if self.in_place else 'clone',
+            'tree_nodes': tree.node_count,
+            'tree_edges': tree.edge_count,
+            'inherited_nodes': inherited_nodes,
+            'inherited_visits': inherited_visits,
+            'effective_simulations': simulations_done + inherited_visits,
             'elapsed_seconds': elapsed,
         }
+        if self.hash_check is not None:
+            stats['zobrist'] = self.hash_check.stats()
 
         return selected_move, policy, stats
 
-    def _collect_leaves(self, root: MctsNode, batch_size: int) -> List[BatchedLeaf]:
-        """Collect multiple leaf nodes for batched evaluation."""
+    def reset(self) -> None:
+        """Drop the retained tree (e.g. between games)."""
+        self.tree = SearchTree()
+        self.transposition.clear()
+
+    def _root_node(self, state: GameState, perspective: str) -> int:
+        """
+        Root for state: its node in the previous tree, compacted to the reachable
+        subtree, when reuse is on and one exists; otherwise a new tree.
+
+        With MctsConfig.reuse_tree the tree survives between searches. A reused
+        subtree keeps at most tree_node_budget nodes, and its root gets fresh
+        noise (_add_root_noise). search stats report the inherited visits.
+        """
+        root = self.transposition.get(state.zobrist, -1) if self.config.reuse_tree else -1
+        if root >= 0 and self.tree.node_to_play[root] == perspective:
+            self.tree = self.tree.compact(root, max(1, self.config.tree_node_budget))
+            self.transposition = {}
+            for node, node_hash in enumerate(self.tree.node_hash[:self.tree.node_count].tolist()):
+                self.transposition.setdefault(node_hash, node)
+            self.tree.node_states[0] = state
+            return 0
+
+        self.reset()
+        root = self.tree.add_node(state, state.zobrist, perspective)
+        self.transposition[state.zobrist] = root
+        return root
+
+    def _add_root_noise(self, root: int) -> None:
+        """
+        Give a reused root fresh seeded Dirichlet noise, as segment_priors does
+        for new roots. The noise is mixed into the network priors, so noise from
+        earlier searches of this root does not accumulate.
+        """
+        edges = self.tree.edge_ids(root)
+        network_priors = self.tree.edge_network_prior[edges.start:edges.stop]
+        if self.config.dirichlet_epsilon <= 0 or len(edges) < 2:
+            self.tree.edge_prior[edges.start:edges.stop] = network_priors
+            return
+        epsilon = self.config.dirichlet_epsilon
+        noise = dirichlet_noise(len(edges), self.config.dirichlet_alpha, self.rng.getrandbits(31)).numpy()
+        priors = network_priors * (1 - epsilon) + noise * epsilon
+        self.tree.edge_prior[edges.start:edges.stop] = priors / max(float(priors.sum()), 1e-9)
+
+    def _collect_leaves(self, root: int, batch_size: int, descent_state: Optional[GameState] = None) -> List[BatchedLeaf]:
+        """
+        Collect multiple leaf nodes for batched evaluation.
+
+        With descent_state (make/unmake), each descent applies its moves to that
+        state and undoes them once the leaf is recorded; otherwise it walks the
+        states stored on the nodes.
+        """
+        tree = self.tree
         leaves: List[BatchedLeaf] = []
 
         for _ in range(batch_size):
             path_nodes = [root]
-            path_edges: List[MctsEdge] = []
+            path_edges: List[int] = []
             node = root
             depth = 0
+            state = descent_state if descent_state is not None else tree.node_states[root]
+            undo_stack: List[Tuple[Move, Any, Optional[int]]] = []
 
             # Selection: traverse tree to leaf
             while (
-                node.expanded
-                and node.edges
-                and node.state.status == 'playing'
+                tree.node_expanded[node]
+                and tree.node_edge_count[node]
+                and not tree.node_finished[node]
                 and depth < self.config.max_depth
             ):
-                edge = self._select_edge(node)
-                if edge is None:
+                edge = tree.select_edge(node, self.config.c_puct)
+                if edge < 0:
                     break
 
                 # Apply virtual loss
-                edge.virtual_loss_count += 1
+                tree.edge_virtual_loss[edge] += 1
                 path_edges.append(edge)
 
-                # Get or create child
-                if edge.child is None:
-                    next_state = self.execute_move(node.state.clone(), edge.move)
-                    next_hash = hash_state(next_state)
-
-                    if next_hash in self.transposition:
-                        edge.child = self.transposition[next_hash]
-                    else:
-                        edge.child = MctsNode(
-                            state=next_state,
-                            state_hash=next_hash,
-                            to_play=next_state.current_turn,
-                        )
-                        self.transposition[next_hash] = edge.child
-
-                node = edge.child
+                # Advance the state, then get or create child
+                move = tree.edge_moves[edge]
+                child = int(tree.edge_child[edge])
+                if descent_state is not None:
+                    undo_stack.append(self._make(state, move, child))
+                elif child >= 0:
+                    state = tree.node_states[child]
+                else:
+                    state = self._execute(state, move)
+                if child < 0:
+                    child = self.transposition.get(state.zobrist, -1)
+                    if child < 0:
+                        child = tree.add_node(state, state.zobrist, state.current_turn, keep_state=descent_state is None)
+                        self.transposition[state.zobrist] = child
+                    tree.edge_child[edge] = child
+                    if descent_state is None:
+                        state = tree.node_states[child]
+
+                node = child
                 path_nodes.append(node)
                 depth += 1
 
             # Check if this is a valid leaf to expand
-            if node.state.status == 'finished':
+            to_play = tree.node_to_play[node]
+            if tree.node_finished[node]:
                 # Terminal node - backprop immediately
-                value = terminal_value(node.state, node.to_play)
-                self._backpropagate_value(path_nodes, path_edges, value)
-                continue
+                tree.backpropagate(path_nodes, path_edges, float(tree.node_terminal_value[node]))
             elif depth >= self.config.max_depth:
                 # Max depth - use heuristic value
                 value = 0.0  # Could add heuristic here
-                self._backpropagate_value(path_nodes, path_edges, value)
-                continue
-            elif node.expanded:
+                tree.backpropagate(path_nodes, path_edges, value)
+            elif tree.node_expanded[node]:
                 # Already expanded, shouldn't happen often
-                continue
-
-            # Get legal moves for this leaf
-            legal_moves = self.get_legal_moves(node.state, node.to_play)
-            if not legal_moves:
-                self._backpropagate_value(path_nodes, path_edges, -1.0)
-                continue
-
-            leaves.append(BatchedLeaf(
-                node=node,
-                path_nodes=path_nodes,
-                path_edges=path_edges,
-                legal_moves=legal_moves,
-            ))
+                pass
+            else:
+                # Get legal moves for this leaf
+                legal_moves = self.get_legal_moves(state, to_play)
+                if not legal_moves:
+                    tree.backpropagate(path_nodes, path_edges, -1.0)
+                else:
+                    leaves.append(BatchedLeaf(
+                        node=node,
+                        path_nodes=path_nodes,
+                        path_edges=path_edges,
+                        legal_moves=legal_moves,
+                        position=compact_position(state, legal_moves, to_play),
+                    ))
+
+            if undo_stack:
+                self._unmake(state, undo_stack)
 
         return leaves
 
-    def _batch_evaluate_and_expand(self, leaves: List[BatchedLeaf]) -> None:
-        """Evaluate multiple leaves in a single GPU batch."""
-        if not leaves:
-            return
+    def _execute(self, state: GameState, move: Move) -> GameState:
+        """Run the move executor on a copy of state and key the result."""
+        next_state = self.execute_move(state.clone(), move)
+        next_state.zobrist = zobrist_after_move(state, next_state, move)
+        if self.hash_check is not None:
+            self.hash_check.check(next_state)
+        return next_state
 
-        # Prepare state features batch
-        state_features_list = []
-        for leaf in leaves:
-            features = extract_state_features(leaf.node.state, leaf.node.to_play)
-            state_features_list.append(features)
+    def _make(self, state: GameState, move: Move, child: int) -> Tuple[Move, Any, Optional[int]]:
+        """
+        Apply move to state in place and key it: from child's node when the edge
+        already has one, else incrementally. Returns what _unmake needs.
+
+        This is the make/unmake descent, used when GpuMcts gets make_move and
+        unmake_move. Selection works on one copy of the root state and undoes
+        each descent's moves afterwards. Non-root nodes keep only their key,
+        side to move and terminal flags; the move on the parent edge is their
+        delta. Without the callbacks, every new child is executed on a clone
+        and kept. compare_execution_modes measures both paths.
+        """
+        previous_key = state.zobrist
+        partial = zobrist_without_move(state, move) if child < 0 else None
+        undo = self.make_move(state, move)
+        if child >= 0:
+            state.zobrist = int(self.tree.node_hash[child])
+        else:
+            state.zobrist = zobrist_with_move(partial, state, move)
+            if self.hash_check is not None:
+                self.hash_check.check(state)
+        return move, undo, previous_key
+
+    def _unmake(self, state: GameState, undo_stack: List[Tuple[Move, Any, Optional[int]]]) -> None:
+        """Undo a descent's moves, last first."""
+        for move, undo, previous_key in reversed(undo_stack):
+            self.unmake_move(state, move, undo)
+            state.zobrist = previous_key
+
+    def _host_buffer(self, name: str, shape: Tuple[int, ...], dtype: torch.dtype) -> torch.Tensor:
+        """
+        The first shape[0] rows of a reused host tensor whose row capacity
+        doubles as needed; pinned when searching on CUDA.
+        """
+        buffer = self.host_buffers.get(name)
+        if buffer is None or buffer.shape[0] < shape[0] or tuple(buffer.shape[1:]) != tuple(shape[1:]) or buffer.dtype != dtype:
+            capacity = max(1, buffer.shape[0] if buffer is not None else 1)
+            while capacity < shape[0]:
+                capacity *= 2
+            buffer = torch.zeros((capacity, *shape[1:]), dtype=dtype)
+            if self.device.type == 'cuda':
+                buffer = buffer.pin_memory()
+            self.host_buffers[name] = buffer
+        return buffer[:shape[0]]
+
+    def _extract_features(self, positions: List[Dict[str, Any]]) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Host tensors of state rows for the compact positions, action rows for
+        all their moves packed in position order, and per-position move counts,
+        computed in one board_features pass straight into the host buffers.
+        The per-move extract_*_features functions remain the reference; this
+        path matches them exactly.
+        """
+        action_size = self.model.action_size
+        state_host = self._host_buffer('state', (len(positions), DEFAULT_TOKEN_SLOTS * TOKEN_FEATURES + GLOBAL_FEATURES), torch.float32)
+        action_host = self._host_buffer('action', (sum(len(position['moves']) for position in positions), action_size), torch.float32)
+        counts_host = self._host_buffer('counts', (len(positions),), torch.int64)
+
+        # Columns past the extracted features stay zero, as in adapt_action_features.
+        actions = action_host.numpy()
+        action_out = actions[:, :ACTION_FEATURES] if action_size >= ACTION_FEATURES else None
+        _, packed, counts = board_batch_features(
+            positions,
+            DEFAULT_TOKEN_SLOTS,
+            stack_top='highest',
+            state_out=state_host.numpy(),
+            action_out=action_out,
+        )
+        if action_out is None:
+            actions[:] = packed[:, :action_size]
+        counts_host.numpy()[:] = counts
+        return state_host, action_host, counts_host
 
-        state_tensor = torch.tensor(state_features_list, dtype=torch.float32, device=self.device)
+    def _evaluate(self, positions: List[Dict[str, Any]]) -> Tuple[List[float], torch.Tensor]:
+        """
+        Values and packed policy logits for the positions from one fused forward pass.
+
+        Trunk, value head and policy head run once over all positions' actions.
+        policy_logits repeats the policy state half per action with
+        repeat_interleave. Features go to the device in one copy per reused
+        host buffer, pinned on CUDA. Values and logits come back together in one
+        blocking copy. That copy also guarantees the asynchronous
+        host-to-device copies are done before the buffers are reused.
+        """
+        state_host, action_host, counts_host = self._extract_features(positions)
+        state_tensor = state_host.to(self.device, non_blocking=True)
+        action_tensor = action_host.to(self.device, non_blocking=True)
+        action_counts = counts_host.to(self.device, non_blocking=True)
 
-        # Forward pass for embeddings and values
         with torch.no_grad():
             embeddings = self.model.embed(state_tensor)
-            values = self.model.value(embeddings).squeeze(-1).cpu().numpy()
-
-        # For each leaf, compute policy logits and expand
-        for i, leaf in enumerate(leaves):
-            embedding = embeddings[i:i+1]
-            value = float(values[i])
-            self._expand_leaf(leaf, embedding, value)
-
-    def _expand_leaf(self, leaf: BatchedLeaf, embedding: torch.Tensor, value: float) -> None:
-        """Expand a single leaf node using precomputed embedding."""
-        node = leaf.node
-        legal_moves = leaf.legal_moves
-        is_root = len(leaf.path_edges) == 0
-
-        # Compute action features for all legal moves
-        action_features_list = []
-        for move in legal_moves:
-            features = adapt_action_features(
-                extract_action_features(node.state, move, node.to_play),
-                self.model.policy_action_hidden.in_features,
-            )
-            action_features_list.append(features)
+            values = self.model.value(embeddings).reshape(-1)
+            logits = self.model.policy_logits(embeddings, action_tensor, action_counts).reshape(-1)
+            output_host = self._host_buffer('output', (values.shape[0] + logits.shape[0],), torch.float32)
+            output_host.copy_(torch.cat([values, logits]))
 
-        action_tensor = torch.tensor(action_features_list, dtype=torch.float32, device=self.device)
+        return output_host[:len(positions)].tolist(), output_host[len(positions):]
 
-        # Compute policy logits
-        with torch.no_grad():
-            # Expand embedding to match number of actions
-            expanded_embedding = embedding.expand(len(legal_moves), -1)
-            logits = self.model.policy_logits(expanded_embedding, action_tensor).cpu().numpy()
-
-        # Build candidates sorted by logit
-        candidates = sorted(
-            [(move, logits[i]) for i, move in enumerate(legal_moves)],
-            key=lambda x: x[1],
-            reverse=True,
-        )
-
-        # Prune and normalize
-        top_k = candidates[:self.config.policy_prune_top_k]
-        priors = softmax([c[1] for c in top_k])
-        priors = [(top_k[i][0], p) for i, p in enumerate(priors) if p >= self.config.policy_prune_min_prob]
-
-        if not priors:
-            priors = [(top_k[0][0], 1.0)]
-
-        # Apply Dirichlet noise at root
-        if is_root and len(priors) > 1 and self.config.dirichlet_epsilon > 0:
-            noise = sample_dirichlet(len(priors), self.config.dirichlet_alpha, self.rng)
-            eps = self.config.dirichlet_epsilon
-            priors = [
-                (move, prior * (1 - eps) + noise[i] * eps)
-                for i, (move, prior) in enumerate(priors)
-            ]
-
-        # Normalize priors
-        prior_sum = sum(p for _, p in priors)
-        priors = [(move, p / prior_sum) for move, p in priors]
-
-        # Create edges
-        node.edges = {}
-        for move, prior in priors:
-            action_key = move.to_action_key()
-            node.edges[action_key] = MctsEdge(
-                action_key=action_key,
-                move=move,
-                prior=prior,
-            )
+    def _batch_evaluate_and_expand(self, leaves: List[BatchedLeaf]) -> None:
+        """Evaluate multiple leaves in a single GPU batch."""
+        if not leaves:
+            return
 
-        node.policy_entropy = softmax_entropy([p for _, p in priors])
-        node.expanded = True
+        nodes = [leaf.node for leaf in leaves]
+        legal_moves = [leaf.legal_moves for leaf in leaves]
+        values, logits = self._evaluate([leaf.position for leaf in leaves])
+        self._apply_priors(nodes, legal_moves, logits, [len(leaf.path_edges) == 0 for leaf in leaves])
 
-        # Store value for backpropagation
-        leaf.node._pending_value = clamp(value, -1, 1)
+        # Store values for backpropagation
+        for node, value in zip(nodes, values):
+            self.tree.node_pending_value[node] = clamp(value, -1, 1)
 
-    def _expand_single(self, node: MctsNode, is_root: bool = False) -> float:
+    def _expand_single(self, node: int, is_root: bool = False) -> float:
         """Expand a single node (used for root expansion)."""
-        legal_moves = self.get_legal_moves(node.state, node.to_play)
+        node_state = self.tree.node_states[node]
+        to_play = self.tree.node_to_play[node]
+        legal_moves = self.get_legal_moves(node_state, to_play)
         if not legal_moves:
-            node.expanded = True
+            self.tree.node_expanded[node] = True
             return -1.0
 
-        # Extract features
-        state_features = extract_state_features(node.state, node.to_play)
-        state_tensor = torch.tensor([state_features], dtype=torch.float32, device=self.device)
-
-        action_features_list = [
-            adapt_action_features(
-                extract_action_features(node.state, move, node.to_play),
-                self.model.policy_action_hidden.in_features,
-            )
-            for move in legal_moves
-        ]
-        action_tensor = torch.tensor(action_features_list, dtype=torch.float32, device=self.device)
-
-        # Forward pass
-        with torch.no_grad():
-            embedding = self.model.embed(state_tensor)
-            value = float(self.model.value(embedding).item())
-
-            expanded_embedding = embedding.expand(len(legal_moves), -1)
-            logits = self.model.policy_logits(expanded_embedding, action_tensor).cpu().numpy()
-
-        # Build candidates
-        candidates = sorted(
-            [(move, logits[i]) for i, move in enumerate(legal_moves)],
-            key=lambda x: x[1],
-            reverse=True,
+        values, logits = self._evaluate([compact_position(node_state, legal_moves, to_play)])
+        self._apply_priors([node], [legal_moves], logits, [is_root])
+        return clamp(values[0], -1, 1)
+
+    def _apply_priors(self, nodes: List[int], legal_moves: List[List[Move]], logits: torch.Tensor, roots: List[bool]) -> None:
+        """Prune packed logits into priors (top-k, softmax, min-prob, root noise) and create each node's edges."""
+        kept_counts, action_index, priors = segment_priors(
+            logits,
+            torch.tensor([len(moves) for moves in legal_moves]),
+            self.config.policy_prune_top_k,
+            self.config.policy_prune_min_prob,
+            roots=roots,
+            seeds=[self.rng.getrandbits(31) if is_root else 0 for is_root in roots],
+            dirichlet_alpha=self.config.dirichlet_alpha,
+            dirichlet_epsilon=self.config.dirichlet_epsilon,
         )
-
-        top_k = candidates[:self.config.policy_prune_top_k]
-        priors = softmax([c[1] for c in top_k])
-        priors = [(top_k[i][0], p) for i, p in enumerate(priors) if p >= self.config.policy_prune_min_prob]
-
-        if not priors:
-            priors = [(top_k[0][0], 1.0)]
-
-        if is_root and len(priors) > 1 and self.config.dirichlet_epsilon > 0:
-            noise = sample_dirichlet(len(priors), self.config.dirichlet_alpha, self.rng)
-            eps = self.config.dirichlet_epsilon
-            priors = [
-                (move, prior * (1 - eps) + noise[i] * eps)
-                for i, (move, prior) in enumerate(priors)
-            ]
-
-        prior_sum = sum(p for _, p in priors)
-        priors = [(move, p / prior_sum) for move, p in priors]
-
-        node.edges = {}
-        for move, prior in priors:
-            action_key = move.to_action_key()
-            node.edges[action_key] = MctsEdge(
-                action_key=action_key,
-                move=move,
-                prior=prior,
+        # Roots also keep their priors without noise, for _add_root_noise on reuse.
+        # Noise does not change which moves are kept, so the rows line up.
+        network_priors = priors
+        if any(roots) and self.config.dirichlet_epsilon > 0:
+            _, _, network_priors = segment_priors(
+                logits,
+                torch.tensor([len(moves) for moves in legal_moves]),
+                self.config.policy_prune_top_k,
+                self.config.policy_prune_min_prob,
             )
 
-        node.policy_entropy = softmax_entropy([p for _, p in priors])
-        node.expanded = True
-        return clamp(value, -1, 1)
-
-    def _select_edge(self, node: MctsNode) -> Optional[MctsEdge]:
-        """Select edge using PUCT formula."""
-        best_edge = None
-        best_score = float('-inf')
-        sqrt_visits = math.sqrt(node.visit_count + 1)
+        index_list = action_index.tolist()
+        prior_list = priors.tolist()
+        network_list = network_priors.tolist()
+        offset = 0
+        for node, moves, kept in zip(nodes, legal_moves, kept_counts.tolist()):
+            end = offset + kept
+            self._set_edges(node, moves, index_list[offset:end], prior_list[offset:end], network_list[offset:end])
+            offset = end
 
-        for edge in node.edges.values():
-            effective_visits = edge.visit_count + edge.virtual_loss_count
-            q_value = edge.value_sum / effective_visits if effective_visits > 0 else 0
-            u_value = self.config.c_puct * edge.prior * sqrt_visits / (1 + effective_visits)
-            score = q_value + u_value
-
-            if score > best_score:
-                best_score = score
-                best_edge = edge
-
-        return best_edge
+    def _set_edges(
+        self,
+        node: int,
+        legal_moves: List[Move],
+        action_index: List[int],
+        priors: List[float],
+        network_priors: List[float],
+    ) -> None:
+        """Create a node's edges from its kept moves, priors and priors before root noise."""
+        # A repeated action key keeps its first slot and takes the later prior.
+        slots: Dict[str, int] = {}
+        moves: List[Move] = []
+        keys: List[str] = []
+        edge_priors: List[float] = []
+        edge_network_priors: List[float] = []
+        for move_index, prior, network_prior in zip(action_index, priors, network_priors):
+            move = legal_moves[move_index]
+            action_key = move.to_action_key()
+            slot = slots.setdefault(action_key, len(keys))
+            if slot == len(keys):
+                moves.append(move)
+                keys.append(action_key)
+                edge_priors.append(prior)
+                edge_network_priors.append(network_prior)
+            else:
+                moves[slot] = move
+                edge_priors[slot] = prior
+                edge_network_priors[slot] = network_prior
+
+        self.tree.set_edges(node, moves, keys, edge_priors, edge_network_priors)
+        self.tree.node_entropy[node] = softmax_entropy(priors)
 
     def _backpropagate(self, leaf: BatchedLeaf) -> None:
         """Backpropagate value through the tree."""
-        value = getattr(leaf.node, '_pending_value', 0.0)
-        self._backpropagate_value(leaf.path_nodes, leaf.path_edges, value)
+        value = float(self.tree.node_pending_value[leaf.node])
+        self.tree.backpropagate(leaf.path_nodes, leaf.path_edges, value)
 
-    def _backpropagate_value(
-        self,
-        path_nodes: List[MctsNode],
-        path_edges: List[MctsEdge],
-        value: float,
-    ) -> None:
-        """Backpropagate a value through the path."""
-        backed_value = value
-
-        for i in range(len(path_nodes) - 1, -1, -1):
-            node = path_nodes[i]
-            node.visit_count += 1
-            node.value_sum += backed_value
-
-            if i > 0:
-                edge = path_edges[i - 1]
-                parent_value = -backed_value
-                edge.visit_count += 1
-                edge.value_sum += parent_value
-                edge.virtual_loss_count = max(0, edge.virtual_loss_count - 1)
-                backed_value = parent_value
-
-    def _build_policy(self, root: MctsNode) -> List[Dict]:
+    def _build_policy(self, root: int) -> List[Dict]:
         """Build policy from root node edges."""
+        tree = self.tree
         policy_entries = []
-        for action_key, edge in root.edges.items():
-            forced_floor = int(self.config.forced_playouts * edge.prior * self.config.simulations)
-            adjusted_visits = max(edge.visit_count, forced_floor)
-            q_value = edge.value_sum / edge.visit_count if edge.visit_count > 0 else 0
+        for edge in tree.edge_ids(root):
+            prior = float(tree.edge_prior[edge])
+            visit_count = int(tree.edge_visits[edge])
+            forced_floor = int(self.config.forced_playouts * prior * self.config.simulations)
+            adjusted_visits = max(visit_count, forced_floor)
+            q_value = float(tree.edge_value_sum[edge]) / visit_count if visit_count > 0 else 0
 
             policy_entries.append({
-                'action_key': action_key,
-                'move': edge.move,
+                'action_key': tree.edge_keys[edge],
+                'move': tree.edge_moves[edge],
                 'visits': adjusted_visits,
-                'raw_visits': edge.visit_count,
-                'prior': edge.prior,
+                'raw_visits': visit_count,
+                'prior': prior,
                 'q_value': q_value,
             })
 
@@ -1002,3 +1489,107 @@ def create_mcts_config(
     if temperature is not None:
         config.temperature = temperature
     return config
+
+
+def benchmark_search(mcts: GpuMcts, state: GameState, perspective: str, repeats: int = 3) -> Dict[str, float]:
+    """
+    Time fresh searches from state, then trace one more with tracemalloc for
+    its peak allocation and the memory its tree still holds afterwards.
+    """
+    elapsed: List[float] = []
+    simulations = 0
+    for _ in range(max(1, repeats)):
+        mcts.reset()
+        start = time.perf_counter()
+        _, _, stats = mcts.search(state.clone(), perspective)
+        elapsed.append(time.perf_counter() - start)
+        simulations = stats['simulations']
+
+    mcts.reset()
+    tracemalloc.start()
+    try:
+        _, _, stats = mcts.search(state.clone(), perspective)
+        retained_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = sum(elapsed) / len(elapsed)
+    return {
+        'seconds': seconds,
+        'simulations_per_second': simulations / max(1e-9, seconds),
+        'tree_nodes': stats['tree_nodes'],
+        'peak_bytes': peak_bytes,
+        'retained_bytes': retained_bytes,
+        'retained_bytes_per_node': retained_bytes / max(1, stats['tree_nodes']),
+    }
+
+
+def compare_execution_modes(
+    model: PolicyValueNet,
+    device: torch.device,
+    config: MctsConfig,
+    legal_move_generator,
+    move_executor,
+    make_move,
+    unmake_move,
+    state: GameState,
+    perspective: str,
+    repeats: int = 3,
+    seed: int = 42,
+) -> Dict[str, Dict[str, float]]:
+    """benchmark_search for the clone path and the make/unmake path on the same position."""
+    clone_mcts = GpuMcts(model, device, config, legal_move_generator, move_executor, seed=seed)
+    in_place_mcts = GpuMcts(
+        model, device, config, legal_move_generator, move_executor, seed=seed,
+        make_move=make_move, unmake_move=unmake_move,
+    )
+    return {
+        'clone': benchmark_search(clone_mcts, state, perspective, repeats),
+        'make_unmake': benchmark_search(in_place_mcts, state, perspective, repeats),
+    }
+
+
+def main() -> None:
+    """
+    Feature parity check used by test-board-features.ts.
+
+    Reads {"cases": [{"state", "moves", "perspective"}]} (TypeScript GameState
+    and Move JSON) on stdin. Writes the batched features GpuMcts feeds the
+    network (compact_position through board_batch_features, as in
+    _extract_features) next to the per-move extract_*_features reference,
+    both as float32, so the caller can require exact equality.
+    """
+    request = json.load(sys.stdin)
+    states = []
+    positions = []
+    for case in request.get('cases') or []:
+        state = game_state_from_json(case['state'])
+        moves = [move_from_json(move) for move in case.get('moves') or []]
+        states.append((state, moves, case['perspective']))
+        positions.append(compact_position(state, moves, case['perspective']))
+
+    batch_state, batch_actions, counts = board_batch_features(positions, DEFAULT_TOKEN_SLOTS, stack_top='highest')
+    reference_state = np.array(
+        [extract_state_features(state, perspective) for state, _, perspective in states],
+        dtype=np.float32,
+    ).reshape(len(states), -1)
+    reference_actions = np.array(
+        [extract_action_features(state, move, perspective) for state, moves, perspective in states for move in moves],
+        dtype=np.float32,
+    ).reshape(-1, ACTION_FEATURES)
+    json.dump({
+        'batch': {
+            'stateFeatures': batch_state.tolist(),
+            'actionFeatures': batch_actions.tolist(),
+            'counts': counts.tolist(),
+        },
+        'reference': {
+            'stateFeatures': reference_state.tolist(),
+            'actionFeatures': reference_actions.tolist(),
+        },
+    }, sys.stdout)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Numpy backend for the Hive inference server (gpu-inference-server.py --backend numpy).
+
+The policy-value model is a small tanh MLP, so on CPU hosts plain BLAS matmuls
+are enough and skipping the torch import saves seconds and hundreds of MB per
+process. This backend never imports torch: weights come from
+policy_value_io.policy_value_arrays (JSON or the mmapped sidecar), framing
+from inference_protocol.
+
+It speaks the same stdio protocol (JSON lines and binary infer frames) with
+init, load_model, unload_model, infer, infer_priors, infer_board, reload,
+warmup, stats and shutdown. Reloads are synchronous. The Unix-socket daemon, result cache,
+shape buckets, fused multi-model forward and model memory budget are
+torch-backend features.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("numpy required for --backend numpy. Install: pip install numpy", file=sys.stderr, flush=True)
+    sys.exit(1)
+
+from inference_protocol import (
+    ProtocolError,
+    emit_binary_response,
+    emit_log,
+    emit_response,
+    encode_binary_result,
+    process_footprint,
+    read_message,
+    write_output,
+)
+from board_features import board_batch_features, token_slots_for_state_size
+from policy_priors import position_seeds, segment_priors_numpy
+from policy_value_io import policy_value_arrays, read_model_payload
+
+
+def adapt_action_array(actions: np.ndarray, expected_size: int) -> np.ndarray:
+    if actions.shape[1] == expected_size:
+        return actions
+    if actions.shape[1] > expected_size:
+        return actions[:, :expected_size]
+    return np.pad(actions, ((0, 0), (0, expected_size - actions.shape[1])))
+
+
+class NumpyPolicyValueNet:
+    """PolicyValueNet.forward_batch over contiguous float32 arrays (weights stored transposed)."""
+
+    def __init__(self, arrays: Dict[str, Any], state_size: int, action_size: int):
+        def contiguous(values: np.ndarray) -> np.ndarray:
+            return np.ascontiguousarray(values, dtype=np.float32)
+
+        self.state_size = state_size
+        self.action_size = action_size
+        self.trunk = [(contiguous(weight.T), contiguous(bias)) for weight, bias in arrays['trunk']]
+        self.embedding_size = self.trunk[-1][0].shape[1] if self.trunk else state_size
+        self.value_weight = contiguous(arrays['value_weight'].T)
+        self.value_bias = contiguous(arrays['value_bias'])
+        input_weight = arrays['policy_input_weight']
+        self.policy_state_weight = contiguous(input_weight[:, :self.embedding_size].T)
+        self.policy_action_weight = contiguous(input_weight[:, self.embedding_size:].T)
+        self.policy_input_bias = contiguous(arrays['policy_input_bias'])
+        self.policy_hidden_weight = contiguous(arrays['policy_hidden_weight'].T)
+        self.policy_hidden_bias = contiguous(arrays['policy_hidden_bias'])
+        self.policy_output_weights = contiguous(arrays['policy_output_weights'])
+        self.policy_bias = float(arrays['policy_bias'][0])
+        self.policy_scale = float(arrays['policy_scale'][0])
+
+    def forward_batch(self, state: np.ndarray, actions: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(values[positions], logits[action rows]) for a packed batch."""
+        embeddings = state
+        for weight, bias in self.trunk:
+            embeddings = np.tanh(embeddings @ weight + bias)
+        values = np.tanh(embeddings @ self.value_weight + self.value_bias)[:, 0]
+
+        state_part = embeddings @ self.policy_state_weight + self.policy_input_bias
+        action_part = actions @ self.policy_action_weight
+        hidden = np.tanh(np.repeat(state_part, counts, axis=0) + action_part)
+        hidden = np.tanh(hidden @ self.policy_hidden_weight + self.policy_hidden_bias)
+        logits = (hidden @ self.policy_output_weights + self.policy_bias) * self.policy_scale
+        return values.astype(np.float32, copy=False), logits.astype(np.float32, copy=False)
+
+
+def load_numpy_model(path: str) -> Tuple[NumpyPolicyValueNet, Dict[str, Any]]:
+    data, artifact = read_model_payload(path)
+    state_size = len(data.get('stateFeatureNames', []))
+    action_size = len(data.get('actionFeatureNames', []))
+    hidden = [layer['outputSize'] for layer in data.get('stateTrunk', [])]
+    model = NumpyPolicyValueNet(policy_value_arrays(data), state_size, action_size)
+    meta = {
+        'state_size': state_size,
+        'action_size': action_size,
+        'hidden': hidden,
+        'device': 'cpu',
+        'artifact_source': artifact['source'],
+        'artifact_load_ms': artifact['loadMs'],
+    }
+    return model, meta
+
+
+class NumpyInferenceServer:
+    """InferenceServer's stdio command set on NumpyPolicyValueNet models."""
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.startup_ms: Optional[float] = None
+        self.models: Dict[str, NumpyPolicyValueNet] = {}
+        self.model_meta: Dict[str, Dict[str, Any]] = {}
+        self.model_generation: Dict[str, int] = {}
+        self.inference_count = 0
+        self.binary_inference_count = 0
+        self.total_positions = 0
+        self.total_actions = 0
+        self.max_batch_size_seen = 0
+        self.forward_ms = 0.0
+        self.noise_rng = random.Random()
+
+    def handle_init(self, payload: Dict) -> Dict:
+        return self._load_model(payload, replace=True)
+
+    def handle_load_model(self, payload: Dict) -> Dict:
+        return self._load_model(payload, replace=False)
+
+    def handle_reload(self, payload: Dict) -> Dict:
+        return self._load_model(payload, replace=True)
+
+    def handle_unload_model(self, payload: Dict) -> Dict:
+        model_key = str(payload.get('modelKey') or 'default')
+        if model_key not in self.models:
+            raise ValueError(f"Unknown model key: {model_key}")
+        del self.models[model_key]
+        del self.model_meta[model_key]
+        emit_log(f"Unloaded model[{model_key}]")
+        return {'status': 'unloaded', 'modelKey': model_key, 'loadedModelKeys': sorted(self.models)}
+
+    def _load_model(self, payload: Dict, replace: bool) -> Dict:
+        model_path = payload.get('modelPath')
+        if not model_path:
+            raise ValueError("modelPath required")
+        model_key = str(payload.get('modelKey') or 'default')
+        if not replace and model_key in self.models:
+            raise ValueError(f"Model key already loaded: {model_key}")
+
+        resolved_path = os.path.abspath(model_path)
+        model, meta = load_numpy_model(resolved_path)
+        generation = self.model_generation.get(model_key, 0) + 1
+        meta['model_path'] = resolved_path
+        meta['generation'] = generation
+        self.models[model_key] = model
+        self.model_meta[model_key] = meta
+        self.model_generation[model_key] = generation
+        emit_log(
+            f"Loaded model[{model_key}] gen={generation}: state={meta['state_size']} action={meta['action_size']} "
+            f"hidden={meta['hidden']} backend=numpy source={meta['artifact_source']} ({meta['artifact_load_ms']:.1f}ms)"
+        )
+        return {
+            'status': 'ready',
+            'modelKey': model_key,
+            'device': 'cpu',
+            'cuda_available': False,
+            'backend': 'numpy',
+            'loadedModelKeys': sorted(self.models),
+            **meta,
+        }
+
+    def _infer_packed(
+        self,
+        state_all: np.ndarray,
+        actions_all: np.ndarray,
+        counts_all: np.ndarray,
+        position_keys: List[str],
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Evaluate a packed batch, one forward per model key."""
+        if not self.models:
+            raise RuntimeError("Model not initialized")
+        indices_by_key: Dict[str, List[int]] = {}
+        for index, model_key in enumerate(position_keys):
+            if model_key not in self.models:
+                raise ValueError(f"Unknown model key: {model_key}")
+            indices_by_key.setdefault(model_key, []).append(index)
+
+        counts_all = counts_all.astype(np.int64, copy=False)
+        offsets = np.cumsum(counts_all) - counts_all
+        values_out = np.zeros(len(position_keys), dtype=np.float32)
+        logits_out = np.zeros(int(counts_all.sum()), dtype=np.float32)
+        started = time.perf_counter()
+        for model_key, indices in indices_by_key.items():
+            model = self.models[model_key]
+            if len(indices_by_key) == 1:
+                selected = None
+                state_rows, action_rows, group_counts = state_all, actions_all, counts_all
+            else:
+                selected = np.asarray(indices, dtype=np.int64)
+                group_counts = counts_all[selected]
+                action_index = np.concatenate(
+                    [np.arange(offsets[i], offsets[i] + counts_all[i]) for i in indices]
+                ) if int(group_counts.sum()) else np.empty(0, dtype=np.int64)
+                state_rows = state_all[selected]
+                action_rows = actions_all[action_index]
+            values, logits = model.forward_batch(
+                state_rows,
+                adapt_action_array(action_rows, model.action_size),
+                group_counts,
+            )
+            if selected is None:
+                values_out, logits_out = values, logits
+            else:
+                values_out[selected] = values
+                logits_out[action_index] = logits
+        self.forward_ms += (time.perf_counter() - started) * 1000.0
+
+        self.inference_count += 1
+        self.total_positions += len(position_keys)
+        self.total_actions += int(logits_out.size)
+        self.max_batch_size_seen = max(self.max_batch_size_seen, len(position_keys))
+        return values_out, logits_out, len(indices_by_key)
+
+    def _evaluate_positions(self, payload: Dict) -> Tuple[List[str], np.ndarray, np.ndarray, List[int], int]:
+        if not self.models:
+            raise RuntimeError("Model not initialized")
+        positions = payload['positions']
+        default_model_key = str(payload.get('modelKey') or 'default')
+        position_keys = [str(pos.get('modelKey') or default_model_key) for pos in positions]
+        for model_key in position_keys:
+            if model_key not in self.models:
+                raise ValueError(f"Unknown model key: {model_key}")
+        counts = [len(pos.get('actions', [])) for pos in positions]
+        action_dim = max(self.model_meta[model_key]['action_size'] for model_key in set(position_keys))
+
+        state_all = np.asarray([pos['stateFeatures'] for pos in positions], dtype=np.float32)
+        actions_all = np.zeros((sum(counts), action_dim), dtype=np.float32)
+        row = 0
+        for pos in positions:
+            for action in pos.get('actions', []):
+                features = action['actionFeatures'][:action_dim]
+                actions_all[row, :len(features)] = features
+                row += 1
+        values, logits, group_count = self._infer_packed(
+            state_all,
+            actions_all,
+            np.asarray(counts, dtype=np.int64),
+            position_keys,
+        )
+        return position_keys, values, logits, counts, group_count
+
+    def handle_infer(self, payload: Dict) -> Dict:
+        positions = payload.get('positions', [])
+        if not positions:
+            return {'results': []}
+        position_keys, values, logits, counts, group_count = self._evaluate_positions(payload)
+        values_list = values.tolist()
+        logits_list = logits.tolist()
+        results = []
+        logit_offset = 0
+        for index, pos in enumerate(positions):
+            results.append({
+                'modelKey': position_keys[index],
+                'value': values_list[index],
+                'actionLogits': {
+                    action['actionKey']: logits_list[logit_offset + action_index]
+                    for action_index, action in enumerate(pos.get('actions', []))
+                },
+            })
+            logit_offset += counts[index]
+        return {'results': results, 'stats': self._infer_stats(len(positions), group_count)}
+
+    def handle_infer_priors(self, payload: Dict) -> Dict:
+        positions = payload.get('positions', [])
+        if not positions:
+            return {'results': []}
+        position_keys, values, logits, counts, group_count = self._evaluate_positions(payload)
+        kept_counts, action_index, priors = segment_priors_numpy(
+            logits,
+            counts,
+            int(payload.get('topK', 14)),
+            float(payload.get('minProb', 0.001)),
+            roots=[bool(pos.get('root')) for pos in positions],
+            seeds=position_seeds(positions, self.noise_rng),
+            dirichlet_alpha=float(payload.get('dirichletAlpha', 0.0)),
+            dirichlet_epsilon=float(payload.get('dirichletEpsilon', 0.0)),
+        )
+        values_list = values.tolist()
+        index_list = action_index.tolist()
+        prior_list = priors.tolist()
+        results = []
+        kept_offset = 0
+        for index, kept in enumerate(kept_counts.tolist()):
+            results.append({
+                'modelKey': position_keys[index],
+                'value': values_list[index],
+                'actionIndices': index_list[kept_offset:kept_offset + kept],
+                'priors': prior_list[kept_offset:kept_offset + kept],
+            })
+            kept_offset += kept
+        return {'results': results, 'stats': self._infer_stats(len(positions), group_count)}
+
+    def handle_infer_board(self, payload: Dict) -> Dict:
+        positions = payload.get('positions', [])
+        if not positions:
+            return {'results': []}
+        if not self.models:
+            raise RuntimeError("Model not initialized")
+        default_model_key = str(payload.get('modelKey') or 'default')
+        position_keys = [str(pos.get('modelKey') or default_model_key) for pos in positions]
+        for model_key in position_keys:
+            if model_key not in self.models:
+                raise ValueError(f"Unknown model key: {model_key}")
+        state_sizes = {self.model_meta[model_key]['state_size'] for model_key in position_keys}
+        if len(state_sizes) != 1:
+            raise ValueError("infer_board positions in one batch must share a state feature size")
+
+        state_all, actions_all, counts = board_batch_features(positions, token_slots_for_state_size(state_sizes.pop()))
+        values, logits, group_count = self._infer_packed(state_all, actions_all, counts, position_keys)
+        values_list = values.tolist()
+        logits_list = logits.tolist()
+        results = []
+        logit_offset = 0
+        for index, count in enumerate(counts.tolist()):
+            results.append({
+                'modelKey': position_keys[index],
+                'value': values_list[index],
+                'logits': logits_list[logit_offset:logit_offset + count],
+            })
+            logit_offset += count
+        return {'results': results, 'stats': self._infer_stats(len(positions), group_count)}
+
+    def handle_infer_binary(self, frame: Any) -> Dict[str, Any]:
+        state_all, actions_all, counts_all = frame.arrays()
+        if frame.position_count and int(counts_all.sum()) != frame.action_total:
+            raise ValueError("Binary frame action counts do not sum to the action total")
+        default_model_key = str(frame.header.get('modelKey') or 'default')
+        raw_keys = frame.header.get('modelKeys')
+        if isinstance(raw_keys, list):
+            if len(raw_keys) != frame.position_count:
+                raise ValueError("modelKeys length must match the position count")
+            position_keys = [str(key or default_model_key) for key in raw_keys]
+        else:
+            position_keys = [default_model_key] * frame.position_count
+
+        values, logits, group_count = self._infer_packed(state_all, actions_all, counts_all, position_keys)
+        self.binary_inference_count += 1
+        return {
+            'values': values.astype('<f4', copy=False).tobytes(),
+            'logits': logits.astype('<f4', copy=False).tobytes(),
+            'positionCount': frame.position_count,
+            'actionTotal': frame.action_total,
+            'stats': {**self._infer_stats(frame.position_count, group_count), 'fusedRequests': 1},
+        }
+
+    def _infer_stats(self, position_count: int, group_count: int) -> Dict[str, Any]:
+        return {
+            'queueDepth': position_count,
+            'groupCount': group_count,
+            'loadedModelKeys': sorted(self.models),
+        }
+
+    def handle_stats(self, payload: Dict) -> Dict:
+        return {
+            'backend': 'numpy',
+            'startupMs': self.startup_ms,
+            **process_footprint(),
+            'inferenceCount': self.inference_count,
+            'totalPositions': self.total_positions,
+            'totalActions': self.total_actions,
+            'totalBatches': self.inference_count,
+            'averageBatchSize': self.total_positions / self.inference_count if self.inference_count else 0.0,
+            'maxBatchSizeSeen': self.max_batch_size_seen,
+            'binaryInferenceCount': self.binary_inference_count,
+            'averageForwardMs': self.forward_ms / self.inference_count if self.inference_count else 0.0,
+            'device': 'cpu',
+            'cudaAvailable': False,
+            'loadedModelKeys': sorted(self.models),
+            'modelGeneration': dict(self.model_generation),
+            'blasThreads': os.environ.get('OMP_NUM_THREADS') or os.environ.get('OPENBLAS_NUM_THREADS'),
+        }
+
+
+def dispatch_numpy_command(server: NumpyInferenceServer, cmd: Any, payload: Dict) -> Dict:
+    if cmd == 'init':
+        return server.handle_init(payload)
+    if cmd == 'load_model':
+        return server.handle_load_model(payload)
+    if cmd == 'unload_model':
+        return server.handle_unload_model(payload)
+    if cmd == 'infer':
+        return server.handle_infer(payload)
+    if cmd == 'infer_priors':
+        return server.handle_infer_priors(payload)
+    if cmd == 'infer_board':
+        return server.handle_infer_board(payload)
+    if cmd == 'reload':
+        return server.handle_reload(payload)
+    if cmd == 'warmup':
+        return {'enabled': False, 'buckets': {}}
+    if cmd == 'stats':
+        return server.handle_stats(payload)
+    raise ValueError(f"Unknown command: {cmd}")
+
+
+def serve_numpy_stdio(server: NumpyInferenceServer) -> None:
+    stream = sys.stdin.buffer
+    while True:
+        request_id = None
+        try:
+            message = read_message(stream)
+        except ProtocolError as e:
+            emit_log(f"Protocol error, closing: {e}")
+            return
+        except ValueError as e:
+            emit_log(f"Invalid JSON: {e}")
+            emit_response(None, False, error=f"Invalid JSON: {e}")
+            continue
+        if message is None:
+            return
+        request, frame, _ = message
+        try:
+            request_id = request.get('id')
+            if frame is not None:
+                write_output(encode_binary_result(request_id, True, server.handle_infer_binary(frame)))
+                continue
+            cmd = request.get('cmd')
+            if cmd == 'shutdown':
+                emit_response(request_id, True, {'status': 'bye'})
+                return
+            emit_response(request_id, True, dispatch_numpy_command(server, cmd, request.get('payload', {})))
+        except Exception as e:
+            emit_log(f"Error: {e}")
+            if frame is not None:
+                emit_binary_response(request_id, False, error=str(e))
+            else:
+                emit_response(request_id, False, error=str(e))
+
+
+def main(argv: List[str], started_at: float) -> None:
+    """Entry point for gpu-inference-server.py --backend numpy (stdio only)."""
+    parser = argparse.ArgumentParser(description="Hive inference server (numpy backend)")
+    parser.add_argument('--backend', default='numpy')
+    parser.add_argument('--socket', default='')
+    # Threads come from OMP/OPENBLAS_NUM_THREADS, which the replica supervisor sets.
+    parser.add_argument('--intra-op-threads', type=int, default=0)
+    args, ignored = parser.parse_known_args(argv)
+    if args.socket:
+        emit_log("--backend numpy serves stdio only; run the torch backend for --socket")
+        sys.exit(2)
+    if ignored:
+        emit_log(f"Ignoring torch-backend options: {' '.join(ignored)}")
+
+    server = NumpyInferenceServer(started_at)
+    server.startup_ms = (time.perf_counter() - started_at) * 1000.0
+    footprint = process_footprint()
+    rss = footprint['rssMb']
+    emit_log(
+        f"Ready: backend=numpy startup={server.startup_ms:.0f}ms "
+        f"rss={'n/a' if rss is None else f'{rss:.0f}MB'} torch_loaded={'torch' in sys.modules}"
+    )
+    serve_numpy_stdio(server)
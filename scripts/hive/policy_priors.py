@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Search priors from packed policy logits, shared by the inference server and GpuMcts.
+
+Logits arrive packed the same way the inference server returns them: one flat
+tensor with counts[i] consecutive rows for position i. Every position gets the
+treatment the searches used to apply one position at a time in Python:
+
+    sort by logit, keep the top_k, softmax over them, drop priors under
+    min_prob (keeping the best move at prior 1.0 if nothing survives), mix
+    Dirichlet noise into root positions, renormalize
+
+The segment top-k and softmax run as single tensor ops over a (positions,
+max_count) padded view. Kept moves come back as indices into each position's
+own action list, in descending prior order before noise.
+
+segment_priors works on torch tensors and segment_priors_numpy on numpy
+arrays (for the numpy inference backend); each imports its library lazily.
+The two draw root noise from different generators, so the same seed gives
+different (equally distributed) noise per backend.
+"""
+
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def position_seeds(positions: Sequence[Dict[str, Any]], rng: random.Random) -> List[int]:
+    """
+    Noise seed per position: its own seed, else a fresh draw from rng for roots.
+
+    Servers pass a generator they keep across calls, so an unseeded root gets
+    new noise on every request instead of repeating its batch index's draw.
+    """
+    return [
+        int(pos['seed']) if 'seed' in pos else (rng.randrange(1 << 31) if pos.get('root') else 0)
+        for pos in positions
+    ]
+
+
+def dirichlet_noise(size: int, alpha: float, seed: int) -> Any:
+    """Seeded Dirichlet(alpha) sample that leaves the global torch RNG untouched."""
+    import torch
+
+    with torch.random.fork_rng(devices=[]):
+        torch.manual_seed(int(seed))
+        samples = torch.distributions.Gamma(
+            torch.full((size,), max(1e-4, float(alpha))),
+            torch.ones(size),
+        ).sample()
+    total = float(samples.sum())
+    if total <= 0:
+        return torch.full((size,), 1.0 / max(1, size))
+    return samples / total
+
+
+def segment_priors(
+    logits: Any,
+    counts: Any,
+    top_k: int,
+    min_prob: float,
+    roots: Optional[Sequence[bool]] = None,
+    seeds: Optional[Sequence[int]] = None,
+    dirichlet_alpha: float = 0.0,
+    dirichlet_epsilon: float = 0.0,
+) -> Tuple[Any, Any, Any]:
+    """
+    Pruned, normalized priors for a packed batch.
+
+    Returns (kept_counts[positions], action_index[kept_total], priors[kept_total]);
+    action_index is local to each position. roots[i] marks positions that get
+    Dirichlet noise, seeded with seeds[i].
+    """
+    import torch
+
+    counts = counts.to(device='cpu', dtype=torch.long)
+    position_count = int(counts.numel())
+    width = int(counts.max()) if position_count else 0
+    if width == 0 or top_k <= 0:
+        return (
+            torch.zeros(position_count, dtype=torch.long),
+            torch.empty(0, dtype=torch.long),
+            torch.empty(0, dtype=torch.float32),
+        )
+
+    logits = logits.detach().to(device='cpu', dtype=torch.float32)
+    offsets = torch.cumsum(counts, dim=0) - counts
+    column = torch.arange(width)
+    valid = column.unsqueeze(0) < counts.unsqueeze(1)
+    flat_index = (offsets.unsqueeze(1) + column.unsqueeze(0)).clamp(max=logits.numel() - 1)
+    padded = logits[flat_index].masked_fill(~valid, float('-inf'))
+
+    top_logits, top_index = torch.topk(padded, min(top_k, width), dim=1)
+    top_valid = valid.gather(1, top_index)
+    priors = torch.softmax(top_logits, dim=1).masked_fill(~top_valid, 0.0)
+    priors = torch.nan_to_num(priors, nan=0.0)
+
+    # Candidates are sorted, so the survivors of min_prob form a prefix of each row.
+    keep = top_valid & (priors >= min_prob)
+    nothing_kept = ~keep.any(dim=1) & (counts > 0)
+    keep[:, 0] |= nothing_kept
+    priors[:, 0] = torch.where(nothing_kept, torch.ones_like(priors[:, 0]), priors[:, 0])
+    kept_counts = keep.sum(dim=1)
+
+    if roots is not None and dirichlet_epsilon > 0:
+        noisy_rows: List[int] = [
+            row for row in range(position_count)
+            if roots[row] and int(kept_counts[row]) > 1
+        ]
+        for row in noisy_rows:
+            kept = int(kept_counts[row])
+            seed = int(seeds[row]) if seeds is not None else row
+            noise = dirichlet_noise(kept, dirichlet_alpha, seed)
+            priors[row, :kept] = priors[row, :kept] * (1 - dirichlet_epsilon) + noise * dirichlet_epsilon
+
+    priors = priors.masked_fill(~keep, 0.0)
+    priors = priors / priors.sum(dim=1, keepdim=True).clamp_min(1e-9)
+    return kept_counts, top_index[keep], priors[keep]
+
+
+def segment_priors_numpy(
+    logits: Any,
+    counts: Any,
+    top_k: int,
+    min_prob: float,
+    roots: Optional[Sequence[bool]] = None,
+    seeds: Optional[Sequence[int]] = None,
+    dirichlet_alpha: float = 0.0,
+    dirichlet_epsilon: float = 0.0,
+) -> Tuple[Any, Any, Any]:
+    """segment_priors over numpy arrays, with the same outputs as numpy arrays."""
+    import numpy as np
+
+    counts = np.asarray(counts, dtype=np.int64)
+    position_count = int(counts.size)
+    width = int(counts.max()) if position_count else 0
+    if width == 0 or top_k <= 0:
+        return (
+            np.zeros(position_count, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float32),
+        )
+
+    logits = np.asarray(logits, dtype=np.float32)
+    offsets = np.cumsum(counts) - counts
+    column = np.arange(width)
+    valid = column[None, :] < counts[:, None]
+    flat_index = np.minimum(offsets[:, None] + column[None, :], logits.size - 1)
+    padded = np.where(valid, logits[flat_index], -np.inf)
+
+    top_index = np.argsort(-padded, axis=1, kind='stable')[:, :min(top_k, width)]
+    top_logits = np.take_along_axis(padded, top_index, axis=1)
+    top_valid = np.take_along_axis(valid, top_index, axis=1)
+    with np.errstate(invalid='ignore', over='ignore'):
+        exps = np.where(top_valid, np.exp(top_logits - top_logits[:, :1]), 0.0)
+    priors = (exps / np.maximum(exps.sum(axis=1, keepdims=True), 1e-30)).astype(np.float32)
+
+    keep = top_valid & (priors >= min_prob)
+    nothing_kept = ~keep.any(axis=1) & (counts > 0)
+    keep[:, 0] |= nothing_kept
+    priors[nothing_kept, 0] = 1.0
+    kept_counts = keep.sum(axis=1)
+
+    if roots is not None and dirichlet_epsilon > 0:
+        noisy_rows: List[int] = [
+            row for row in range(position_count)
+            if roots[row] and int(kept_counts[row]) > 1
+        ]
+        for row in noisy_rows:
+            kept = int(kept_counts[row])
+            seed = int(seeds[row]) if seeds is not None else row
+            noise = np.random.default_rng(seed).gamma(max(1e-4, float(dirichlet_alpha)), size=kept)
+            total = float(noise.sum())
+            noise = noise / total if total > 0 else np.full(kept, 1.0 / kept)
+            priors[row, :kept] = priors[row, :kept] * (1 - dirichlet_epsilon) + noise * dirichlet_epsilon
+
+    priors = np.where(keep, priors, 0.0)
+    priors = priors / np.maximum(priors.sum(axis=1, keepdims=True), 1e-9)
+    return kept_counts, top_index[keep], priors[keep].astype(np.float32)
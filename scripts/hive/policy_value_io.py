@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Policy-value model artifacts shared by the Hive Python entry points.
+
+A model is still written as JSON (the format the TypeScript side reads), but
+export also drops a binary sidecar next to it:
+
+    <model>.weights.bin
+        4s   magic b'HVMB'
+        u32  format version
+        u64  header length
+        header JSON: {"sourceSha256", "payload", "arrays": [[offset, length], ...]}
+        zero padding to a 64-byte boundary
+        float32 little-endian array data, each array 64-byte aligned
+
+The header payload is the JSON document with every numeric weight list replaced
+by {"$array": index}. The sidecar is only trusted when its sourceSha256 matches
+the JSON bytes on disk, so a JSON rewritten by another tool (or a half-written
+sidecar) silently falls back to parsing the JSON.
+
+Loaded sidecar arrays are memoryviews over a copy-on-write mmap; use
+float_tensor() / float_array() / is_float_array() rather than assuming Python
+lists. torch and numpy are imported lazily so readers that do not need tensors
+stay torch-free; policy_value_arrays() is the loader for the numpy backend.
+"""
+
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+SIDECAR_SUFFIX = '.weights.bin'
+SIDECAR_MAGIC = b'HVMB'
+SIDECAR_VERSION = 1
+SIDECAR_PREFIX = struct.Struct('<4sIQ')
+SIDECAR_ALIGNMENT = 64
+WEIGHT_SECTIONS = ('stateTrunk', 'valueHead', 'policyHead', 'auxiliaryHeads')
+
+
+def sidecar_path(model_path: str) -> str:
+    """Path of the binary sidecar for a model JSON path."""
+    root, ext = os.path.splitext(model_path)
+    return (root if ext.lower() == '.json' else model_path) + SIDECAR_SUFFIX
+
+
+def is_float_array(value: Any) -> bool:
+    """True for weight arrays from either JSON (list) or a sidecar (memoryview)."""
+    return isinstance(value, (list, memoryview))
+
+
+def float_tensor(values: Any, device: Any = None) -> Any:
+    """Build a float32 tensor from a JSON list or a zero-copy view of a sidecar array."""
+    import torch
+
+    if isinstance(values, memoryview):
+        tensor = torch.frombuffer(values, dtype=torch.float32)
+    else:
+        tensor = torch.tensor(values, dtype=torch.float32)
+    return tensor if device is None else tensor.to(device)
+
+
+def _align(offset: int) -> int:
+    return (offset + SIDECAR_ALIGNMENT - 1) // SIDECAR_ALIGNMENT * SIDECAR_ALIGNMENT
+
+
+def _is_numeric_list(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) > 0
+        and all(isinstance(entry, (int, float)) and not isinstance(entry, bool) for entry in value)
+    )
+
+
+def _pack_arrays(node: Any, arrays: List[List[float]]) -> Any:
+    if _is_numeric_list(node):
+        arrays.append(node)
+        return {'$array': len(arrays) - 1}
+    if isinstance(node, dict):
+        return {key: _pack_arrays(value, arrays) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_pack_arrays(value, arrays) for value in node]
+    return node
+
+
+def _unpack_arrays(node: Any, views: List[memoryview]) -> Any:
+    if isinstance(node, dict):
+        if len(node) == 1 and '$array' in node:
+            return views[int(node['$array'])]
+        return {key: _unpack_arrays(value, views) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_unpack_arrays(value, views) for value in node]
+    return node
+
+
+def write_sidecar(path: str, payload: Dict[str, Any], source_sha256: str) -> None:
+    """Write the binary sidecar for an already-serialized model payload."""
+    arrays: List[List[float]] = []
+    header_payload = dict(payload)
+    for key in WEIGHT_SECTIONS:
+        if key in header_payload:
+            header_payload[key] = _pack_arrays(header_payload[key], arrays)
+
+    layout: List[List[int]] = []
+    offset = 0
+    for values in arrays:
+        layout.append([offset, len(values)])
+        offset = _align(offset + len(values) * 4)
+
+    header = json.dumps(
+        {'sourceSha256': source_sha256, 'payload': header_payload, 'arrays': layout},
+        separators=(',', ':'),
+    ).encode('utf-8')
+    data_start = _align(SIDECAR_PREFIX.size + len(header))
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as handle:
+        handle.write(SIDECAR_PREFIX.pack(SIDECAR_MAGIC, SIDECAR_VERSION, len(header)))
+        handle.write(header)
+        handle.write(b'\x00' * (data_start - SIDECAR_PREFIX.size - len(header)))
+        written = 0
+        for (array_offset, _), values in zip(layout, arrays):
+            handle.write(b'\x00' * (array_offset - written))
+            packed = array.array('f', values)
+            if sys.byteorder != 'little':
+                packed.byteswap()
+            handle.write(packed.tobytes())
+            written = array_offset + len(values) * 4
+    os.replace(tmp_path, path)
+
+
+def write_model_artifact(out_path: str, payload: Dict[str, Any]) -> str:
+    """Write the model JSON plus its binary sidecar. Returns the JSON sha256."""
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    raw = (json.dumps(payload, indent=2) + '\n').encode('utf-8')
+    digest = hashlib.sha256(raw).hexdigest()
+    with open(out_path, 'wb') as handle:
+        handle.write(raw)
+    write_sidecar(sidecar_path(out_path), payload, digest)
+    return digest
+
+
+def read_sidecar(path: str, source_sha256: str) -> Optional[Dict[str, Any]]:
+    """Map a sidecar and rebuild its payload, or None when it is missing or stale."""
+    if sys.byteorder != 'little' or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, header_size = SIDECAR_PREFIX.unpack_from(mapped, 0)
+        if magic != SIDECAR_MAGIC or version != SIDECAR_VERSION:
+            return None
+        header = json.loads(mapped[SIDECAR_PREFIX.size:SIDECAR_PREFIX.size + header_size].decode('utf-8'))
+        if header.get('sourceSha256') != source_sha256:
+            return None
+        data_start = _align(SIDECAR_PREFIX.size + header_size)
+        buffer = memoryview(mapped)
+        views: List[memoryview] = []
+        for offset, length in header['arrays']:
+            start = data_start + int(offset)
+            end = start + int(length) * 4
+            if end > len(mapped):
+                return None
+            views.append(buffer[start:end].cast('f'))
+        return _unpack_arrays(header['payload'], views)
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+
+
+def read_model_payload(model_path: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Read a model, preferring its sidecar.
+
+    Returns (payload, info) where info has source ('sidecar' | 'json'), the JSON
+    sha256 and the load time in milliseconds.
+    """
+    started = time.perf_counter()
+    with open(model_path, 'rb') as handle:
+        raw = handle.read()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    payload = read_sidecar(sidecar_path(model_path), digest)
+    source = 'sidecar'
+    if payload is None:
+        payload = json.loads(raw.decode('utf-8'))
+        source = 'json'
+
+    info = {
+        'source': source,
+        'sha256': digest,
+        'loadMs': (time.perf_counter() - started) * 1000.0,
+    }
+    return payload, info
+
+
+def float_array(values: Any) -> Any:
+    """float32 numpy array from a JSON list, or a zero-copy view of a sidecar array."""
+    import numpy as np
+
+    if isinstance(values, memoryview):
+        return np.frombuffer(values, dtype='<f4')
+    return np.asarray(values, dtype=np.float32)
+
+
+def policy_value_arrays(data: Dict[str, Any], policy_hidden_size: int = 64) -> Dict[str, Any]:
+    """
+    Inference weights of a model payload as float32 numpy arrays, resolving the
+    current, factorized and legacy policy-head layouts into one shape:
+
+        trunk                  [(weight (out, in), bias (out,)), ...]
+        value_weight           (1, E)       value_bias     (1,)
+        policy_input_weight    (P, E + A)   policy_input_bias   (P,)
+        policy_hidden_weight   (P, P)       policy_hidden_bias  (P,)
+        policy_output_weights  (P,)         policy_bias (1,)    policy_scale (1,)
+
+    E is the trunk output size (the state size without a trunk), A the action
+    feature count and P policy_hidden_size.
+    """
+    import numpy as np
+
+    state_size = len(data.get('stateFeatureNames', []))
+    action_size = len(data.get('actionFeatureNames', []))
+    trunk_layers = data.get('stateTrunk', [])
+
+    trunk = [
+        (
+            float_array(layer['weights']).reshape(layer['outputSize'], layer['inputSize']),
+            float_array(layer['bias']),
+        )
+        for layer in trunk_layers
+    ]
+    embedding_size = trunk_layers[-1]['outputSize'] if trunk_layers else state_size
+    hidden = policy_hidden_size
+
+    value_head = data.get('valueHead', {})
+    policy_head = data.get('policyHead', {})
+    arrays: Dict[str, Any] = {
+        'trunk': trunk,
+        'value_weight': float_array(value_head['weights']).reshape(1, -1),
+        'value_bias': np.array([value_head['bias']], dtype=np.float32),
+        'policy_bias': np.array([policy_head['bias']], dtype=np.float32),
+        'policy_scale': np.array([float(policy_head.get('actionScale', 1.0))], dtype=np.float32),
+    }
+
+    state_hidden_weights = policy_head.get('stateHiddenWeights')
+    action_hidden_weights = policy_head.get('actionHiddenWeights')
+    hidden_bias = policy_head.get('hiddenBias')
+    input_weights = policy_head.get('inputWeights')
+    input_bias = policy_head.get('inputBias')
+    hidden_weights = policy_head.get('hiddenWeights')
+    hidden_layer_bias = policy_head.get('hiddenLayerBias')
+    input_hidden_size = policy_head.get('inputHiddenSize')
+    output_weights = policy_head.get('outputWeights')
+    hidden_size = policy_head.get('hiddenSize')
+    legacy_action_weights = policy_head.get('actionWeights')
+    legacy_context_weights = policy_head.get('contextWeights')
+    legacy_state_weights = policy_head.get('stateWeights')
+    input_size = embedding_size + action_size
+
+    if (
+        isinstance(input_hidden_size, int)
+        and input_hidden_size == hidden
+        and isinstance(hidden_size, int)
+        and hidden_size == hidden
+        and is_float_array(input_weights)
+        and len(input_weights) == input_size * hidden
+        and is_float_array(input_bias)
+        and len(input_bias) == hidden
+        and is_float_array(hidden_weights)
+        and len(hidden_weights) == hidden * hidden
+        and is_float_array(hidden_layer_bias)
+        and len(hidden_layer_bias) == hidden
+        and is_float_array(output_weights)
+        and len(output_weights) == hidden
+    ):
+        arrays['policy_input_weight'] = float_array(input_weights).reshape(hidden, input_size)
+        arrays['policy_input_bias'] = float_array(input_bias)
+        arrays['policy_hidden_weight'] = float_array(hidden_weights).reshape(hidden, hidden)
+        arrays['policy_hidden_bias'] = float_array(hidden_layer_bias)
+        arrays['policy_output_weights'] = float_array(output_weights)
+    elif (
+        isinstance(hidden_size, int)
+        and hidden_size == hidden
+        and is_float_array(state_hidden_weights)
+        and len(state_hidden_weights) == embedding_size * hidden
+        and is_float_array(action_hidden_weights)
+        and len(action_hidden_weights) == action_size * hidden
+        and is_float_array(hidden_bias)
+        and len(hidden_bias) == hidden
+        and is_float_array(output_weights)
+        and len(output_weights) == hidden
+    ):
+        input_weight = np.zeros((hidden, input_size), dtype=np.float32)
+        input_weight[:, :embedding_size] = float_array(state_hidden_weights).reshape(hidden, embedding_size)
+        input_weight[:, embedding_size:] = float_array(action_hidden_weights).reshape(hidden, action_size)
+        arrays['policy_input_weight'] = input_weight
+        arrays['policy_input_bias'] = float_array(hidden_bias)
+        arrays['policy_hidden_weight'] = np.eye(hidden, dtype=np.float32)
+        arrays['policy_hidden_bias'] = np.zeros(hidden, dtype=np.float32)
+        arrays['policy_output_weights'] = float_array(output_weights)
+    else:
+        input_weight = np.zeros((hidden, input_size), dtype=np.float32)
+        input_bias_array = np.zeros(hidden, dtype=np.float32)
+        hidden_weight = np.zeros((hidden, hidden), dtype=np.float32)
+        output = np.zeros(hidden, dtype=np.float32)
+        if is_float_array(legacy_action_weights) and len(legacy_action_weights) == action_size:
+            input_weight[0, embedding_size:] = float_array(legacy_action_weights)
+        if is_float_array(legacy_state_weights) and len(legacy_state_weights) > 0:
+            input_bias_array[0] = float(sum(float(v) for v in legacy_state_weights) / len(legacy_state_weights))
+        elif is_float_array(legacy_context_weights) and len(legacy_context_weights) > 0:
+            input_bias_array[0] = float(sum(float(v) for v in legacy_context_weights) / len(legacy_context_weights))
+        hidden_weight[0, 0] = 1.0
+        output[0] = 1.0
+        arrays['policy_input_weight'] = input_weight
+        arrays['policy_input_bias'] = input_bias_array
+        arrays['policy_hidden_weight'] = hidden_weight
+        arrays['policy_hidden_bias'] = np.zeros(hidden, dtype=np.float32)
+        arrays['policy_output_weights'] = output
+    return arrays
+
+
+def load_policy_value_weights(model: Any, data: Dict[str, Any]) -> None:
+    """
+    Copy a model payload into an inference PolicyValueNet (the policy_scale variant
+    used by the GPU server and GpuMcts). The trainer has its own widening loader.
+    """
+    import torch
+
+    arrays = policy_value_arrays(data, model.policy_hidden_size)
+
+    def copy_into(target: Any, source: Any) -> None:
+        target.copy_(torch.from_numpy(source).reshape(target.shape))
+
+    with torch.no_grad():
+        trunk_linears = [m for m in model.trunk if isinstance(m, torch.nn.Linear)]
+        for linear, (weight, bias) in zip(trunk_linears, arrays['trunk']):
+            copy_into(linear.weight, weight)
+            copy_into(linear.bias, bias)
+        copy_into(model.value_head.weight, arrays['value_weight'])
+        copy_into(model.value_head.bias, arrays['value_bias'])
+        copy_into(model.policy_bias, arrays['policy_bias'])
+        copy_into(model.policy_scale, arrays['policy_scale'])
+        copy_into(model.policy_input_hidden.weight, arrays['policy_input_weight'])
+        copy_into(model.policy_input_hidden.bias, arrays['policy_input_bias'])
+        copy_into(model.policy_hidden.weight, arrays['policy_hidden_weight'])
+        copy_into(model.policy_hidden.bias, arrays['policy_hidden_bias'])
+        copy_into(model.policy_output_weights, arrays['policy_output_weights'])
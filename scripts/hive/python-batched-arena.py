@@ -4,13 +4,17 @@ import argparse
 import json
 import math
 import shutil
+import socket
+import struct
 import subprocess
 import sys
 import threading
 import time
+from array import array
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
@@ -18,68 +22,194 @@ SCRIPTS_DIR = ROOT_DIR / "scripts" / "hive"
 GPU_SERVER_PATH = SCRIPTS_DIR / "gpu-inference-server.py"
 ENGINE_SERVER_PATH = SCRIPTS_DIR / "hive-engine-server.ts"
 
+# Must match the framing constants in gpu-inference-server.py.
+BINARY_REQUEST_MAGIC = b"\x00HVI"
+BINARY_RESPONSE_MAGIC = b"\x00HVO"
+BINARY_REQUEST_HEADER = struct.Struct("<4sIIIII")
+BINARY_RESPONSE_HEADER = struct.Struct("<4sIII")
+
+
+class ServerBackpressure(RuntimeError):
+    """The inference daemon refused a request because its priority queue is full."""
+
+    def __init__(self, message: str, retry_after_ms: float) -> None:
+        super().__init__(message)
+        self.retry_after_ms = retry_after_ms
+
 
 class SyncJsonLineProcessClient:
-    def __init__(self, argv: List[str], cwd: Path, stderr_prefix: str):
+    """
+    JSON-lines client that keeps up to max_in_flight requests outstanding.
+
+    A reader thread matches responses (JSON lines or binary infer frames) to
+    their futures by id, so the server may answer out of order.
+    """
+
+    def __init__(self, argv: List[str], cwd: Path, stderr_prefix: str, max_in_flight: int = 8):
         self.proc = subprocess.Popen(
             argv,
             cwd=str(cwd),
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
         )
-        self.stderr_prefix = stderr_prefix
-        self.next_id = 1
-        self.closed = False
         if self.proc.stderr is not None:
             self.stderr_thread = threading.Thread(target=self._pump_stderr, daemon=True)
             self.stderr_thread.start()
         else:
             self.stderr_thread = None
+        self._start(self.proc.stdin, self.proc.stdout, stderr_prefix, max_in_flight)
+
+    def _start(self, writer: Any, reader: Any, stderr_prefix: str, max_in_flight: int) -> None:
+        self.writer = writer
+        self.reader = reader
+        self.stderr_prefix = stderr_prefix
+        self.next_id = 1
+        self.closed = False
+        self.pending: Dict[str, Tuple[str, Future]] = {}
+        self.pending_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.in_flight = threading.BoundedSemaphore(max(1, max_in_flight))
+        self.response_thread = threading.Thread(target=self._pump_responses, daemon=True)
+        self.response_thread.start()
 
     def _pump_stderr(self) -> None:
         assert self.proc.stderr is not None
         for raw_line in self.proc.stderr:
-            line = raw_line.rstrip("\n")
+            line = raw_line.decode("utf-8", errors="replace").rstrip("\n")
             if line:
                 sys.stderr.write(f"[{self.stderr_prefix}] {line}\n")
                 sys.stderr.flush()
 
-    def request(self, cmd: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-        if self.closed or self.proc.stdin is None or self.proc.stdout is None:
+    def _pump_responses(self) -> None:
+        try:
+            while True:
+                first = self.reader.read(1)
+                if not first:
+                    break
+                if first == BINARY_RESPONSE_MAGIC[:1]:
+                    prefix = first + self._read_exact(BINARY_RESPONSE_HEADER.size - 1)
+                    magic, header_len, out_positions, out_actions = BINARY_RESPONSE_HEADER.unpack(prefix)
+                    if magic != BINARY_RESPONSE_MAGIC:
+                        raise RuntimeError(f"{self.stderr_prefix} sent an unexpected frame: {magic!r}")
+                    response = json.loads(self._read_exact(header_len))
+                    result: Any = (response, self._read_exact(4 * (out_positions + out_actions)))
+                else:
+                    raw = (first + self.reader.readline()).strip()
+                    if not raw:
+                        continue
+                    response = json.loads(raw)
+                    payload_out = response.get("payload")
+                    result = payload_out if isinstance(payload_out, dict) else {}
+                with self.pending_lock:
+                    entry = self.pending.pop(str(response.get("id")), None)
+                if entry is None:
+                    continue
+                self.in_flight.release()
+                if response.get("ok"):
+                    entry[1].set_result(result)
+                elif response.get("backpressure"):
+                    entry[1].set_exception(ServerBackpressure(
+                        response.get("error") or f"{self.stderr_prefix} queue full",
+                        float(response.get("retryAfterMs") or 1.0),
+                    ))
+                else:
+                    entry[1].set_exception(RuntimeError(response.get("error") or f"{self.stderr_prefix} request failed"))
+        except Exception as error:
+            sys.stderr.write(f"[{self.stderr_prefix}] response reader stopped: {error}\n")
+        finally:
+            with self.pending_lock:
+                orphaned = list(self.pending.values())
+                self.pending.clear()
+            for cmd, future in orphaned:
+                self.in_flight.release()
+                future.set_exception(RuntimeError(f"{self.stderr_prefix} closed while waiting for {cmd}"))
+
+    def _read_exact(self, size: int) -> bytes:
+        chunks: List[bytes] = []
+        remaining = size
+        while remaining > 0:
+            chunk = self.reader.read(remaining)
+            if not chunk:
+                raise EOFError("stream closed inside a binary frame")
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _send(self, cmd: str, chunks: List[bytes], request_id: str) -> Future:
+        future: Future = Future()
+        self.in_flight.acquire()
+        with self.pending_lock:
+            self.pending[request_id] = (cmd, future)
+        try:
+            with self.write_lock:
+                for chunk in chunks:
+                    self.writer.write(chunk)
+                self.writer.flush()
+        except Exception as error:
+            with self.pending_lock:
+                entry = self.pending.pop(request_id, None)
+            if entry is not None:
+                self.in_flight.release()
+                future.set_exception(RuntimeError(f"{self.stderr_prefix} write failed for {cmd}: {error}"))
+        return future
+
+    def _allocate_id(self) -> str:
+        if self.closed or self.writer is None or self.reader is None:
             raise RuntimeError(f"{self.stderr_prefix} not available")
-        request_id = str(self.next_id)
-        self.next_id += 1
-        message = json.dumps({"id": request_id, "cmd": cmd, "payload": payload})
-        self.proc.stdin.write(message)
-        self.proc.stdin.write("\n")
-        self.proc.stdin.flush()
+        with self.write_lock:
+            request_id = str(self.next_id)
+            self.next_id += 1
+        return request_id
 
-        while True:
-            raw = self.proc.stdout.readline()
-            if raw == "":
-                raise RuntimeError(f"{self.stderr_prefix} closed while waiting for {cmd}")
-            raw = raw.strip()
-            if not raw:
-                continue
-            response = json.loads(raw)
-            if str(response.get("id")) != request_id:
-                continue
-            if not response.get("ok"):
-                raise RuntimeError(response.get("error") or f"{self.stderr_prefix} request failed")
-            payload_out = response.get("payload")
-            return payload_out if isinstance(payload_out, dict) else {}
+    def request_async(self, cmd: str, payload: Dict[str, Any]) -> Future:
+        """Send a request without waiting; the future resolves to the response payload."""
+        request_id = self._allocate_id()
+        message = json.dumps({"id": request_id, "cmd": cmd, "payload": payload}).encode("utf-8")
+        return self._send(cmd, [message, b"\n"], request_id)
 
-    def close(self) -> None:
-        if self.closed:
-            return
-        self.closed = True
+    def request(self, cmd: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self.request_async(cmd, payload).result()
+
+    def request_binary_async(
+        self,
+        header: Dict[str, Any],
+        counts: Tuple[int, int, int, int],
+        body: List[bytes],
+    ) -> Future:
+        """Send one binary infer frame; the future resolves to (response header, response body)."""
+        request_id = self._allocate_id()
+        header_bytes = json.dumps({**header, "id": request_id}).encode("utf-8")
+        position_count, action_total, state_dim, action_dim = counts
+        prefix = BINARY_REQUEST_HEADER.pack(
+            BINARY_REQUEST_MAGIC,
+            len(header_bytes),
+            position_count,
+            action_total,
+            state_dim,
+            action_dim,
+        )
+        return self._send("binary infer", [prefix, header_bytes, *body], request_id)
+
+    def request_binary(
+        self,
+        header: Dict[str, Any],
+        counts: Tuple[int, int, int, int],
+        body: List[bytes],
+    ) -> Tuple[Dict[str, Any], bytes]:
+        return self.request_binary_async(header, counts, body).result()
+
+    def _request_shutdown(self) -> None:
         try:
-            self.request("shutdown", {})
+            self.request_async("shutdown", {}).result(timeout=3)
         except Exception:
             pass
+        self.closed = True
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._request_shutdown()
         try:
             self.proc.terminate()
             self.proc.wait(timeout=3)
@@ -87,6 +217,27 @@ class SyncJsonLineProcessClient:
             self.proc.kill()
 
 
+class SyncJsonLineSocketClient(SyncJsonLineProcessClient):
+    """Same protocol as the process client, over a shared inference daemon socket."""
+
+    def __init__(self, socket_path: str, stderr_prefix: str, max_in_flight: int = 8):
+        self.proc = None
+        self.stderr_thread = None
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self._start(self.sock.makefile("wb"), self.sock.makefile("rb"), stderr_prefix, max_in_flight)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._request_shutdown()
+        for handle in (self.writer, self.reader, self.sock):
+            try:
+                handle.close()
+            except Exception:
+                pass
+
+
 class EngineClient:
     def __init__(self) -> None:
         self.client = SyncJsonLineProcessClient(
@@ -116,13 +267,43 @@ class EngineClient:
         self.client.close()
 
 
+def pack_little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_float32(raw: bytes) -> array:
+    values = array("f")
+    values.frombytes(raw)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
 class GpuClient:
-    def __init__(self, candidate_model: str, champion_model: str, batch_size: int, batch_delay_ms: int, device: str) -> None:
-        self.client = SyncJsonLineProcessClient(
-            spawn_python_command(str(GPU_SERVER_PATH)),
-            ROOT_DIR,
-            "gpu",
-        )
+    def __init__(
+        self,
+        candidate_model: str,
+        champion_model: str,
+        batch_size: int,
+        batch_delay_ms: int,
+        device: str,
+        transport: str = "json",
+        socket_path: str = "",
+        prior_source: str = "server",
+        backend: str = "torch",
+        priority: str = "high",
+    ) -> None:
+        if socket_path:
+            self.client: SyncJsonLineProcessClient = SyncJsonLineSocketClient(socket_path, "gpu")
+        else:
+            self.client = SyncJsonLineProcessClient(
+                spawn_python_command(str(GPU_SERVER_PATH)) + ["--backend", backend],
+                ROOT_DIR,
+                "gpu",
+            )
         self.client.request("init", {
             "modelPath": str(Path(candidate_model).resolve()),
             "device": device,
@@ -134,18 +315,97 @@ class GpuClient:
         })
         self.batch_size = batch_size
         self.batch_delay_ms = batch_delay_ms
+        self.transport = transport
+        # Binary frames carry raw logits only, so priors are built locally there.
+        self.server_priors = prior_source == "server" and transport == "json"
+        # Only a shared daemon schedules by priority; a private server ignores it.
+        self.priority = priority
 
     def infer(self, positions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         if not positions:
             return []
-        results: List[Dict[str, Any]] = []
+        # Every chunk is sent before any result is awaited so the server can
+        # decode the next chunk while the previous one is on the device.
+        pending: List[Tuple[List[Dict[str, Any]], Future]] = []
         step = max(1, self.batch_size)
         for offset in range(0, len(positions), step):
             chunk = positions[offset: offset + step]
-            payload = self.client.request("infer", {"positions": chunk})
-            results.extend(list(payload.get("results") or []))
+            pending.append((chunk, self._send_chunk(chunk)))
             if self.batch_delay_ms > 0 and offset + step < len(positions):
                 time.sleep(self.batch_delay_ms / 1000)
+
+        results: List[Dict[str, Any]] = []
+        for chunk, future in pending:
+            while True:
+                try:
+                    response = future.result()
+                    break
+                except ServerBackpressure as error:
+                    time.sleep(error.retry_after_ms / 1000)
+                    future = self._send_chunk(chunk)
+            if self.transport == "binary":
+                results.extend(self._decode_binary(chunk, response[1]))
+            else:
+                results.extend(list(response.get("results") or []))
+        return results
+
+    def _send_chunk(self, chunk: List[Dict[str, Any]]) -> Future:
+        if self.transport == "binary":
+            return self._send_binary(chunk)
+        if self.server_priors:
+            return self.client.request_async("infer_priors", {
+                "positions": chunk,
+                "priority": self.priority,
+                "topK": DEFAULT_SEARCH_CONFIG["policy_prune_top_k"],
+                "minProb": DEFAULT_SEARCH_CONFIG["policy_prune_min_prob"],
+                "dirichletAlpha": DEFAULT_SEARCH_CONFIG["dirichlet_alpha"],
+                "dirichletEpsilon": DEFAULT_SEARCH_CONFIG["dirichlet_epsilon"],
+            })
+        return self.client.request_async("infer", {"positions": chunk, "priority": self.priority})
+
+    def _send_binary(self, positions: List[Dict[str, Any]]) -> Future:
+        state_dim = max(len(position["stateFeatures"]) for position in positions)
+        action_dim = max(
+            (len(action["actionFeatures"]) for position in positions for action in position["actions"]),
+            default=0,
+        )
+        states = array("f")
+        actions = array("f")
+        counts = array("i")
+        for position in positions:
+            state_features = position["stateFeatures"]
+            if len(state_features) != state_dim:
+                raise ValueError("Binary transport requires a fixed state feature size")
+            states.extend(state_features)
+            counts.append(len(position["actions"]))
+            for action in position["actions"]:
+                features = action["actionFeatures"]
+                actions.extend(features)
+                if len(features) < action_dim:
+                    actions.extend([0.0] * (action_dim - len(features)))
+
+        return self.client.request_binary_async(
+            {"modelKeys": [position.get("modelKey") for position in positions], "priority": self.priority},
+            (len(positions), sum(counts), state_dim, action_dim),
+            [pack_little_endian(states), pack_little_endian(actions), pack_little_endian(counts)],
+        )
+
+    def _decode_binary(self, positions: List[Dict[str, Any]], body: bytes) -> List[Dict[str, Any]]:
+        values = unpack_float32(body[: 4 * len(positions)])
+        logits = unpack_float32(body[4 * len(positions):])
+
+        results: List[Dict[str, Any]] = []
+        cursor = 0
+        for index, position in enumerate(positions):
+            action_logits: Dict[str, float] = {}
+            for action in position["actions"]:
+                action_logits[action["actionKey"]] = float(logits[cursor])
+                cursor += 1
+            results.append({
+                "modelKey": position.get("modelKey"),
+                "value": float(values[index]),
+                "actionLogits": action_logits,
+            })
         return results
 
     def close(self) -> None:
@@ -405,6 +665,61 @@ def build_filtered_priors(
     return filtered
 
 
+def build_server_priors(
+    legal_moves: List[Dict[str, Any]],
+    actions: List[Dict[str, Any]],
+    result: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    move_lookup = {str(move["actionKey"]): move for move in legal_moves if "actionKey" in move}
+    filtered: List[Dict[str, Any]] = []
+    for action_index, prior in zip(result.get("actionIndices") or [], result.get("priors") or []):
+        action = actions[int(action_index)]
+        action_key = str(action["actionKey"])
+        move = move_lookup.get(action_key) or action.get("move")
+        if move is None:
+            continue
+        filtered.append({"move": move, "actionKey": action_key, "prior": float(prior)})
+    return filtered
+
+
+def expansion_priors(
+    legal_moves: List[Dict[str, Any]],
+    actions: List[Dict[str, Any]],
+    result: Dict[str, Any],
+    is_root: bool,
+    rng,
+) -> List[Dict[str, Any]]:
+    """Priors for an expanded node from either an infer_priors or a raw infer result."""
+    if "priors" in result:
+        return build_server_priors(legal_moves, actions, result)
+    return build_filtered_priors(legal_moves, actions, dict(result.get("actionLogits") or {}), is_root, rng)
+
+
+def inference_position(
+    task: "SearchTask",
+    expansion: Dict[str, Any],
+    is_root: bool,
+    server_priors: bool,
+) -> Dict[str, Any]:
+    position = {
+        "modelKey": task.model_key,
+        "stateFeatures": expansion.get("stateFeatures") or [],
+        "actions": [
+            {
+                "actionKey": action["actionKey"],
+                "actionFeatures": action["actionFeatures"],
+            }
+            for action in expansion.get("actions") or []
+        ],
+    }
+    if is_root and server_priors:
+        # Seeds the server-side Dirichlet noise from the task's own stream; local priors
+        # draw their noise from that stream themselves, so nothing is taken from it here.
+        position["root"] = True
+        position["seed"] = int(task.rng() * 2147483647)
+    return position
+
+
 def select_puct_edge(node: Node) -> Optional[Edge]:
     best_edge = None
     best_score = float("-inf")
@@ -509,17 +824,7 @@ def expand_nodes_with_inference(
         legal_moves = list(expansion.get("legalMoves") or [])
         if expansion.get("status") != "playing" or not legal_moves:
             continue
-        positions.append({
-            "modelKey": tasks[index].model_key,
-            "stateFeatures": expansion.get("stateFeatures") or [],
-            "actions": [
-                {
-                    "actionKey": action["actionKey"],
-                    "actionFeatures": action["actionFeatures"],
-                }
-                for action in expansion.get("actions") or []
-            ],
-        })
+        positions.append(inference_position(tasks[index], expansion, root_flags[index], gpu.server_priors))
         infer_indices.append(index)
 
     infer_results = gpu.infer(positions) if positions else []
@@ -538,10 +843,10 @@ def expand_nodes_with_inference(
             continue
         result = infer_results[infer_cursor]
         infer_cursor += 1
-        filtered = build_filtered_priors(
+        filtered = expansion_priors(
             legal_moves,
             list(expansion.get("actions") or []),
-            dict(result.get("actionLogits") or {}),
+            result,
             root_flags[index],
             task.rng,
         )
@@ -574,17 +879,7 @@ def run_batched_searches(
         tasks.append(task)
         legal_moves = list(expansion.get("legalMoves") or [])
         if expansion.get("status") == "playing" and legal_moves:
-            positions.append({
-                "modelKey": task.model_key,
-                "stateFeatures": expansion.get("stateFeatures") or [],
-                "actions": [
-                    {
-                        "actionKey": action["actionKey"],
-                        "actionFeatures": action["actionFeatures"],
-                    }
-                    for action in expansion.get("actions") or []
-                ],
-            })
+            positions.append(inference_position(task, expansion, True, gpu.server_priors))
         else:
             positions.append(None)
         root_map.append(expansion)
@@ -601,10 +896,10 @@ def run_batched_searches(
             continue
         result = infer_results[infer_cursor]
         infer_cursor += 1
-        filtered = build_filtered_priors(
+        filtered = expansion_priors(
             legal_moves,
             list(expansion.get("actions") or []),
-            dict(result.get("actionLogits") or {}),
+            result,
             True,
             task.rng,
         )
@@ -707,17 +1002,8 @@ def run_batched_searches(
                 legal_moves = list(expansion.get("legalMoves") or [])
                 task: SearchTask = context["task"]
                 if expansion.get("status") == "playing" and legal_moves:
-                    infer_positions.append({
-                        "modelKey": task.model_key,
-                        "stateFeatures": expansion.get("stateFeatures") or [],
-                        "actions": [
-                            {
-                                "actionKey": action["actionKey"],
-                                "actionFeatures": action["actionFeatures"],
-                            }
-                            for action in expansion.get("actions") or []
-                        ],
-                    })
+                    is_root = len(context["pathEdges"]) == 0
+                    infer_positions.append(inference_position(task, expansion, is_root, gpu.server_priors))
                     infer_index_map.append(index)
 
             infer_results = gpu.infer(infer_positions) if infer_positions else []
@@ -740,10 +1026,10 @@ def run_batched_searches(
                     continue
                 result = infer_results[infer_cursor]
                 infer_cursor += 1
-                filtered = build_filtered_priors(
+                filtered = expansion_priors(
                     legal_moves,
                     list(expansion.get("actions") or []),
-                    dict(result.get("actionLogits") or {}),
+                    result,
                     len(context["pathEdges"]) == 0,
                     task.rng,
                 )
@@ -833,6 +1119,11 @@ def run_arena(args: argparse.Namespace) -> None:
         args.gpu_batch_size,
         args.gpu_batch_delay_ms,
         args.device,
+        args.gpu_transport,
+        args.gpu_socket,
+        args.prior_source,
+        args.inference_backend,
+        args.inference_priority,
     )
     active_games: List[ActiveGame] = []
     next_game_index = 1
@@ -980,6 +1271,26 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--gpu-batch-delay-ms", type=int, default=1)
     parser.add_argument("--candidate-color-mode", choices=["alternate", "white", "black"], default="alternate")
     parser.add_argument("--device", choices=["auto", "cuda", "cpu"], default="auto")
+    parser.add_argument("--gpu-transport", choices=["json", "binary"], default="json")
+    parser.add_argument("--gpu-socket", default="", help="Connect to a shared gpu-inference-server.py --socket daemon")
+    parser.add_argument(
+        "--inference-backend",
+        choices=["torch", "numpy"],
+        default="torch",
+        help="Backend of the spawned inference server (numpy: CPU only, no torch import)",
+    )
+    parser.add_argument(
+        "--inference-priority",
+        choices=["high", "normal", "low"],
+        default="high",
+        help="Priority class on a shared --gpu-socket daemon (arena latency gates promotion)",
+    )
+    parser.add_argument(
+        "--prior-source",
+        choices=["server", "local"],
+        default="server",
+        help="Build pruned priors on the inference server (infer_priors) or from raw logits here (json transport only)",
+    )
     return parser.parse_args()
 
 
@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+"""
+Replica pool supervisor for the Hive inference server (gpu-inference-server.py --replicas N).
+
+On a many-core CPU host one server process tops out well below the cores: it
+has a single request loop and torch's default intra-op threads fight each
+other across batches. The supervisor starts N stdio replicas of the server
+instead, each pinned to its own slice of cores (sched_setaffinity) with
+OMP/MKL threads and torch.set_num_threads sized to that slice, and serves the
+usual stdio protocol itself, so clients still see one endpoint.
+
+- init, load_model, unload_model, reload and warmup go to every replica; the
+  reply is sent once all of them answered.
+- infer, infer_priors and infer_board (JSON) and binary infer frames are
+  split by position into contiguous shards on the least-loaded replicas, and
+  the shard results are concatenated back in request order. Batches under
+  --min-shard-positions per replica are not split.
+- stats returns the pool counters plus every replica's own stats.
+
+Requests are pipelined: responses are written when their last shard returns,
+so clients must match responses by id (they already do).
+
+--replica-benchmark sweeps replica count against threads per replica on
+synthetic binary batches for --benchmark-model and prints positions/s for
+every split that fits the cores, best first.
+
+The supervisor never imports torch or numpy; replicas may run either backend.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from inference_protocol import (
+    JSON_INFER_COMMANDS,
+    ProtocolError,
+    emit_log,
+    encode_binary_request,
+    encode_binary_response,
+    encode_response,
+    process_footprint,
+    read_message,
+    read_response,
+    write_output,
+)
+
+
+BROADCAST_COMMANDS = ('init', 'load_model', 'unload_model', 'reload', 'warmup')
+REPLICA_SHUTDOWN_TIMEOUT_SEC = 10.0
+
+
+def available_cores() -> List[int]:
+    """CPU ids this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_slices(replicas: int, threads_per_replica: int, cores: Optional[List[int]] = None) -> List[List[int]]:
+    """Disjoint core sets per replica, wrapping around when the pool oversubscribes the cores."""
+    cores = cores if cores is not None else available_cores()
+    return [
+        [cores[(index * threads_per_replica + offset) % len(cores)] for offset in range(threads_per_replica)]
+        for index in range(replicas)
+    ]
+
+
+def gather(futures: Sequence[Future]) -> Future:
+    """Future for the list of results of futures; fails with the first failure."""
+    combined: Future = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_future: Future):
+        with lock:
+            remaining[0] -= 1
+            finished = remaining[0] == 0
+        if not finished or combined.done():
+            return
+        for future in futures:
+            if future.exception() is not None:
+                combined.set_exception(future.exception())
+                return
+        combined.set_result([future.result() for future in futures])
+
+    if not futures:
+        combined.set_result([])
+    for future in futures:
+        future.add_done_callback(done)
+    return combined
+
+
+def chained(future: Future, transform: Callable[[Any], Any]) -> Future:
+    """Future for transform(future.result())."""
+    result: Future = Future()
+
+    def done(source: Future):
+        if source.exception() is not None:
+            result.set_exception(source.exception())
+            return
+        try:
+            result.set_result(transform(source.result()))
+        except Exception as e:
+            result.set_exception(e)
+
+    future.add_done_callback(done)
+    return result
+
+
+def encode_request(request_id: int, cmd: str, payload: Dict[str, Any]) -> bytes:
+    return (json.dumps({'id': request_id, 'cmd': cmd, 'payload': payload}) + '\n').encode('utf-8')
+
+
+class ReplicaProcess:
+    """One stdio server replica with its own core set; requests are matched to responses by id."""
+
+    def __init__(self, index: int, command: List[str], cores: List[int], threads: int):
+        self.index = index
+        self.cores = cores
+        self.threads = threads
+        env = dict(os.environ)
+        for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+            env[name] = str(threads)
+        pin = None
+        if hasattr(os, 'sched_setaffinity'):
+            pin = lambda: os.sched_setaffinity(0, cores)
+        self.process = subprocess.Popen(
+            command + ['--intra-op-threads', str(threads)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+            preexec_fn=pin,
+        )
+        self.pending: Dict[int, Future] = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.in_flight_positions = 0
+        self.positions = 0
+        self.requests = 0
+        self.reader = threading.Thread(target=self._read_loop, name=f'replica-{index}-reader', daemon=True)
+        self.reader.start()
+
+    def request(self, cmd: str, payload: Dict[str, Any], positions: int = 0) -> Future:
+        """Send a JSON command; the future resolves to the response payload."""
+        future, request_id = self._register(positions)
+        self._write(encode_request(request_id, cmd, payload))
+        return future
+
+    def request_binary(self, header: Dict[str, Any], position_count: int, action_total: int,
+                       state_dim: int, action_dim: int, sections: Sequence[bytes]) -> Future:
+        """Send a binary infer frame; the future resolves to (header, values, logits)."""
+        future, request_id = self._register(position_count)
+        data = encode_binary_request(
+            {**header, 'id': request_id}, position_count, action_total, state_dim, action_dim, sections,
+        )
+        self._write(data)
+        return future
+
+    def _register(self, positions: int) -> Tuple[Future, int]:
+        future: Future = Future()
+        with self.lock:
+            request_id = self.next_id
+            self.next_id += 1
+            self.pending[request_id] = future
+            self.in_flight_positions += positions
+            self.positions += positions
+            self.requests += 1
+        future.add_done_callback(lambda _f: self._release(positions))
+        return future, request_id
+
+    def _release(self, positions: int):
+        with self.lock:
+            self.in_flight_positions -= positions
+
+    def _write(self, data: bytes):
+        try:
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self._fail_all(RuntimeError(f"Replica {self.index} is gone: {e}"))
+
+    def _read_loop(self):
+        error: Optional[Exception] = None
+        try:
+            while True:
+                response = read_response(self.process.stdout)
+                if response is None:
+                    break
+                message, binary = response
+                with self.lock:
+                    future = self.pending.pop(message.get('id'), None)
+                if future is None:
+                    continue
+                if not message.get('ok'):
+                    future.set_exception(RuntimeError(message.get('error') or f"Replica {self.index} failed"))
+                elif binary is None:
+                    future.set_result(message.get('payload') or {})
+                else:
+                    future.set_result((message, binary[0], binary[1]))
+        except (ProtocolError, ValueError, OSError) as e:
+            error = RuntimeError(f"Replica {self.index} stream broke: {e}")
+        self._fail_all(error or RuntimeError(f"Replica {self.index} exited (code {self.process.wait()})"))
+
+    def _fail_all(self, error: Exception):
+        with self.lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self, timeout: float = REPLICA_SHUTDOWN_TIMEOUT_SEC):
+        if self.process.poll() is None:
+            try:
+                self.request('shutdown', {}).result(timeout=timeout)
+            except Exception:
+                pass
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+
+
+class ReplicaPool:
+    """N replicas behind one request interface, with position-sharded infer."""
+
+    def __init__(self, command: List[str], replicas: int, threads_per_replica: int, min_shard_positions: int = 16):
+        if replicas < 1 or threads_per_replica < 1:
+            raise ValueError("replicas and threads per replica must be at least 1")
+        self.replicas = [
+            ReplicaProcess(index, command, cores, threads_per_replica)
+            for index, cores in enumerate(core_slices(replicas, threads_per_replica))
+        ]
+        self.threads_per_replica = threads_per_replica
+        self.min_shard_positions = max(1, min_shard_positions)
+        self.lock = threading.Lock()
+        self.sharded_requests = 0
+        self.unsharded_requests = 0
+        self.shard_count = 0
+
+    def broadcast(self, cmd: str, payload: Dict[str, Any]) -> Future:
+        """Send cmd to every replica; resolves to the list of replica payloads."""
+        return gather([replica.request(cmd, payload) for replica in self.replicas])
+
+    def _shard_bounds(self, position_count: int) -> List[Tuple['ReplicaProcess', int, int]]:
+        """(replica, start, end) position ranges, placing shards on the least-loaded replicas."""
+        shards = max(1, min(len(self.replicas), position_count // self.min_shard_positions))
+        with self.lock:
+            if shards > 1:
+                self.sharded_requests += 1
+            else:
+                self.unsharded_requests += 1
+            self.shard_count += shards
+        chosen = sorted(self.replicas, key=lambda replica: replica.in_flight_positions)[:shards]
+        bounds = []
+        for index, replica in enumerate(chosen):
+            start = position_count * index // shards
+            end = position_count * (index + 1) // shards
+            bounds.append((replica, start, end))
+        return bounds
+
+    def infer_json(self, cmd: str, payload: Dict[str, Any]) -> Future:
+        """Shard a JSON infer command by position; resolves to the merged payload."""
+        positions = list(payload.get('positions') or [])
+        bounds = self._shard_bounds(len(positions))
+        futures = [
+            replica.request(cmd, {**payload, 'positions': positions[start:end]}, end - start)
+            for replica, start, end in bounds
+        ]
+
+        def merge(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+            merged: Dict[str, Any] = {'results': [result for part in parts for result in part.get('results', [])]}
+            stats = [part['stats'] for part in parts if 'stats' in part]
+            if stats:
+                merged['stats'] = merge_shard_stats(stats, len(positions))
+            return merged
+
+        return chained(gather(futures), merge)
+
+    def infer_binary(self, header: Dict[str, Any], body: Any, position_count: int, action_total: int,
+                     state_dim: int, action_dim: int) -> Future:
+        """Shard a binary infer frame by position; resolves to (stats, values, logits, positions, actions)."""
+        view = memoryview(body)
+        state_bytes = 4 * position_count * state_dim
+        action_bytes = 4 * action_total * action_dim
+        counts = array('i')
+        counts.frombytes(bytes(view[state_bytes + action_bytes:state_bytes + action_bytes + 4 * position_count]))
+        if sys.byteorder != 'little':
+            counts.byteswap()
+        row_offsets = [0]
+        for count in counts:
+            row_offsets.append(row_offsets[-1] + count)
+        model_keys = header.get('modelKeys')
+
+        futures = []
+        for replica, start, end in self._shard_bounds(position_count):
+            row_start, row_end = row_offsets[start], row_offsets[end]
+            shard_header: Dict[str, Any] = {'modelKey': header.get('modelKey')}
+            if isinstance(model_keys, list):
+                shard_header['modelKeys'] = model_keys[start:end]
+            sections = (
+                view[4 * start * state_dim:4 * end * state_dim],
+                view[state_bytes + 4 * row_start * action_dim:state_bytes + 4 * row_end * action_dim],
+                view[state_bytes + action_bytes + 4 * start:state_bytes + action_bytes + 4 * end],
+            )
+            futures.append(replica.request_binary(
+                shard_header, end - start, row_end - row_start, state_dim, action_dim, sections,
+            ))
+
+        def merge(parts: List[Tuple[Dict[str, Any], bytes, bytes]]):
+            stats = [part[0]['stats'] for part in parts if 'stats' in part[0]]
+            return (
+                merge_shard_stats(stats, position_count) if stats else None,
+                b''.join(part[1] for part in parts),
+                b''.join(part[2] for part in parts),
+                position_count,
+                action_total,
+            )
+
+        return chained(gather(futures), merge)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'replicaCount': len(self.replicas),
+                'threadsPerReplica': self.threads_per_replica,
+                'minShardPositions': self.min_shard_positions,
+                'shardedRequests': self.sharded_requests,
+                'unshardedRequests': self.unsharded_requests,
+                'averageShardsPerRequest': self.shard_count / max(1, self.sharded_requests + self.unsharded_requests),
+                'replicaCores': [replica.cores for replica in self.replicas],
+                'replicaPositions': [replica.positions for replica in self.replicas],
+                'replicaRequests': [replica.requests for replica in self.replicas],
+            }
+
+    def close(self):
+        threads = [threading.Thread(target=replica.close) for replica in self.replicas]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+def merge_shard_stats(stats: List[Dict[str, Any]], position_count: int) -> Dict[str, Any]:
+    """Per-response stats for a sharded request: the first shard's, with batch-wide counts."""
+    merged = dict(stats[0])
+    merged['queueDepth'] = position_count
+    if 'groupCount' in merged:
+        merged['groupCount'] = max(int(item.get('groupCount', 0)) for item in stats)
+    merged['replicaShards'] = len(stats)
+    return merged
+
+
+def serve_pool_stdio(pool: ReplicaPool, started_at: float, startup_ms: float):
+    """Serve the stdio protocol, forwarding each request to the pool and writing replies as they complete."""
+    stdin = sys.stdin.buffer
+    output_lock = threading.Lock()
+
+    def reply(data: bytes):
+        with output_lock:
+            write_output(data)
+
+    def reply_when_done(future: Future, request_id: Any, encode: Callable[[Any], bytes], binary: bool):
+        def done(source: Future):
+            error = source.exception()
+            if error is None:
+                reply(encode(source.result()))
+                return
+            emit_log(f"Error: {error}")
+            if binary:
+                reply(encode_binary_response({'id': request_id, 'ok': False, 'error': str(error)}))
+            else:
+                reply(encode_response(request_id, False, error=str(error)))
+
+        future.add_done_callback(done)
+
+    while True:
+        request_id = None
+        frame = None
+        try:
+            message = read_message(stdin)
+            if message is None:
+                return
+            request, frame, _decode_ms = message
+            request_id = request.get('id')
+
+            if frame is not None:
+                future = pool.infer_binary(
+                    frame.header, frame.body, frame.position_count, frame.action_total,
+                    frame.state_dim, frame.action_dim,
+                )
+
+                def encode_binary(result, request_id=request_id) -> bytes:
+                    stats, values, logits, positions, actions = result
+                    header: Dict[str, Any] = {'id': request_id, 'ok': True}
+                    if stats is not None:
+                        header['stats'] = stats
+                    return encode_binary_response(header, values, logits, positions, actions)
+
+                reply_when_done(future, request_id, encode_binary, True)
+                continue
+
+            cmd = request.get('cmd')
+            payload = request.get('payload') or {}
+            if cmd == 'shutdown':
+                pool.close()
+                reply(encode_response(request_id, True, {'status': 'bye'}))
+                return
+            if cmd in JSON_INFER_COMMANDS:
+                future = pool.infer_json(cmd, payload)
+                encode = lambda result, request_id=request_id: encode_response(request_id, True, result)
+            elif cmd in BROADCAST_COMMANDS:
+                future = chained(pool.broadcast(cmd, payload), lambda parts: {**parts[0], 'replicaCount': len(parts)})
+                encode = lambda result, request_id=request_id: encode_response(request_id, True, result)
+            elif cmd == 'stats':
+                def merge_stats(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+                    return {
+                        'backend': 'replica-pool',
+                        'replicaBackend': parts[0].get('backend') if parts else None,
+                        'startupMs': startup_ms,
+                        'uptimeSec': time.perf_counter() - started_at,
+                        **process_footprint(),
+                        **pool.pool_stats(),
+                        'replicas': parts,
+                    }
+
+                future = chained(pool.broadcast('stats', payload), merge_stats)
+                encode = lambda result, request_id=request_id: encode_response(request_id, True, result)
+            else:
+                raise ValueError(f"Unknown command: {cmd}")
+            reply_when_done(future, request_id, encode, False)
+        except ProtocolError as e:
+            emit_log(f"Protocol error, closing: {e}")
+            pool.close()
+            return
+        except Exception as e:
+            emit_log(f"Error: {e}")
+            if frame is not None:
+                reply(encode_binary_response({'id': request_id, 'ok': False, 'error': str(e)}))
+            else:
+                reply(encode_response(request_id, False, error=str(e)))
+
+
+def synthetic_frame(rng: random.Random, positions: int, actions_per_position: int,
+                    state_dim: int, action_dim: int) -> Tuple[bytes, int]:
+    """Random little-endian (state, actions, counts) body for the benchmark; returns (body, action_total)."""
+    action_total = positions * actions_per_position
+    state = array('f', (rng.uniform(-1.0, 1.0) for _ in range(positions * state_dim)))
+    actions = array('f', (rng.uniform(-1.0, 1.0) for _ in range(action_total * action_dim)))
+    counts = array('i', [actions_per_position] * positions)
+    if sys.byteorder != 'little':
+        for section in (state, actions, counts):
+            section.byteswap()
+    return state.tobytes() + actions.tobytes() + counts.tobytes(), action_total
+
+
+def benchmark_split(command: List[str], replicas: int, threads: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Throughput of one (replicas, threads per replica) split on synthetic binary batches."""
+    pool = ReplicaPool(command, replicas, threads, args.min_shard_positions)
+    try:
+        ready = pool.broadcast('init', {'modelPath': args.benchmark_model, 'device': 'cpu'}).result()
+        state_dim = int(ready[0]['state_size'])
+        action_dim = int(ready[0]['action_size'])
+        body, action_total = synthetic_frame(
+            random.Random(1234), args.benchmark_positions, args.benchmark_actions, state_dim, action_dim,
+        )
+        shape = (args.benchmark_positions, action_total, state_dim, action_dim)
+        for _ in range(3):
+            pool.infer_binary({'modelKey': 'default'}, body, *shape).result()
+
+        in_flight: List[Tuple[float, Future]] = []
+        latencies: List[float] = []
+        batches = 0
+        started = time.perf_counter()
+        deadline = started + args.benchmark_seconds
+        while time.perf_counter() < deadline or in_flight:
+            while time.perf_counter() < deadline and len(in_flight) < args.benchmark_in_flight:
+                in_flight.append((time.perf_counter(), pool.infer_binary({'modelKey': 'default'}, body, *shape)))
+            submitted, future = in_flight.pop(0)
+            future.result()
+            latencies.append((time.perf_counter() - submitted) * 1000.0)
+            batches += 1
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'replicas': replicas,
+            'threadsPerReplica': threads,
+            'batches': batches,
+            'positionsPerSec': batches * args.benchmark_positions / max(elapsed, 1e-9),
+            'p50LatencyMs': latencies[len(latencies) // 2] if latencies else None,
+            'p95LatencyMs': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+        }
+    finally:
+        pool.close()
+
+
+def parse_int_list(text: str) -> List[int]:
+    return [int(part) for part in text.split(',') if part.strip()]
+
+
+def run_benchmark(command: List[str], args: argparse.Namespace):
+    """Sweep replica count against threads per replica and print the results, best first."""
+    if not args.benchmark_model:
+        emit_log("--replica-benchmark needs --benchmark-model")
+        sys.exit(2)
+    core_count = len(available_cores())
+    powers = [1 << shift for shift in range(core_count.bit_length()) if (1 << shift) <= core_count]
+    replica_counts = parse_int_list(args.benchmark_replicas) if args.benchmark_replicas else powers
+    thread_counts = parse_int_list(args.benchmark_threads) if args.benchmark_threads else powers
+    splits = [(n, t) for n in replica_counts for t in thread_counts if n * t <= core_count]
+    if not splits:
+        emit_log(f"No replica/thread split fits {core_count} cores")
+        sys.exit(2)
+
+    results = []
+    for replicas, threads in splits:
+        emit_log(f"Benchmark: {replicas} replica(s) x {threads} thread(s)")
+        result = benchmark_split(command, replicas, threads, args)
+        emit_log(
+            f"  {result['positionsPerSec']:.0f} pos/s p50={result['p50LatencyMs']:.1f}ms "
+            f"p95={result['p95LatencyMs']:.1f}ms"
+        )
+        results.append(result)
+    results.sort(key=lambda item: item['positionsPerSec'], reverse=True)
+    best = results[0]
+    emit_log(
+        f"Best split on {core_count} cores: --replicas {best['replicas']} "
+        f"--threads-per-replica {best['threadsPerReplica']} ({best['positionsPerSec']:.0f} pos/s)"
+    )
+    write_output((json.dumps({'cores': core_count, 'best': best, 'results': results}) + '\n').encode('utf-8'))
+
+
+POOL_OPTIONS = {
+    '--replicas': True,
+    '--threads-per-replica': True,
+    '--min-shard-positions': True,
+    '--replica-benchmark': False,
+    '--benchmark-model': True,
+    '--benchmark-seconds': True,
+    '--benchmark-positions': True,
+    '--benchmark-actions': True,
+    '--benchmark-in-flight': True,
+    '--benchmark-replicas': True,
+    '--benchmark-threads': True,
+}
+
+
+def replica_argv(argv: List[str]) -> List[str]:
+    """argv with the supervisor's own options removed, passed on to every replica."""
+    forwarded: List[str] = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split('=', 1)[0]
+        if name in POOL_OPTIONS:
+            skip = POOL_OPTIONS[name] and '=' not in arg
+            continue
+        forwarded.append(arg)
+    return forwarded
+
+
+def parse_pool_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Hive inference replica pool", add_help=False)
+    parser.add_argument('--replicas', type=int, default=int(os.environ.get('HIVE_INFERENCE_REPLICAS', '0') or 0))
+    parser.add_argument('--threads-per-replica', type=int, default=0)
+    parser.add_argument('--min-shard-positions', type=int, default=16)
+    parser.add_argument('--socket', default='')
+    parser.add_argument('--replica-benchmark', action='store_true')
+    parser.add_argument('--benchmark-model', default='')
+    parser.add_argument('--benchmark-seconds', type=float, default=5.0)
+    parser.add_argument('--benchmark-positions', type=int, default=256)
+    parser.add_argument('--benchmark-actions', type=int, default=32)
+    parser.add_argument('--benchmark-in-flight', type=int, default=4)
+    parser.add_argument('--benchmark-replicas', default='')
+    parser.add_argument('--benchmark-threads', default='')
+    return parser.parse_known_args(argv)[0]
+
+
+def main(argv: List[str], started_at: float, server_script: str) -> None:
+    """Entry point for gpu-inference-server.py --replicas N / --replica-benchmark."""
+    args = parse_pool_args(argv)
+    command = [sys.executable, server_script, *replica_argv(argv)]
+    if args.replica_benchmark:
+        run_benchmark(command, args)
+        return
+    if args.socket:
+        emit_log("--replicas serves stdio only; run a single daemon for --socket")
+        sys.exit(2)
+
+    threads = args.threads_per_replica or max(1, len(available_cores()) // args.replicas)
+    pool = ReplicaPool(command, args.replicas, threads, args.min_shard_positions)
+    startup_ms = (time.perf_counter() - started_at) * 1000.0
+    emit_log(
+        f"Ready: backend=replica-pool replicas={args.replicas} threads/replica={threads} "
+        f"cores={[replica.cores for replica in pool.replicas]}"
+    )
+    try:
+        serve_pool_stdio(pool, started_at, startup_ms)
+    finally:
+        pool.close()
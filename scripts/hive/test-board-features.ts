@@ -0,0 +1,250 @@
+import { spawn } from 'node:child_process';
+import path from 'node:path';
+import { fileURLToPath } from 'node:url';
+import {
+  applyHiveMove,
+  createLocalHiveGameState,
+  getLegalMovesForColor,
+} from '../../lib/hive/ai';
+import {
+  HIVE_DEFAULT_TOKEN_SLOTS,
+  encodeHiveCompactBoard,
+  extractHiveActionFeatures,
+  extractHiveTokenStateFeatures,
+  type HiveCompactBoard,
+} from '../../lib/hive/ml';
+import { createInitialHand, type GameState, type Move, type PlayerColor } from '../../lib/hive/types';
+
+const SCRIPTS_DIR = path.dirname(fileURLToPath(import.meta.url));
+const GAMES = 16;
+const MAX_PLIES = 90;
+// Python computes in float64 and returns float32; TS stays in float64.
+const TOLERANCE = 1e-5;
+
+interface CommandResult {
+  code: number;
+  stdout: string;
+  stderr: string;
+}
+
+interface ParityCase {
+  label: string;
+  state: GameState;
+  moves: Move[];
+  perspective: PlayerColor;
+  board: HiveCompactBoard;
+  stateFeatures: number[];
+  actionFeatures: number[][];
+}
+
+interface PythonFeatures {
+  stateFeatures: number[][];
+  actionFeatures: number[][];
+  counts: number[];
+}
+
+interface MctsFeatures {
+  batch: PythonFeatures;
+  reference: Omit<PythonFeatures, 'counts'>;
+}
+
+async function main(): Promise<void> {
+  const cases = collectParityCases();
+  const python = await runPythonWithFallback(
+    [path.join(SCRIPTS_DIR, 'board_features.py')],
+    JSON.stringify({ positions: cases.map((entry) => entry.board), tokenSlots: HIVE_DEFAULT_TOKEN_SLOTS }),
+  );
+  const features = JSON.parse(python) as PythonFeatures;
+
+  if (features.stateFeatures.length !== cases.length) {
+    throw new Error(`expected ${cases.length} state rows, got ${features.stateFeatures.length}`);
+  }
+  let actionRow = 0;
+  let actionCount = 0;
+  for (let index = 0; index < cases.length; index += 1) {
+    const entry = cases[index];
+    compareRow(`${entry.label} state`, entry.stateFeatures, features.stateFeatures[index]);
+    if (features.counts[index] !== entry.actionFeatures.length) {
+      throw new Error(`${entry.label}: expected ${entry.actionFeatures.length} moves, got ${features.counts[index]}`);
+    }
+    for (let move = 0; move < entry.actionFeatures.length; move += 1) {
+      compareRow(`${entry.label} move ${move}`, entry.actionFeatures[move], features.actionFeatures[actionRow]);
+      actionRow += 1;
+    }
+    actionCount += entry.actionFeatures.length;
+  }
+
+  console.log(`[test:board-features] ${cases.length} positions and ${actionCount} moves match the TS extractors`);
+
+  await checkMctsFeatureParity(cases, actionCount);
+}
+
+// GpuMcts feeds the network from compact_position + board_batch_features; in float32 that has to match its
+// per-move extract_state_features/extract_action_features exactly.
+async function checkMctsFeatureParity(cases: ParityCase[], actionCount: number): Promise<void> {
+  const python = await runPythonWithFallback(
+    [path.join(SCRIPTS_DIR, 'mcts_gpu.py')],
+    JSON.stringify({
+      cases: cases.map((entry) => ({ state: entry.state, moves: entry.moves, perspective: entry.perspective })),
+    }),
+  );
+  const features = JSON.parse(python) as MctsFeatures;
+
+  if (features.batch.stateFeatures.length !== cases.length || features.reference.stateFeatures.length !== cases.length) {
+    throw new Error(`mcts_gpu: expected ${cases.length} state rows`);
+  }
+  if (features.batch.actionFeatures.length !== actionCount || features.reference.actionFeatures.length !== actionCount) {
+    throw new Error(`mcts_gpu: expected ${actionCount} action rows`);
+  }
+  for (let index = 0; index < cases.length; index += 1) {
+    const label = `mcts_gpu ${cases[index].label}`;
+    if (features.batch.counts[index] !== cases[index].moves.length) {
+      throw new Error(`${label}: expected ${cases[index].moves.length} moves, got ${features.batch.counts[index]}`);
+    }
+    compareRow(`${label} state`, features.reference.stateFeatures[index], features.batch.stateFeatures[index], 0);
+  }
+  for (let row = 0; row < actionCount; row += 1) {
+    compareRow(`mcts_gpu action row ${row}`, features.reference.actionFeatures[row], features.batch.actionFeatures[row], 0);
+  }
+
+  console.log(`[test:board-features] mcts_gpu batched features match its per-move extractors on ${cases.length} positions`);
+}
+
+function collectParityCases(): ParityCase[] {
+  const random = seededRandom(17);
+  const cases: ParityCase[] = [];
+  for (let game = 0; game < GAMES; game += 1) {
+    let state = createParityGame(game, game % 2 === 1);
+    for (let ply = 0; ply < MAX_PLIES && state.status === 'playing'; ply += 1) {
+      const legalMoves = getLegalMovesForColor(state, state.currentTurn);
+      if (legalMoves.length === 0) break;
+      // Both perspectives, so "mine" and the hands flip as well.
+      for (const perspective of ['white', 'black'] as PlayerColor[]) {
+        const moves = perspective === state.currentTurn ? legalMoves : legalMoves.slice(0, 8);
+        cases.push({
+          label: `game ${game} ply ${ply} ${perspective}`,
+          state,
+          moves,
+          perspective,
+          board: encodeHiveCompactBoard(state, moves, perspective),
+          stateFeatures: extractHiveTokenStateFeatures(state, perspective, HIVE_DEFAULT_TOKEN_SLOTS),
+          actionFeatures: moves.map((move) => extractHiveActionFeatures(state, move, perspective)),
+        });
+      }
+      state = applyHiveMove(state, legalMoves[Math.floor(random() * legalMoves.length)]);
+    }
+  }
+  return cases;
+}
+
+function createParityGame(game: number, expansions: boolean): GameState {
+  const state = createLocalHiveGameState({
+    id: `board-features-${game}`,
+    shortCode: 'BFP',
+    whitePlayerId: 'w',
+    blackPlayerId: 'b',
+  });
+  if (!expansions) return state;
+  // Expansion pieces bring ladybug/mosquito/pillbug types and pillbug-ability moves.
+  const all = { ladybug: true, mosquito: true, pillbug: true };
+  state.settings.expansionPieces = all;
+  state.whiteHand = createInitialHand('white', all);
+  state.blackHand = createInitialHand('black', all);
+  return state;
+}
+
+function compareRow(label: string, expected: number[], actual: number[] | undefined, tolerance = TOLERANCE): void {
+  if (!actual || actual.length !== expected.length) {
+    throw new Error(`${label}: expected ${expected.length} features, got ${actual?.length ?? 0}`);
+  }
+  for (let index = 0; index < expected.length; index += 1) {
+    if (Math.abs(expected[index] - actual[index]) > tolerance) {
+      throw new Error(`${label}: feature ${index} is ${actual[index]}, expected ${expected[index]}`);
+    }
+  }
+}
+
+function seededRandom(seed: number): () => number {
+  let value = seed >>> 0;
+  return () => {
+    value = (value * 1664525 + 1013904223) >>> 0;
+    return value / 0x100000000;
+  };
+}
+
+function getPreferredPythonCommands(): string[] {
+  const localVenvPython = path.resolve(
+    process.cwd(),
+    '.venv-hive',
+    process.platform === 'win32' ? 'Scripts/python.exe' : 'bin/python',
+  );
+  const fallback = process.platform === 'win32'
+    ? ['python', 'py']
+    : ['python3', 'python'];
+  return [localVenvPython, ...fallback];
+}
+
+function isMissingPythonCommandResult(result: CommandResult): boolean {
+  return /ENOENT|not recognized/i.test(result.stderr);
+}
+
+async function runPythonWithFallback(args: string[], input: string): Promise<string> {
+  const missingCommandErrors: string[] = [];
+
+  for (const command of getPreferredPythonCommands()) {
+    const result = await runCommand(command, args, input);
+    if (result.code === 0) return result.stdout;
+    if (!isMissingPythonCommandResult(result)) {
+      throw new Error(`Python command failed via ${command}.\n${result.stderr}`);
+    }
+    missingCommandErrors.push(`${command}: ${result.stderr.trim() || 'unavailable'}`);
+  }
+
+  throw new Error(`Unable to locate a usable Python interpreter.\n${missingCommandErrors.join('\n')}`);
+}
+
+function runCommand(command: string, args: string[], input: string): Promise<CommandResult> {
+  return new Promise((resolve) => {
+    const child = spawn(command, args, {
+      cwd: process.cwd(),
+      stdio: 'pipe',
+      shell: false,
+    });
+
+    let stdout = '';
+    let stderr = '';
+    child.stdout?.setEncoding('utf8');
+    child.stderr?.setEncoding('utf8');
+    child.stdout?.on('data', (chunk: string) => {
+      stdout += chunk;
+    });
+    child.stderr?.on('data', (chunk: string) => {
+      stderr += chunk;
+    });
+    child.stdin?.on('error', () => {
+      // The close handler reports the failure.
+    });
+    child.stdin?.end(input);
+
+    child.on('close', (code) => {
+      resolve({
+        code: code ?? 1,
+        stdout,
+        stderr,
+      });
+    });
+    child.on('error', (error) => {
+      resolve({
+        code: 1,
+        stdout,
+        stderr: `${stderr}\n${error instanceof Error ? error.message : String(error)}`,
+      });
+    });
+  });
+}
+
+void main().catch((error: unknown) => {
+  const message = error instanceof Error ? error.message : String(error);
+  console.error(`[test:board-features] failed: ${message}`);
+  process.exit(1);
+});
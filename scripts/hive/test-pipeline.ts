@@ -57,6 +57,7 @@ async function main(): Promise<void> {
   try {
     await runSyntheticTrainLossTest(tempRoot);
     await runReplayReanalyseSchemaTest(tempRoot);
+    await runStdioShutdownTest();
     console.log('[test:pipeline] all checks passed');
   } finally {
     rmSync(tempRoot, { force: true, recursive: true });
@@ -296,6 +297,22 @@ async function runReplayReanalyseSchemaTest(tempRoot: string): Promise<void> {
   console.log(`[test:pipeline] replay schema valid, reanalysed=${reanalysedCount}`);
 }
 
+async function runStdioShutdownTest(): Promise<void> {
+  // stdin stays open after the shutdown request, so each server exits while its reader thread is still blocked.
+  const scripts = ['gpu-inference-server.py', 'train-alphazero-stream.py'];
+  for (const script of scripts) {
+    const scriptPath = path.resolve(process.cwd(), 'scripts/hive', script);
+    const result = await runPythonWithInput([scriptPath], '{"id":1,"cmd":"shutdown"}\n');
+    if (result.code !== 0) {
+      throw new Error(`Shutdown test failed: ${script} exited with ${result.code}\n${result.stderr}`);
+    }
+    if (!result.stdout.includes('"bye"')) {
+      throw new Error(`Shutdown test failed: ${script} did not acknowledge shutdown`);
+    }
+  }
+  console.log(`[test:pipeline] stdio shutdown exits cleanly for ${scripts.length} servers`);
+}
+
 function readMetricEvents(metricsPath: string): MetricEvent[] {
   const raw = readFileSync(metricsPath, 'utf8');
   const lines = raw.split('\n').map((line) => line.trim()).filter(Boolean);
@@ -354,13 +371,30 @@ async function runPythonWithFallback(args: string[]): Promise<void> {
   throw new Error(`Unable to locate a usable Python interpreter.\n${missingCommandErrors.join('\n')}`);
 }
 
-function runCommand(command: string, args: string[]): Promise<CommandResult> {
+async function runPythonWithInput(args: string[], input: string): Promise<CommandResult> {
+  const missingCommandErrors: string[] = [];
+
+  for (const command of getPreferredPythonCommands()) {
+    const result = await runCommand(command, args, input);
+    if (!isMissingPythonCommandResult(result)) return result;
+    missingCommandErrors.push(`${command}: ${result.stderr.trim() || 'unavailable'}`);
+  }
+
+  throw new Error(`Unable to locate a usable Python interpreter.\n${missingCommandErrors.join('\n')}`);
+}
+
+function runCommand(command: string, args: string[], input?: string): Promise<CommandResult> {
   return new Promise((resolve) => {
     const child = spawn(command, args, {
       cwd: process.cwd(),
       stdio: 'pipe',
       shell: false,
     });
+    if (input !== undefined) {
+      // Written without closing stdin: the child has to exit on its own.
+      child.stdin?.write(input);
+    }
+    const killTimer = input === undefined ? null : setTimeout(() => child.kill('SIGKILL'), 60_000);
 
     let stdout = '';
     let stderr = '';
@@ -374,6 +408,7 @@ function runCommand(command: string, args: string[]): Promise<CommandResult> {
     });
 
     child.on('close', (code) => {
+      if (killTimer) clearTimeout(killTimer);
       resolve({
         code: code ?? 1,
         stdout,
@@ -3,8 +3,10 @@ import hashlib
 import importlib.util
 import json
 import os
+import queue
 import random
 import sys
+import threading
 import time
 import traceback
 from dataclasses import dataclass
@@ -690,17 +692,39 @@ class TrainerServer:
         }
 
 
+def start_request_reader(stream: Any, max_queued: int = 64) -> "queue.Queue[Optional[Tuple[Any, Optional[Exception]]]]":
+    # Decode requests while a train/append is running; None marks end of input.
+    requests: "queue.Queue[Optional[Tuple[Any, Optional[Exception]]]]" = queue.Queue(maxsize=max_queued)
+
+    def pump() -> None:
+        for raw_line in stream:
+            line = raw_line.strip()
+            if not line:
+                continue
+            try:
+                requests.put((json.loads(line), None))
+            except Exception as error:
+                requests.put((None, error))
+        requests.put(None)
+
+    threading.Thread(target=pump, daemon=True).start()
+    return requests
+
+
 def main() -> None:
     server = TrainerServer()
+    requests = start_request_reader(sys.stdin)
 
-    for raw_line in sys.stdin:
-        line = raw_line.strip()
-        if not line:
-            continue
+    while True:
+        item = requests.get()
+        if item is None:
+            return
+        request, read_error = item
 
         request_id: Any = None
         try:
-            request = json.loads(line)
+            if read_error is not None:
+                raise read_error
             if not isinstance(request, dict):
                 raise ValueError("Request must be a JSON object")
             request_id = request.get("id")
@@ -725,7 +749,10 @@ def main() -> None:
                 response = server.train(payload)
             elif command == "shutdown":
                 protocol_response(request_id, True, {"status": "bye"})
-                return
+                # The stdin pump is still blocked reading; interpreter teardown under it aborts the process.
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(0)
             else:
                 raise ValueError(f"Unknown command: {command}")
 
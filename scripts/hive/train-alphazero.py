@@ -17,6 +17,8 @@ except Exception:
     print("PyTorch is required. Install with: pip install torch", flush=True)
     raise
 
+from policy_value_io import float_tensor, is_float_array, read_model_payload, write_model_artifact
+
 
 DEFAULT_METRICS_LOG_PATH = ".hive-cache/metrics/training-metrics.jsonl"
 POLICY_VALUE_MODEL_VERSION = 6
@@ -25,6 +27,9 @@ POLICY_VALUE_MODEL_LEGACY_VERSION = 4
 POLICY_VALUE_MODEL_OLDEST_VERSION = 3
 DEFAULT_POLICY_TARGET_TEMPERATURE = 0.12
 DEFAULT_POLICY_HIDDEN_SIZE = 64
+# Max |factorized - concatenated| policy logit in fp32, relative to the largest logit
+# magnitude (at least 1). Reordered summation measures ~1.2e-6 on trained models.
+FACTORIZED_POLICY_TOLERANCE = 1e-5
 
 
 @dataclass
@@ -71,13 +76,32 @@ class PolicyValueNet(nn.Module):
     def value(self, embedding: torch.Tensor) -> torch.Tensor:
         return torch.tanh(self.value_head(embedding))
 
-    def policy_logits(self, embedding: torch.Tensor, action_features: torch.Tensor) -> torch.Tensor:
-        joint = torch.cat([embedding, action_features], dim=1)
-        hidden = torch.tanh(self.policy_input_hidden(joint))
+    def policy_state_projection(self, embedding: torch.Tensor) -> torch.Tensor:
+        # policy_input_hidden acts on [embedding, action]; its state half (plus bias)
+        # only depends on the position, so it is computed once per position.
+        weight = self.policy_input_hidden.weight[:, : self.embedding_size]
+        return nn.functional.linear(embedding, weight, self.policy_input_hidden.bias)
+
+    def policy_action_projection(self, action_features: torch.Tensor) -> torch.Tensor:
+        weight = self.policy_input_hidden.weight[:, self.embedding_size :]
+        return nn.functional.linear(action_features, weight)
+
+    def policy_logits_from_projection(self, projection: torch.Tensor) -> torch.Tensor:
+        hidden = torch.tanh(projection)
         hidden = torch.tanh(self.policy_hidden(hidden))
-        logits = hidden @ self.policy_output_weights + self.policy_bias.squeeze(0)
+        logits = torch.matmul(hidden, self.policy_output_weights) + self.policy_bias.squeeze(0)
         return logits * torch.exp(self.policy_log_scale).clamp(min=0.25, max=32.0)
 
+    def policy_logits(self, embedding: torch.Tensor, action_features: torch.Tensor) -> torch.Tensor:
+        # embedding is (1, E) or (N, E); either broadcasts against the (N, H) action half.
+        projection = self.policy_state_projection(embedding) + self.policy_action_projection(action_features)
+        return self.policy_logits_from_projection(projection)
+
+    def policy_logits_concatenated(self, embedding: torch.Tensor, action_features: torch.Tensor) -> torch.Tensor:
+        # Reference for policy_logits: policy_input_hidden on the [embedding, action] rows.
+        rows = embedding.expand(action_features.shape[0], -1)
+        return self.policy_logits_from_projection(self.policy_input_hidden(torch.cat([rows, action_features], dim=1)))
+
     def forward(self, state_tensor: torch.Tensor, action_features: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
         embeddings = self.embed(state_tensor)
         value_pred = self.value(embeddings).squeeze(-1)
@@ -85,12 +109,8 @@ class PolicyValueNet(nn.Module):
         mobility_pred = torch.tanh(self.mobility_head(embeddings)).squeeze(-1)
         length_logits = self.length_head(embeddings)
 
-        expanded_embeddings = embeddings.unsqueeze(1).expand(-1, action_features.shape[1], -1)
-        joint = torch.cat([expanded_embeddings, action_features], dim=2)
-        hidden = torch.tanh(self.policy_input_hidden(joint))
-        hidden = torch.tanh(self.policy_hidden(hidden))
-        all_logits = torch.matmul(hidden, self.policy_output_weights) + self.policy_bias.squeeze(0)
-        all_logits = all_logits * torch.exp(self.policy_log_scale).clamp(min=0.25, max=32.0)
+        projection = self.policy_state_projection(embeddings).unsqueeze(1) + self.policy_action_projection(action_features)
+        all_logits = self.policy_logits_from_projection(projection)
         return value_pred, queen_pred, mobility_pred, length_logits, all_logits
 
 
@@ -402,12 +422,8 @@ def compute_batch_loss(
         uniform = action_mask.float() / n_legal
         padded_probs = (1 - smoothing) * padded_probs + smoothing * uniform
 
-    expanded_embeddings = embeddings.unsqueeze(1).expand(-1, max_actions, -1)
-    joint = torch.cat([expanded_embeddings, padded_actions], dim=2)
-    hidden = torch.tanh(model.policy_input_hidden(joint))
-    hidden = torch.tanh(model.policy_hidden(hidden))
-    all_logits = torch.matmul(hidden, model.policy_output_weights) + model.policy_bias.squeeze(0)
-    all_logits = all_logits * torch.exp(model.policy_log_scale).clamp(min=0.25, max=32.0)
+    projection = model.policy_state_projection(embeddings).unsqueeze(1) + model.policy_action_projection(padded_actions)
+    all_logits = model.policy_logits_from_projection(projection)
     # Mask out padding with large negative value before softmax
     all_logits = all_logits.masked_fill(~action_mask, -1e9)
 
@@ -473,6 +489,48 @@ def evaluate_split(
     }
 
 
+def check_factorized_policy(
+    model: PolicyValueNet,
+    samples: List[SampleRecord],
+    device: torch.device,
+    limit: int = 64,
+) -> float:
+    """
+    Compare policy_logits against the concatenated reference in fp32 (TF32 off)
+    on up to limit samples. Returns the max abs difference and raises if it is
+    over FACTORIZED_POLICY_TOLERANCE.
+    """
+    checked = [sample for sample in samples[:limit] if sample.action_features]
+    if not checked:
+        return 0.0
+    was_training = model.training
+    matmul_tf32 = torch.backends.cuda.matmul.allow_tf32
+    model.eval()
+    torch.backends.cuda.matmul.allow_tf32 = False
+    try:
+        with torch.no_grad():
+            state_tensor = torch.tensor([sample.state_features for sample in checked], dtype=torch.float32, device=device)
+            embeddings = model.embed(state_tensor)
+            max_diff = 0.0
+            for index, sample in enumerate(checked):
+                action_tensor = torch.tensor(sample.action_features, dtype=torch.float32, device=device)
+                embedding = embeddings[index:index + 1]
+                factorized = model.policy_logits(embedding, action_tensor)
+                reference = model.policy_logits_concatenated(embedding, action_tensor)
+                diff = float((factorized - reference).abs().max())
+                bound = FACTORIZED_POLICY_TOLERANCE * max(1.0, float(reference.abs().max()))
+                if diff > bound:
+                    raise RuntimeError(
+                        f"Factorized policy logits differ from the concatenated path by {diff:.3e} "
+                        f"(bound {bound:.3e}) on sample {index}"
+                    )
+                max_diff = max(max_diff, diff)
+    finally:
+        torch.backends.cuda.matmul.allow_tf32 = matmul_tf32
+        model.train(was_training)
+    return max_diff
+
+
 def update_ema(ema: Dict[str, torch.Tensor], state_dict: Dict[str, torch.Tensor], decay: float) -> None:
     for key, value in state_dict.items():
         ema[key].mul_(decay).add_(value.detach().cpu(), alpha=1 - decay)
@@ -556,14 +614,13 @@ def load_initial_model(
         return result
 
     try:
-        with open(absolute_path, "r", encoding="utf-8") as handle:
-            raw = handle.read()
-        payload = json.loads(raw)
+        payload, artifact = read_model_payload(absolute_path)
     except Exception as error:
         result["reason"] = f"read_error:{error}"
         return result
 
-    result["hash"] = compute_short_hash(raw)
+    result["hash"] = artifact["sha256"][:12]
+    result["source"] = artifact["source"]
     if not isinstance(payload, dict):
         result["reason"] = "invalid_payload"
         return result
@@ -619,8 +676,8 @@ def load_initial_model(
                 if (
                     input_size != expected_in
                     or output_size <= 0
-                    or not isinstance(weights, list)
-                    or not isinstance(bias, list)
+                    or not is_float_array(weights)
+                    or not is_float_array(bias)
                     or len(weights) != input_size * output_size
                     or len(bias) != output_size
                 ):
@@ -632,14 +689,12 @@ def load_initial_model(
                 if output_size != linear.out_features or input_size != linear.in_features:
                     widened = True
 
-                source_weight = torch.tensor(
+                source_weight = float_tensor(
                     weights,
-                    dtype=torch.float32,
                     device=linear.weight.device,
                 ).reshape(output_size, input_size)
-                source_bias = torch.tensor(
+                source_bias = float_tensor(
                     bias,
-                    dtype=torch.float32,
                     device=linear.bias.device,
                 )
                 copy_linear_overlap(linear, source_weight, source_bias)
@@ -670,7 +725,7 @@ def load_initial_model(
             policy_bias = policy_head.get("bias")
             policy_scale = policy_head.get("actionScale")
             if (
-                not isinstance(value_weights, list)
+                not is_float_array(value_weights)
                 or len(value_weights) > model.value_head.in_features
                 or not isinstance(value_bias, (int, float))
                 or not isinstance(policy_bias, (int, float))
@@ -681,9 +736,8 @@ def load_initial_model(
             if len(value_weights) != model.value_head.in_features:
                 widened = True
 
-            value_weight_tensor = torch.tensor(
+            value_weight_tensor = float_tensor(
                 value_weights,
-                dtype=torch.float32,
                 device=model.value_head.weight.device,
             )
             model.value_head.weight[:, :value_weight_tensor.shape[0]].copy_(value_weight_tensor.reshape(1, -1))
@@ -698,15 +752,15 @@ def load_initial_model(
                 and 0 < policy_input_hidden_size <= model.policy_hidden_size
                 and isinstance(policy_hidden_size, int)
                 and 0 < policy_hidden_size <= model.policy_hidden_size
-                and isinstance(policy_input_weights, list)
+                and is_float_array(policy_input_weights)
                 and len(policy_input_weights) == (source_embedding_size + len(payload_action_feature_names)) * policy_input_hidden_size
-                and isinstance(policy_input_bias, list)
+                and is_float_array(policy_input_bias)
                 and len(policy_input_bias) == policy_input_hidden_size
-                and isinstance(policy_hidden_weights, list)
+                and is_float_array(policy_hidden_weights)
                 and len(policy_hidden_weights) == policy_hidden_size * policy_hidden_size
-                and isinstance(policy_hidden_layer_bias, list)
+                and is_float_array(policy_hidden_layer_bias)
                 and len(policy_hidden_layer_bias) == policy_hidden_size
-                and isinstance(policy_output_weights, list)
+                and is_float_array(policy_output_weights)
                 and len(policy_output_weights) == policy_hidden_size
             ):
                 if (
@@ -715,14 +769,12 @@ def load_initial_model(
                     or source_embedding_size != model.embedding_size
                 ):
                     widened = True
-                source_input_weights = torch.tensor(
+                source_input_weights = float_tensor(
                     policy_input_weights,
-                    dtype=torch.float32,
                     device=model.policy_input_hidden.weight.device,
                 ).reshape(policy_input_hidden_size, source_embedding_size + len(payload_action_feature_names))
-                source_input_bias = torch.tensor(
+                source_input_bias = float_tensor(
                     policy_input_bias,
-                    dtype=torch.float32,
                     device=model.policy_input_hidden.bias.device,
                 )
                 copy_policy_input_hidden_overlap(
@@ -733,43 +785,39 @@ def load_initial_model(
                     model.embedding_size,
                     action_feature_map,
                 )
-                source_hidden_weights = torch.tensor(
+                source_hidden_weights = float_tensor(
                     policy_hidden_weights,
-                    dtype=torch.float32,
                     device=model.policy_hidden.weight.device,
                 ).reshape(policy_hidden_size, policy_hidden_size)
-                source_hidden_bias = torch.tensor(
+                source_hidden_bias = float_tensor(
                     policy_hidden_layer_bias,
-                    dtype=torch.float32,
                     device=model.policy_hidden.bias.device,
                 )
                 copy_linear_overlap(model.policy_hidden, source_hidden_weights, source_hidden_bias)
                 copy_vector_overlap(
                     model.policy_output_weights,
-                    torch.tensor(policy_output_weights, dtype=torch.float32, device=model.policy_output_weights.device),
+                    float_tensor(policy_output_weights, device=model.policy_output_weights.device),
                 )
             elif (
                 isinstance(policy_hidden_size, int)
                 and 0 < policy_hidden_size <= model.policy_hidden_size
-                and isinstance(policy_state_hidden, list)
+                and is_float_array(policy_state_hidden)
                 and len(policy_state_hidden) == source_embedding_size * policy_hidden_size
-                and isinstance(policy_action_hidden, list)
+                and is_float_array(policy_action_hidden)
                 and len(policy_action_hidden) == len(payload_action_feature_names) * policy_hidden_size
-                and isinstance(policy_hidden_bias, list)
+                and is_float_array(policy_hidden_bias)
                 and len(policy_hidden_bias) == policy_hidden_size
-                and isinstance(policy_output_weights, list)
+                and is_float_array(policy_output_weights)
                 and len(policy_output_weights) == policy_hidden_size
             ):
                 if policy_hidden_size != model.policy_hidden_size or source_embedding_size != model.embedding_size:
                     widened = True
-                old_state_hidden = torch.tensor(
+                old_state_hidden = float_tensor(
                     policy_state_hidden,
-                    dtype=torch.float32,
                     device=model.policy_input_hidden.weight.device,
                 ).reshape(policy_hidden_size, source_embedding_size)
-                old_action_hidden = torch.tensor(
+                old_action_hidden = float_tensor(
                     policy_action_hidden,
-                    dtype=torch.float32,
                     device=model.policy_input_hidden.weight.device,
                 ).reshape(policy_hidden_size, len(payload_action_feature_names))
                 rows = min(policy_hidden_size, model.policy_hidden_size)
@@ -777,7 +825,7 @@ def load_initial_model(
                 for source_index, target_index in action_feature_map:
                     model.policy_input_hidden.weight[:rows, model.embedding_size + target_index].copy_(old_action_hidden[:rows, source_index])
                 model.policy_input_hidden.bias[:rows].copy_(
-                    torch.tensor(policy_hidden_bias, dtype=torch.float32, device=model.policy_input_hidden.bias.device)[:rows]
+                    float_tensor(policy_hidden_bias, device=model.policy_input_hidden.bias.device)[:rows]
                 )
                 model.policy_hidden.weight.zero_()
                 model.policy_hidden.bias.zero_()
@@ -785,7 +833,7 @@ def load_initial_model(
                 model.policy_hidden.weight.copy_(eye)
                 copy_vector_overlap(
                     model.policy_output_weights,
-                    torch.tensor(policy_output_weights, dtype=torch.float32, device=model.policy_output_weights.device),
+                    float_tensor(policy_output_weights, device=model.policy_output_weights.device),
                 )
             else:
                 if source_embedding_size != model.embedding_size:
@@ -795,15 +843,15 @@ def load_initial_model(
                 model.policy_hidden.weight.zero_()
                 model.policy_hidden.bias.zero_()
                 model.policy_output_weights.zero_()
-                if isinstance(policy_action, list) and len(policy_action) == len(payload_action_feature_names):
-                    old_action = torch.tensor(policy_action, dtype=torch.float32, device=model.policy_input_hidden.weight.device)
+                if is_float_array(policy_action) and len(policy_action) == len(payload_action_feature_names):
+                    old_action = float_tensor(policy_action, device=model.policy_input_hidden.weight.device)
                     for source_index, target_index in action_feature_map:
                         model.policy_input_hidden.weight[0, model.embedding_size + target_index] = old_action[source_index]
-                if isinstance(legacy_state, list) and len(legacy_state) == model.embedding_size:
+                if is_float_array(legacy_state) and len(legacy_state) == model.embedding_size:
                     model.policy_input_hidden.weight[0, :model.embedding_size].copy_(
-                        torch.tensor(legacy_state, dtype=torch.float32, device=model.policy_input_hidden.weight.device)
+                        float_tensor(legacy_state, device=model.policy_input_hidden.weight.device)
                     )
-                elif isinstance(policy_context, list) and len(policy_context) > 0:
+                elif is_float_array(policy_context) and len(policy_context) > 0:
                     legacy_mean = sum(float(entry) for entry in policy_context) / len(policy_context)
                     model.policy_input_hidden.bias[0] = float(legacy_mean)
                 model.policy_hidden.weight[0, 0] = 1.0
@@ -824,12 +872,11 @@ def load_initial_model(
                 if isinstance(queen_head, dict):
                     queen_weights = queen_head.get("weights")
                     queen_bias = queen_head.get("bias")
-                    if isinstance(queen_weights, list) and len(queen_weights) <= model.queen_head.in_features and isinstance(queen_bias, (int, float)):
+                    if is_float_array(queen_weights) and len(queen_weights) <= model.queen_head.in_features and isinstance(queen_bias, (int, float)):
                         if len(queen_weights) != model.queen_head.in_features:
                             widened = True
-                        queen_weight_tensor = torch.tensor(
+                        queen_weight_tensor = float_tensor(
                             queen_weights,
-                            dtype=torch.float32,
                             device=model.queen_head.weight.device,
                         )
                         model.queen_head.weight[:, :queen_weight_tensor.shape[0]].copy_(queen_weight_tensor.reshape(1, -1))
@@ -840,12 +887,11 @@ def load_initial_model(
                 if isinstance(mobility_head, dict):
                     mobility_weights = mobility_head.get("weights")
                     mobility_bias = mobility_head.get("bias")
-                    if isinstance(mobility_weights, list) and len(mobility_weights) <= model.mobility_head.in_features and isinstance(mobility_bias, (int, float)):
+                    if is_float_array(mobility_weights) and len(mobility_weights) <= model.mobility_head.in_features and isinstance(mobility_bias, (int, float)):
                         if len(mobility_weights) != model.mobility_head.in_features:
                             widened = True
-                        mobility_weight_tensor = torch.tensor(
+                        mobility_weight_tensor = float_tensor(
                             mobility_weights,
-                            dtype=torch.float32,
                             device=model.mobility_head.weight.device,
                         )
                         model.mobility_head.weight[:, :mobility_weight_tensor.shape[0]].copy_(mobility_weight_tensor.reshape(1, -1))
@@ -857,23 +903,22 @@ def load_initial_model(
                     length_weights = length_head.get("weights")
                     length_bias = length_head.get("bias")
                     if (
-                        isinstance(length_weights, list)
+                        is_float_array(length_weights)
                         and len(length_weights) % model.length_head.out_features == 0
                         and (len(length_weights) // model.length_head.out_features) <= model.length_head.in_features
-                        and isinstance(length_bias, list)
+                        and is_float_array(length_bias)
                         and len(length_bias) == model.length_head.out_features
                     ):
                         source_length_in = len(length_weights) // model.length_head.out_features
                         if source_length_in != model.length_head.in_features:
                             widened = True
-                        length_weight_tensor = torch.tensor(
+                        length_weight_tensor = float_tensor(
                             length_weights,
-                            dtype=torch.float32,
                             device=model.length_head.weight.device,
                         ).reshape(model.length_head.out_features, source_length_in)
                         model.length_head.weight[:, :source_length_in].copy_(length_weight_tensor)
                         model.length_head.bias.copy_(
-                            torch.tensor(length_bias, dtype=torch.float32, device=model.length_head.bias.device)
+                            float_tensor(length_bias, device=model.length_head.bias.device)
                         )
     except Exception as error:
         result["reason"] = f"load_error:{error}"
@@ -892,8 +937,6 @@ def export_model(
     hidden: List[int],
     training_meta: Dict[str, Any],
 ) -> None:
-    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-
     trunk_layers = [layer for layer in model.trunk if isinstance(layer, nn.Linear)]
     exported_layers: List[Dict[str, Any]] = []
     for layer in trunk_layers:
@@ -949,9 +992,8 @@ def export_model(
         "training": training_meta,
     }
 
-    with open(out_path, "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2)
-        handle.write("\n")
+    # Same JSON as before plus a .weights.bin sidecar keyed by its sha256 for fast loads.
+    write_model_artifact(out_path, payload)
 
 
 def main() -> None:
@@ -970,6 +1012,7 @@ def main() -> None:
     train_samples, val_samples = split_dataset(samples, ratio=0.9)
     model = PolicyValueNet(len(state_names), len(action_names), hidden).to(device)
     init_result = load_initial_model(model, args.init_model, state_names, action_names, hidden)
+    factorized_diff = check_factorized_policy(model, val_samples or train_samples, device)
     optimizer = build_adamw_optimizer(model.parameters(), args.lr, args.weight_decay, device)
     grad_scaler = create_grad_scaler(device, mixed_precision)
 
@@ -978,7 +1021,8 @@ def main() -> None:
     print(
         f"[az:setup] samples={len(samples)} train={len(train_samples)} val={len(val_samples)} "
         f"state_dim={len(state_names)} action_dim={len(action_names)} hidden={hidden} "
-        f"epochs={args.epochs} batch={args.batch_size} lr={args.lr} wd={args.weight_decay} device={device.type} mixed_precision={'on' if mixed_precision else 'off'}",
+        f"epochs={args.epochs} batch={args.batch_size} lr={args.lr} wd={args.weight_decay} device={device.type} mixed_precision={'on' if mixed_precision else 'off'} "
+        f"factorized_policy_diff={factorized_diff:.2e}",
         flush=True,
     )
     if init_result["loaded"]: